@@ -0,0 +1,312 @@
+from app.core.evaluator import Evaluator
+from app.core.ndjson import parse_request_line, error_record
+from app.core.records import EvaluationRecord
+from app.core.reevaluation import reevaluate_store
+from app.storage.columnar import export_records, export_store, rule_set_columns
+from app.storage.sqlite_store import EvaluationStore
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+import argparse
+import json
+import os
+import sys
+import time
+
+# One line of input: (0-based line number, raw bytes, byte offset just past the line)
+InputLine = Tuple[int, bytes, int]
+
+_worker_evaluator: Optional[Evaluator] = None
+
+
+def _init_worker():
+    global _worker_evaluator
+    _worker_evaluator = Evaluator()
+
+
+# Runs in a worker process: evaluates one chunk and returns its output lines
+# together with the time each rule spent on it
+def _evaluate_chunk(lines: List[Tuple[int, bytes]]) -> Tuple[List[bytes], Dict[str, float]]:
+    evaluator = _worker_evaluator or Evaluator()
+    evaluator.metrics.reset()
+
+    parsed = []
+    for line_number, line in lines:
+        try:
+            parsed.append((line_number, parse_request_line(line)))
+        except ValueError as e:
+            parsed.append((line_number, e))
+
+    valid_requests = [item for _, item in parsed if not isinstance(item, Exception)]
+    responses = iter(evaluator.evaluate_batch(valid_requests))
+
+    output_lines = []
+    for line_number, item in parsed:
+        if isinstance(item, Exception):
+            output_lines.append(error_record(line_number + 1, str(item)))
+        else:
+            output_lines.append(next(responses).to_json() + b"\n")
+
+    return output_lines, evaluator.metrics.rule_seconds()
+
+
+def _parse_shard(value: str) -> Tuple[int, int]:
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"shard must look like i/N, got '{value}'")
+
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"shard index must be in [0, {count}), got {index}")
+
+    return index, count
+
+
+def _read_lines(path: str, start_offset: int, start_line: int) -> Iterator[InputLine]:
+    with open(path, "rb") as handle:
+        handle.seek(start_offset)
+        offset = start_offset
+        line_number = start_line
+        for line in handle:
+            offset += len(line)
+            yield line_number, line.rstrip(b"\r\n"), offset
+            line_number += 1
+
+
+def _chunks(
+    lines: Iterator[InputLine],
+    chunk_size: int,
+    shard: Tuple[int, int]
+) -> Iterator[Tuple[List[Tuple[int, bytes]], int, int]]:
+    shard_index, shard_count = shard
+    chunk = []
+    last_line, last_offset = None, None
+
+    for line_number, line, offset in lines:
+        last_line, last_offset = line_number, offset
+        if line_number % shard_count != shard_index or not line.strip():
+            continue
+        chunk.append((line_number, line))
+        if len(chunk) >= chunk_size:
+            yield chunk, last_line + 1, last_offset
+            chunk = []
+
+    if last_line is not None:
+        yield chunk, last_line + 1, last_offset
+
+
+def _load_checkpoint(path: str, input_path: str, shard: Tuple[int, int]) -> Optional[dict]:
+    if not os.path.exists(path):
+        return None
+
+    with open(path) as handle:
+        checkpoint = json.load(handle)
+
+    if checkpoint.get("input") != os.path.abspath(input_path) or checkpoint.get("shard") != list(shard):
+        raise SystemExit(f"checkpoint {path} was written for a different input or shard")
+
+    return checkpoint
+
+
+def _save_checkpoint(path: str, checkpoint: dict):
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as handle:
+        json.dump(checkpoint, handle)
+    os.replace(temporary, path)
+
+
+def run_evaluate(args: argparse.Namespace) -> int:
+    checkpoint_path = args.checkpoint or f"{args.output}.checkpoint"
+    checkpoint = _load_checkpoint(checkpoint_path, args.input, args.shard) if args.resume else None
+
+    if checkpoint is None:
+        checkpoint = {
+            "input": os.path.abspath(args.input),
+            "shard": list(args.shard),
+            "next_line": 0,
+            "input_offset": 0,
+            "output_bytes": 0,
+            "records": 0
+        }
+
+    output = open(args.output, "r+b" if checkpoint["output_bytes"] else "wb")
+    output.truncate(checkpoint["output_bytes"])
+    output.seek(checkpoint["output_bytes"])
+
+    lines = _read_lines(args.input, checkpoint["input_offset"], checkpoint["next_line"])
+    chunks = _chunks(lines, args.chunk_size, args.shard)
+
+    rule_seconds: Dict[str, float] = {}
+    records = 0
+    started = time.perf_counter()
+
+    def commit(output_lines: List[bytes], chunk_rule_seconds: Dict[str, float], next_line: int, input_offset: int):
+        nonlocal records
+        output.writelines(output_lines)
+        output.flush()
+        os.fsync(output.fileno())
+        records += len(output_lines)
+        for rule_id, seconds in chunk_rule_seconds.items():
+            rule_seconds[rule_id] = rule_seconds.get(rule_id, 0.0) + seconds
+        checkpoint.update(
+            next_line=next_line,
+            input_offset=input_offset,
+            output_bytes=output.tell(),
+            records=checkpoint["records"] + len(output_lines)
+        )
+        _save_checkpoint(checkpoint_path, checkpoint)
+
+    try:
+        if args.workers <= 1:
+            _init_worker()
+            for chunk, next_line, input_offset in chunks:
+                commit(*_evaluate_chunk(chunk), next_line, input_offset)
+        else:
+            # keep a bounded window of chunks in flight and write them back in submission order
+            with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker) as pool:
+                in_flight: "deque[Tuple[Future, int, int]]" = deque()
+                for chunk, next_line, input_offset in chunks:
+                    in_flight.append((pool.submit(_evaluate_chunk, chunk), next_line, input_offset))
+                    if len(in_flight) >= args.workers * 2:
+                        future, done_line, done_offset = in_flight.popleft()
+                        commit(*future.result(), done_line, done_offset)
+                while in_flight:
+                    future, done_line, done_offset = in_flight.popleft()
+                    commit(*future.result(), done_line, done_offset)
+    finally:
+        output.close()
+
+    elapsed = time.perf_counter() - started
+    _report(records, elapsed, rule_seconds, checkpoint["records"])
+    return 0
+
+
+def _report(records: int, elapsed: float, rule_seconds: Dict[str, float], total_records: int):
+    rate = records / elapsed if elapsed > 0 else 0.0
+    print(f"evaluated {records} records in {elapsed:.2f}s ({rate:.1f} records/s)", file=sys.stderr)
+    if total_records != records:
+        print(f"{total_records} records written in total including earlier runs", file=sys.stderr)
+
+    if rule_seconds:
+        print("per-rule time (summed across workers):", file=sys.stderr)
+        for rule_id, seconds in sorted(rule_seconds.items(), key=lambda item: -item[1]):
+            per_record = seconds / records * 1e6 if records else 0.0
+            print(f"  {rule_id:<24} {seconds:10.3f}s  {per_record:10.1f} us/record", file=sys.stderr)
+
+
+def run_reevaluate(args: argparse.Namespace) -> int:
+    store = EvaluationStore(args.store)
+    try:
+        report = reevaluate_store(
+            store,
+            Evaluator(),
+            dry_run=args.dry_run,
+            max_changes=args.max_changes,
+            model=args.model,
+            task_type=args.task_type,
+            start=args.start,
+            end=args.end
+        )
+    finally:
+        store.close()
+
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    return 0
+
+
+# Results from the output of `evaluate`; error lines are left out
+def _read_results(path: str) -> Iterator[EvaluationRecord]:
+    with open(path, "rb") as handle:
+        for line in handle:
+            if line.strip():
+                data = json.loads(line)
+                if "evaluation_id" in data:
+                    yield EvaluationRecord.from_dict(data)
+
+
+def run_export(args: argparse.Namespace) -> int:
+    started = time.perf_counter()
+    if args.store:
+        store = EvaluationStore(args.store)
+        try:
+            rows = export_store(
+                store,
+                args.output,
+                include_text=args.include_text,
+                format=args.format,
+                model=args.model,
+                task_type=args.task_type,
+                start=args.start,
+                end=args.end
+            )
+        finally:
+            store.close()
+    else:
+        # results of `evaluate` come from the current catalog, which fixes the columns
+        rule_ids, score_names = rule_set_columns(Evaluator().rule_sets.values())
+        rows = export_records(
+            _read_results(args.input),
+            args.output,
+            rule_ids,
+            score_names,
+            include_text=args.include_text,
+            format=args.format
+        )
+
+    elapsed = time.perf_counter() - started
+    print(f"exported {rows} evaluations to {args.output} in {elapsed:.2f}s", file=sys.stderr)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Offline LLM output evaluation")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    evaluate = commands.add_parser("evaluate", help="evaluate a JSONL file of EvaluationRequests")
+    evaluate.add_argument("input", help="input JSONL file, one EvaluationRequest per line")
+    evaluate.add_argument("-o", "--output", required=True, help="output JSONL file, one result per input line")
+    evaluate.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    evaluate.add_argument("--chunk-size", type=int, default=1000, help="records per worker task")
+    evaluate.add_argument("--shard", type=_parse_shard, default=(0, 1), help="process only shard i of N (0-based)")
+    evaluate.add_argument("--checkpoint", help="checkpoint file (default: <output>.checkpoint)")
+    evaluate.add_argument("--resume", action="store_true", help="continue from the checkpoint of an interrupted run")
+    evaluate.set_defaults(handler=run_evaluate)
+
+    reevaluate = commands.add_parser(
+        "reevaluate",
+        help="bring stored evaluations up to date, rerunning only rules that changed"
+    )
+    reevaluate.add_argument("--store", required=True, help="evaluation store (SQLite file, see EVAL_STORE_PATH)")
+    reevaluate.add_argument("--dry-run", action="store_true", help="report changes without updating the store")
+    reevaluate.add_argument("--model", help="only evaluations of this model")
+    reevaluate.add_argument("--task-type", help="only evaluations of this task type")
+    reevaluate.add_argument("--start", type=datetime.fromisoformat, help="only evaluations at or after this time (UTC)")
+    reevaluate.add_argument("--end", type=datetime.fromisoformat, help="only evaluations before this time (UTC)")
+    reevaluate.add_argument("--max-changes", type=int, default=100, help="verdict changes listed in the report")
+    reevaluate.set_defaults(handler=run_reevaluate)
+
+    export = commands.add_parser("export", help="write evaluation results as columnar Parquet or Arrow (needs pyarrow)")
+    source = export.add_mutually_exclusive_group(required=True)
+    source.add_argument("input", nargs="?", help="results JSONL written by `evaluate`")
+    source.add_argument("--store", help="export from an evaluation store (SQLite file) instead")
+    export.add_argument("-o", "--output", required=True, help="output file (.parquet, or .arrow for Arrow IPC)")
+    export.add_argument("--format", choices=("parquet", "arrow"), help="output format (default: from the file extension)")
+    export.add_argument("--include-text", action="store_true", help="also write prompt, output, reference and explanations")
+    export.add_argument("--model", help="with --store: only evaluations of this model")
+    export.add_argument("--task-type", help="with --store: only evaluations of this task type")
+    export.add_argument("--start", type=datetime.fromisoformat, help="with --store: only evaluations at or after this time (UTC)")
+    export.add_argument("--end", type=datetime.fromisoformat, help="with --store: only evaluations before this time (UTC)")
+    export.set_defaults(handler=run_export)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+from dataclasses import dataclass
+from typing import Optional
+import os
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+# Service settings, read from EVAL_* environment variables at startup
+@dataclass
+class Settings:
+    result_cache_enabled: bool = False
+    result_cache_size: int = 10000
+    result_cache_ttl_seconds: float = 0.0
+    result_cache_db_path: Optional[str] = None
+    result_cache_db_max_entries: int = 1000000
+    store_path: Optional[str] = None
+    store_batch_size: int = 500
+    store_flush_interval_ms: int = 200
+    rule_budget_ms: float = 0.0
+    json_max_chars: int = 64 * 1024 * 1024
+    json_max_depth: int = 256
+    json_schema_dir: Optional[str] = None
+    large_output_chars: int = 4 * 1024 * 1024
+    large_output_chunk_chars: int = 256 * 1024
+    rules_config: Optional[str] = None
+    dedup_index_size: int = 20000
+    injection_signatures: Optional[str] = None
+    judge_url: Optional[str] = None
+    judge_model: str = "gpt-4o-mini"
+    judge_api_key: Optional[str] = None
+    judge_max_in_flight: int = 8
+    judge_batch_size: int = 8
+    judge_batch_window_ms: float = 10.0
+    judge_timeout_s: float = 30.0
+    judge_cache_size: int = 10000
+    workers: int = 0
+    dispatch_batch_size: int = 32
+    dispatch_window_ms: float = 2.0
+    max_queue: int = 1024
+    request_timeout_s: float = 30.0
+
+
+def load_settings() -> Settings:
+    return Settings(
+        result_cache_enabled=_env_bool("EVAL_RESULT_CACHE", False),
+        result_cache_size=_env_int("EVAL_RESULT_CACHE_SIZE", 10000),
+        result_cache_ttl_seconds=_env_float("EVAL_RESULT_CACHE_TTL", 0.0),
+        result_cache_db_path=os.getenv("EVAL_RESULT_CACHE_DB") or None,
+        result_cache_db_max_entries=_env_int("EVAL_RESULT_CACHE_DB_MAX_ENTRIES", 1000000),
+        store_path=os.getenv("EVAL_STORE_PATH") or None,
+        store_batch_size=_env_int("EVAL_STORE_BATCH_SIZE", 500),
+        store_flush_interval_ms=_env_int("EVAL_STORE_FLUSH_INTERVAL_MS", 200),
+        rule_budget_ms=_env_float("EVAL_RULE_BUDGET_MS", 0.0),
+        json_max_chars=_env_int("EVAL_JSON_MAX_CHARS", 64 * 1024 * 1024),
+        json_max_depth=_env_int("EVAL_JSON_MAX_DEPTH", 256),
+        json_schema_dir=os.getenv("EVAL_JSON_SCHEMA_DIR") or None,
+        large_output_chars=_env_int("EVAL_LARGE_OUTPUT_CHARS", 4 * 1024 * 1024),
+        large_output_chunk_chars=_env_int("EVAL_LARGE_OUTPUT_CHUNK_CHARS", 256 * 1024),
+        rules_config=os.getenv("EVAL_RULES_CONFIG") or None,
+        dedup_index_size=_env_int("EVAL_DEDUP_INDEX_SIZE", 20000),
+        injection_signatures=os.getenv("EVAL_INJECTION_SIGNATURES") or None,
+        judge_url=os.getenv("EVAL_JUDGE_URL") or None,
+        judge_model=os.getenv("EVAL_JUDGE_MODEL") or "gpt-4o-mini",
+        judge_api_key=os.getenv("EVAL_JUDGE_API_KEY") or None,
+        judge_max_in_flight=_env_int("EVAL_JUDGE_MAX_IN_FLIGHT", 8),
+        judge_batch_size=_env_int("EVAL_JUDGE_BATCH_SIZE", 8),
+        judge_batch_window_ms=_env_float("EVAL_JUDGE_BATCH_WINDOW_MS", 10.0),
+        judge_timeout_s=_env_float("EVAL_JUDGE_TIMEOUT_S", 30.0),
+        judge_cache_size=_env_int("EVAL_JUDGE_CACHE_SIZE", 10000),
+        workers=_env_int("EVAL_WORKERS", 0),
+        dispatch_batch_size=_env_int("EVAL_DISPATCH_BATCH_SIZE", 32),
+        dispatch_window_ms=_env_float("EVAL_DISPATCH_WINDOW_MS", 2.0),
+        max_queue=_env_int("EVAL_MAX_QUEUE", 1024),
+        request_timeout_s=_env_float("EVAL_REQUEST_TIMEOUT_S", 30.0)
+    )
+
+
+settings = load_settings()
@@ -0,0 +1,323 @@
+from collections import Counter
+from functools import cached_property
+from itertools import islice
+from typing import Collection, Dict, FrozenSet, Iterator, List, Tuple
+import re
+
+# One match per sentence that has any non-whitespace content; equivalent to splitting
+# on [.!?]+ and counting non-blank pieces, without materialising the pieces
+SENTENCE_PATTERN = re.compile(r"[^.!?\s][^.!?]*")
+TOKEN_PATTERN = re.compile(r"\S+")
+TERMINATOR_PATTERN = re.compile(r"[.!?]")
+WORD_PATTERN = re.compile(r"\w+")
+# Integers and decimals with optional sign and thousands separators ("-1,234.5")
+NUMBER_PATTERN = re.compile(r"(?<![\w.])[-+]?\d{1,3}(?:,\d{3})+(?:\.\d+)?|(?<![\w.])[-+]?\d+(?:\.\d+)?")
+# Same characters as str.isspace(), which str.split() and str.strip() use
+SPACE_PATTERN = re.compile(r"\s")
+NON_SPACE_PATTERN = re.compile(r"\S")
+
+DEFAULT_CHUNK_CHARS = 256 * 1024
+
+
+# Shared, lazily computed views of one output. The evaluator builds one per request
+# and hands it to every rule, so each view is derived at most once.
+class OutputAnalysis:
+
+    # whether views are computed over chunks (see ChunkedAnalysis)
+    chunked = False
+
+    def __init__(self, text: str):
+        self.text = text
+
+    # The text in pieces that join up to it, for views that can be computed piece by piece
+    def pieces(self) -> Iterator[str]:
+        return iter((self.text,))
+
+    def lowered_pieces(self) -> Iterator[str]:
+        return iter((self.lowered,))
+
+    @cached_property
+    def stripped(self) -> str:
+        return self.text.strip()
+
+    @cached_property
+    def stripped_length(self) -> int:
+        return len(self.stripped)
+
+    @cached_property
+    def lowered(self) -> str:
+        return self.text.lower()
+
+    @cached_property
+    def char_count(self) -> int:
+        return len(self.text)
+
+    @cached_property
+    def word_count(self) -> int:
+        return len(self.text.split())
+
+    @cached_property
+    def sentence_count(self) -> int:
+        return sum(1 for _ in SENTENCE_PATTERN.finditer(self.text))
+
+    @cached_property
+    def token_offsets(self) -> List[Tuple[int, int]]:
+        return [match.span() for match in TOKEN_PATTERN.finditer(self.text)]
+
+    @cached_property
+    def word_tokens(self) -> "TokenView":
+        return TokenView(self.text)
+
+
+# OutputAnalysis for very large outputs. Views are computed in one forward scan over
+# chunks of about chunk_chars characters, so the memory they take beyond the text
+# itself is a small multiple of the chunk size instead of of the output size. Chunks
+# end just after a whitespace character: no word, number or phrase-matching token is
+# split, and lowercasing or normalizing chunk by chunk gives the same text as doing it
+# at once. A run of text without whitespace stays in one chunk, however long. Views
+# not overridden here (e.g. `lowered`) are still computed over the whole text.
+class ChunkedAnalysis(OutputAnalysis):
+
+    chunked = True
+
+    def __init__(self, text: str, chunk_chars: int = DEFAULT_CHUNK_CHARS):
+        super().__init__(text)
+        self.chunk_chars = max(1, chunk_chars)
+
+    def pieces(self) -> Iterator[str]:
+        text, length = self.text, len(self.text)
+        start = 0
+        while start < length:
+            space = SPACE_PATTERN.search(text, start + self.chunk_chars - 1)
+            end = space.end() if space is not None else length
+            yield text[start:end]
+            start = end
+
+    def lowered_pieces(self) -> Iterator[str]:
+        return (piece.lower() for piece in self.pieces())
+
+    # Offsets of the first and one past the last non-whitespace character, (0, 0) for
+    # blank text: text.strip() is text[start:end]
+    @cached_property
+    def stripped_bounds(self) -> Tuple[int, int]:
+        first = NON_SPACE_PATTERN.search(self.text)
+        if first is None:
+            return 0, 0
+        end = len(self.text)
+        while end > first.start():
+            start = max(first.start(), end - self.chunk_chars)
+            kept = len(self.text[start:end].rstrip())
+            if kept:
+                return first.start(), start + kept
+            end = start
+        return first.start(), first.end()
+
+    @cached_property
+    def stripped_length(self) -> int:
+        start, end = self.stripped_bounds
+        return end - start
+
+    @cached_property
+    def word_count(self) -> int:
+        return self._counts.word_count
+
+    @cached_property
+    def sentence_count(self) -> int:
+        return self._counts.sentence_count
+
+    @cached_property
+    def word_tokens(self) -> "TokenView":
+        return ChunkedTokenView(self)
+
+    @cached_property
+    def _counts(self) -> "RunningCounts":
+        counts = RunningCounts()
+        for piece in self.pieces():
+            counts.feed(piece)
+        return counts
+
+
+# Large outputs (more than large_output_chars characters) are analyzed in chunks of
+# chunk_chars; 0 keeps every output in memory
+def analyze_output(text: str, large_output_chars: int = 0, chunk_chars: int = DEFAULT_CHUNK_CHARS) -> OutputAnalysis:
+    if large_output_chars and len(text) > large_output_chars:
+        return ChunkedAnalysis(text, chunk_chars)
+    return OutputAnalysis(text)
+
+
+def normalize_number(text: str) -> str:
+    value = float(text.replace(",", ""))
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+# Lowercased word tokens of a text and the views the overlap metrics need, each
+# computed on first use
+class TokenView:
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens: Tuple[str, ...] = tuple(WORD_PATTERN.findall(text.lower()))
+        self._ngrams: Dict[int, Tuple[Tuple[str, ...], ...]] = {}
+        self._ngram_counts: Dict[int, Counter] = {}
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    @cached_property
+    def counts(self) -> Counter:
+        return Counter(self.tokens)
+
+    def ngrams(self, n: int) -> Tuple[Tuple[str, ...], ...]:
+        grams = self._ngrams.get(n)
+        if grams is None:
+            grams = self._ngrams[n] = tuple(zip(*(self.tokens[i:] for i in range(n))))
+        return grams
+
+    def ngram_counts(self, n: int) -> Counter:
+        counts = self._ngram_counts.get(n)
+        if counts is None:
+            counts = self._ngram_counts[n] = Counter(self.ngrams(n))
+        return counts
+
+    def ngram_count(self, n: int) -> int:
+        return len(self.ngrams(n))
+
+    # ngram_counts(n), of which only the counts of the given n-grams are used
+    def ngram_counts_among(self, n: int, ngrams: Collection[Tuple[str, ...]]) -> Counter:
+        return self.ngram_counts(n)
+
+    def iter_tokens(self) -> Iterator[str]:
+        return iter(self.tokens)
+
+    @cached_property
+    def numbers(self) -> FrozenSet[str]:
+        return frozenset(normalize_number(match) for match in NUMBER_PATTERN.findall(self.text))
+
+    # Bit j of masks[token] is set where tokens[j] == token (see lcs_length)
+    @cached_property
+    def lcs_masks(self) -> Dict[str, int]:
+        positions: Dict[str, List[int]] = {}
+        for position, token in enumerate(self.tokens):
+            positions.setdefault(token, []).append(position)
+
+        masks = {}
+        for token, token_positions in positions.items():
+            bits = bytearray((len(self.tokens) + 8) // 8)
+            for position in token_positions:
+                bits[position >> 3] |= 1 << (position & 7)
+            masks[token] = int.from_bytes(bits, "little")
+        return masks
+
+
+# TokenView of a ChunkedAnalysis. Tokens are read chunk by chunk and never held all at
+# once, except through `tokens` and `ngrams`, which materialize them like TokenView.
+class ChunkedTokenView(TokenView):
+
+    def __init__(self, analysis: ChunkedAnalysis):
+        self.analysis = analysis
+        self.text = analysis.text
+        self._ngrams = {}
+        self._ngram_counts = {}
+
+    @cached_property
+    def tokens(self) -> Tuple[str, ...]:
+        return tuple(self.iter_tokens())
+
+    @cached_property
+    def token_count(self) -> int:
+        return sum(len(WORD_PATTERN.findall(piece)) for piece in self.analysis.lowered_pieces())
+
+    def __len__(self) -> int:
+        return self.token_count
+
+    def iter_tokens(self) -> Iterator[str]:
+        for piece in self.analysis.lowered_pieces():
+            yield from WORD_PATTERN.findall(piece)
+
+    def ngram_count(self, n: int) -> int:
+        return max(0, self.token_count - n + 1)
+
+    def ngram_counts(self, n: int) -> Counter:
+        counts = self._ngram_counts.get(n)
+        if counts is None:
+            counts = self._ngram_counts[n] = Counter()
+            for piece_counts in self._piece_ngram_counts(n):
+                counts.update(piece_counts)
+        return counts
+
+    # Counts n-grams chunk by chunk and keeps only those asked for, so memory is bounded
+    # by a chunk's distinct n-grams and the size of `ngrams`
+    def ngram_counts_among(self, n: int, ngrams: Collection[Tuple[str, ...]]) -> Counter:
+        if n in self._ngram_counts:
+            return self._ngram_counts[n]
+        counts = Counter()
+        for piece_counts in self._piece_ngram_counts(n):
+            if len(piece_counts) < len(ngrams):
+                counts.update({ngram: count for ngram, count in piece_counts.items() if ngram in ngrams})
+            else:
+                counts.update({ngram: piece_counts[ngram] for ngram in ngrams if ngram in piece_counts})
+        return counts
+
+    @cached_property
+    def numbers(self) -> FrozenSet[str]:
+        numbers = set()
+        for piece in self.analysis.pieces():
+            numbers.update(normalize_number(match) for match in NUMBER_PATTERN.findall(piece))
+        return frozenset(numbers)
+
+    # Counter of the n-grams of each chunk, including those that continue from the
+    # previous chunk's last n - 1 tokens. A chunk's tokens take several times its size,
+    # so only one chunk's are held at a time.
+    def _piece_ngram_counts(self, n: int) -> Iterator[Counter]:
+        carry: List[str] = []
+        for piece in self.analysis.lowered_pieces():
+            tokens = WORD_PATTERN.findall(piece)
+            tokens[:0] = carry
+            if len(tokens) >= n:
+                yield Counter(zip(*(islice(tokens, i, None) for i in range(n))))
+            carry = tokens[-(n - 1):] if n > 1 else []
+            del tokens
+
+
+# Incremental counterpart of the OutputAnalysis counters for output that arrives in
+# pieces. Words and sentences continuing across a piece boundary are counted once,
+# so after any split the totals equal those of OutputAnalysis on the joined text.
+class RunningCounts:
+
+    def __init__(self):
+        self.char_count = 0
+        self.word_count = 0
+        self.sentence_count = 0
+        self.has_content = False
+        self._in_word = False
+        self._in_sentence = False
+
+    def feed(self, text: str):
+        if not text:
+            return
+
+        self.char_count += len(text)
+
+        words = sum(1 for _ in TOKEN_PATTERN.finditer(text))
+        if words and self._in_word and not text[0].isspace():
+            words -= 1
+        self.word_count += words
+        self._in_word = not text[-1].isspace()
+        self.has_content = self.has_content or words > 0
+
+        sentences = 0
+        first = last = None
+        for match in SENTENCE_PATTERN.finditer(text):
+            sentences += 1
+            first = first or match
+            last = match
+
+        if first is None:
+            if TERMINATOR_PATTERN.search(text):
+                self._in_sentence = False
+            return
+
+        if self._in_sentence and not TERMINATOR_PATTERN.search(text, 0, first.start()):
+            sentences -= 1
+        self.sentence_count += sentences
+        self._in_sentence = last.end() == len(text)
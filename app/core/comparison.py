@@ -0,0 +1,408 @@
+from app.core.records import EvaluationRecord
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+import json
+import numpy as np
+
+# Score distributions are reported as histograms over [0, 1] with this many bins
+HISTOGRAM_BINS = 10
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+# Max distinct values a bootstrap resamples over (see bootstrap_mean_ci)
+BOOTSTRAP_LEVELS = 256
+MAX_RESAMPLES = 100000
+
+
+# Assigns dense integer codes to labels in order of first appearance
+def _intern(labels: Iterable[Hashable]) -> Tuple[List[Any], np.ndarray]:
+    index: Dict[Any, int] = {}
+    codes = np.fromiter((index.setdefault(label, len(index)) for label in labels), dtype=np.int64)
+    return list(index), codes
+
+
+# Reorders interned labels by name (None last) and remaps codes to match
+def _sorted_labels(labels: List[Any], codes: np.ndarray) -> Tuple[List[Any], np.ndarray]:
+    order = sorted(range(len(labels)), key=lambda i: (labels[i] is None, labels[i] or ""))
+    remap = np.empty(len(labels), dtype=np.int64)
+    remap[order] = np.arange(len(labels))
+    return [labels[i] for i in order], remap[codes] if len(codes) else codes
+
+
+# Evaluation results in columnar form: one row per evaluation, one column per rule.
+# Models are codes into `models`; prompts are codes into the prompt keys seen, -1 when
+# a result has no prompt (it then takes no part in paired comparisons). Rule cells are
+# NaN where the rule was skipped or did not run.
+class ScoreTable:
+
+    def __init__(
+        self,
+        models: Sequence[Optional[str]],
+        model_codes: np.ndarray,
+        prompt_codes: np.ndarray,
+        overall: np.ndarray,
+        passed: np.ndarray,
+        rule_ids: Sequence[str] = (),
+        rule_scores: Optional[np.ndarray] = None,
+        rule_passed: Optional[np.ndarray] = None
+    ):
+        self.models = list(models)
+        self.model_codes = np.asarray(model_codes, dtype=np.int64)
+        self.prompt_codes = np.asarray(prompt_codes, dtype=np.int64)
+        self.overall = np.asarray(overall, dtype=np.float64)
+        self.passed = np.asarray(passed, dtype=np.float64)
+        self.rule_ids = list(rule_ids)
+
+        empty_rules = np.full((len(self.overall), len(self.rule_ids)), np.nan)
+        self.rule_scores = empty_rules if rule_scores is None else np.asarray(rule_scores, dtype=np.float64)
+        self.rule_passed = empty_rules if rule_passed is None else np.asarray(rule_passed, dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.overall)
+
+    @property
+    def prompt_count(self) -> int:
+        return int(self.prompt_codes.max()) + 1 if len(self.prompt_codes) else 0
+
+    @classmethod
+    def from_records(cls, records: Iterable[EvaluationRecord]) -> "ScoreTable":
+        models = []
+        prompts = []
+        overall = []
+        passed = []
+        rule_index: Dict[str, int] = {}
+        cells = []
+
+        for row, record in enumerate(records):
+            models.append(record.model())
+            prompts.append(record.prompt_key())
+            overall.append(record.overall_score)
+            passed.append(not record.failure_labels)
+            for result in record.rule_results:
+                if not result.skipped:
+                    column = rule_index.setdefault(result.rule_id, len(rule_index))
+                    cells.append((row, column, result.score, result.passed))
+
+        rule_ids, rule_codes = _sorted_labels(list(rule_index), np.arange(len(rule_index)))
+        rule_scores = np.full((len(overall), len(rule_ids)), np.nan)
+        rule_passed = np.full((len(overall), len(rule_ids)), np.nan)
+        if cells:
+            rows, columns, scores, outcomes = (np.array(column) for column in zip(*cells))
+            columns = rule_codes[columns]
+            rule_scores[rows, columns] = scores
+            rule_passed[rows, columns] = outcomes
+
+        return cls._from_labels(models, prompts, overall, passed, rule_ids, rule_scores, rule_passed)
+
+    # Rows as returned by EvaluationStore.score_rows: model, prompt key, overall score,
+    # passed, then score and passed for each rule id, -1 where the rule has no result
+    @classmethod
+    def from_rows(cls, rule_ids: Sequence[str], rows: Sequence[Sequence[Any]]) -> "ScoreTable":
+        width = 2 + 2 * len(rule_ids)
+        numbers = np.array([row[2:] for row in rows], dtype=np.float64).reshape(len(rows), width)
+        rules = numbers[:, 2:]
+        rules[rules < 0] = np.nan
+
+        return cls._from_labels(
+            [row[0] for row in rows],
+            [row[1] for row in rows],
+            numbers[:, 0],
+            numbers[:, 1],
+            rule_ids,
+            rules[:, 0::2],
+            rules[:, 1::2]
+        )
+
+    # A pyarrow Table as written by app.storage.columnar (see read_columnar). Columns are
+    # converted to arrays as a whole: dictionary codes become model and prompt codes
+    # directly, so no Python object is created per row.
+    @classmethod
+    def from_arrow(cls, table: Any) -> "ScoreTable":
+        metadata = table.schema.metadata or {}
+        rule_ids = json.loads(metadata.get(b"rule_ids", b"[]"))
+        rule_ids = [rule_id for rule_id in rule_ids if f"rule.{rule_id}.score" in table.column_names]
+
+        def floats(name: str) -> np.ndarray:
+            return table.column(name).cast("double").to_numpy()
+
+        def codes(name: str) -> Tuple[List[Any], np.ndarray]:
+            column = table.column(name).combine_chunks()
+            labels = column.dictionary.to_pylist()
+            indices = column.indices
+            if column.null_count:
+                # null (no model / no prompt) gets a code of its own after the others
+                labels.append(None)
+                indices = indices.fill_null(len(labels) - 1)
+            values = indices.to_numpy().astype(np.int64)
+            # drop dictionary entries no row uses, keeping codes dense
+            used = np.bincount(values, minlength=len(labels)) > 0
+            if not used.all():
+                labels = [label for label, keep in zip(labels, used) if keep]
+                values = (np.cumsum(used) - 1)[values]
+            return labels, values
+
+        models, model_codes = _sorted_labels(*codes("model"))
+        prompts, prompt_codes = codes("prompt_key")
+        if prompts and prompts[-1] is None:
+            prompt_codes[prompt_codes == len(prompts) - 1] = -1
+
+        rows = len(table)
+        rule_scores = np.empty((rows, len(rule_ids)))
+        rule_passed = np.empty((rows, len(rule_ids)))
+        for index, rule_id in enumerate(rule_ids):
+            rule_scores[:, index] = floats(f"rule.{rule_id}.score")
+            rule_passed[:, index] = floats(f"rule.{rule_id}.passed")
+
+        return cls(
+            models,
+            model_codes,
+            prompt_codes,
+            floats("overall_score"),
+            floats("passed"),
+            rule_ids,
+            rule_scores,
+            rule_passed
+        )
+
+    @classmethod
+    def _from_labels(
+        cls,
+        models: Sequence[Optional[str]],
+        prompts: Sequence[Optional[str]],
+        overall: Sequence[float],
+        passed: Sequence[float],
+        rule_ids: Sequence[str],
+        rule_scores: np.ndarray,
+        rule_passed: np.ndarray
+    ) -> "ScoreTable":
+        model_labels, model_codes = _sorted_labels(*_intern(models))
+        prompt_index: Dict[str, int] = {}
+        prompt_codes = np.fromiter(
+            (-1 if key is None else prompt_index.setdefault(key, len(prompt_index)) for key in prompts),
+            dtype=np.int64
+        )
+
+        return cls(
+            model_labels,
+            model_codes,
+            prompt_codes,
+            np.asarray(overall, dtype=np.float64),
+            np.asarray(passed, dtype=np.float64),
+            rule_ids,
+            rule_scores,
+            rule_passed
+        )
+
+
+# Percentile interval of the mean over `resamples` bootstrap samples. A resample only
+# changes how often each distinct value is picked, so those counts are drawn from a
+# multinomial (resamples x levels work, independent of the sample size). Samples with
+# more than BOOTSTRAP_LEVELS distinct values are first binned on equal-width bins,
+# represented by their bin means: sums are kept exactly, and each resampled mean moves by
+# less than half a bin width.
+def bootstrap_mean_ci(
+    values: np.ndarray,
+    confidence: float = 0.95,
+    resamples: int = 1000,
+    rng: Optional[np.random.Generator] = None
+) -> Tuple[Optional[float], Optional[float]]:
+    values = np.asarray(values, dtype=np.float64)
+    count = len(values)
+    if count == 0:
+        return None, None
+
+    rng = rng if rng is not None else np.random.default_rng(0)
+    levels, frequencies = np.unique(values, return_counts=True)
+
+    if len(levels) > BOOTSTRAP_LEVELS:
+        width = (levels[-1] - levels[0]) / BOOTSTRAP_LEVELS
+        bins = np.minimum(((levels - levels[0]) / width).astype(np.int64), BOOTSTRAP_LEVELS - 1)
+        sums = np.bincount(bins, weights=levels * frequencies, minlength=BOOTSTRAP_LEVELS)
+        frequencies = np.bincount(bins, weights=frequencies, minlength=BOOTSTRAP_LEVELS)
+        occupied = frequencies > 0
+        levels = sums[occupied] / frequencies[occupied]
+        frequencies = frequencies[occupied]
+
+    draws = rng.multinomial(count, frequencies / count, size=resamples)
+    means = draws @ levels / count
+
+    tail = (1 - confidence) / 2
+    low, high = np.quantile(means, [tail, 1 - tail])
+    return float(low), float(high)
+
+
+# Linearly interpolated quantiles of each group of a sample already sorted by group
+def _group_quantiles(sorted_values: np.ndarray, counts: np.ndarray, quantiles: Sequence[float]) -> np.ndarray:
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    positions = np.asarray(quantiles)[None, :] * (counts[:, None] - 1)
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.minimum(lower + 1, counts[:, None] - 1)
+    fraction = positions - lower
+    low_values = sorted_values[starts[:, None] + lower]
+    high_values = sorted_values[starts[:, None] + upper]
+    return low_values + (high_values - low_values) * fraction
+
+
+def _histogram(groups: np.ndarray, values: np.ndarray, group_count: int) -> np.ndarray:
+    bins = np.clip((values * HISTOGRAM_BINS).astype(np.int64), 0, HISTOGRAM_BINS - 1)
+    return np.bincount(groups * HISTOGRAM_BINS + bins, minlength=group_count * HISTOGRAM_BINS).reshape(
+        group_count, HISTOGRAM_BINS
+    )
+
+
+# Count, pass rate and overall score distribution per model, with bootstrap intervals
+# for the pass rate and the mean score
+def model_summary(
+    table: ScoreTable,
+    confidence: float = 0.95,
+    resamples: int = 1000,
+    seed: int = 0
+) -> List[Dict[str, Any]]:
+    model_count = len(table.models)
+    if not len(table) or not model_count:
+        return []
+
+    rng = np.random.default_rng(seed)
+    codes = table.model_codes
+    counts = np.bincount(codes, minlength=model_count)
+    means = np.bincount(codes, weights=table.overall, minlength=model_count) / counts
+    squares = np.bincount(codes, weights=table.overall ** 2, minlength=model_count) / counts
+    stds = np.sqrt(np.maximum(squares - means ** 2, 0.0))
+    pass_rates = np.bincount(codes, weights=table.passed, minlength=model_count) / counts
+
+    order = np.lexsort((table.overall, codes))
+    sorted_scores = table.overall[order]
+    sorted_passed = table.passed[order]
+    quantiles = _group_quantiles(sorted_scores, counts, QUANTILES)
+    histograms = _histogram(codes, table.overall, model_count)
+    bounds = np.cumsum(counts)
+
+    summary = []
+    for code, model in enumerate(table.models):
+        start, end = bounds[code] - counts[code], bounds[code]
+        summary.append({
+            "model": model,
+            "count": int(counts[code]),
+            "pass_rate": float(pass_rates[code]),
+            "pass_rate_ci": list(bootstrap_mean_ci(sorted_passed[start:end], confidence, resamples, rng)),
+            "mean_score": float(means[code]),
+            "mean_score_ci": list(bootstrap_mean_ci(sorted_scores[start:end], confidence, resamples, rng)),
+            "std_score": float(stds[code]),
+            "quantiles": {f"p{round(q * 100)}": float(value) for q, value in zip(QUANTILES, quantiles[code])},
+            "histogram": histograms[code].tolist()
+        })
+
+    return summary
+
+
+# Pass rate and mean score of every rule for every model, over the results where the
+# rule actually ran
+def rule_summary(table: ScoreTable) -> List[Dict[str, Any]]:
+    model_count = len(table.models)
+    rule_count = len(table.rule_ids)
+    if not len(table) or not rule_count:
+        return []
+
+    ran = ~np.isnan(table.rule_passed)
+    keys = (table.model_codes[:, None] * rule_count + np.arange(rule_count)[None, :])[ran]
+    size = model_count * rule_count
+    counts = np.bincount(keys, minlength=size)
+    passes = np.bincount(keys, weights=table.rule_passed[ran], minlength=size)
+    scores = np.bincount(keys, weights=table.rule_scores[ran], minlength=size)
+
+    summary = []
+    for key in np.flatnonzero(counts):
+        summary.append({
+            "model": table.models[key // rule_count],
+            "rule_id": table.rule_ids[key % rule_count],
+            "count": int(counts[key]),
+            "pass_rate": float(passes[key] / counts[key]),
+            "mean_score": float(scores[key] / counts[key])
+        })
+
+    return summary
+
+
+# Per-prompt differences in mean overall score between each model and a baseline
+# model, over the prompts both were evaluated on. The baseline defaults to the model
+# with the most results.
+def paired_differences(
+    table: ScoreTable,
+    baseline: Optional[str] = None,
+    confidence: float = 0.95,
+    resamples: int = 1000,
+    seed: int = 0
+) -> Dict[str, Any]:
+    model_count = len(table.models)
+    if not len(table) or not model_count:
+        return {"baseline": baseline, "models": []}
+
+    if baseline is None:
+        baseline_code = int(np.argmax(np.bincount(table.model_codes, minlength=model_count)))
+    elif baseline in table.models:
+        baseline_code = table.models.index(baseline)
+    else:
+        raise ValueError(f"unknown baseline model '{baseline}'")
+
+    with_prompt = table.prompt_codes >= 0
+    prompt_count = table.prompt_count
+    keys = table.model_codes[with_prompt] * prompt_count + table.prompt_codes[with_prompt]
+    groups, group_of_row = np.unique(keys, return_inverse=True)
+    group_means = (
+        np.bincount(group_of_row, weights=table.overall[with_prompt])
+        / np.bincount(group_of_row)
+    )
+    group_models = groups // max(prompt_count, 1)
+    group_prompts = groups % max(prompt_count, 1)
+
+    baseline_means = np.full(prompt_count, np.nan)
+    is_baseline = group_models == baseline_code
+    baseline_means[group_prompts[is_baseline]] = group_means[is_baseline]
+
+    differences = group_means - baseline_means[group_prompts]
+    paired = ~is_baseline & ~np.isnan(differences)
+    differences = differences[paired]
+    paired_models = group_models[paired]
+
+    counts = np.bincount(paired_models, minlength=model_count)
+    sums = np.bincount(paired_models, weights=differences, minlength=model_count)
+    wins = np.bincount(paired_models, weights=differences > 0, minlength=model_count)
+    losses = np.bincount(paired_models, weights=differences < 0, minlength=model_count)
+    # groups are sorted by model, so each model's differences are contiguous
+    bounds = np.cumsum(counts)
+
+    rng = np.random.default_rng(seed)
+    results = []
+    for code, model in enumerate(table.models):
+        if code == baseline_code:
+            continue
+        count = int(counts[code])
+        sample = differences[bounds[code] - count:bounds[code]]
+        results.append({
+            "model": model,
+            "pairs": count,
+            "mean_difference": float(sums[code] / count) if count else None,
+            "mean_difference_ci": list(bootstrap_mean_ci(sample, confidence, resamples, rng)),
+            "wins": int(wins[code]),
+            "losses": int(losses[code]),
+            "ties": count - int(wins[code]) - int(losses[code])
+        })
+
+    return {"baseline": table.models[baseline_code], "models": results}
+
+
+def compare(
+    table: ScoreTable,
+    baseline: Optional[str] = None,
+    confidence: float = 0.95,
+    resamples: int = 1000,
+    seed: int = 0
+) -> Dict[str, Any]:
+    if not 0 < confidence < 1:
+        raise ValueError("confidence must be between 0 and 1")
+    if not 1 <= resamples <= MAX_RESAMPLES:
+        raise ValueError(f"resamples must be between 1 and {MAX_RESAMPLES}")
+
+    return {
+        "count": len(table),
+        "models": model_summary(table, confidence, resamples, seed),
+        "rules": rule_summary(table),
+        "paired": paired_differences(table, baseline, confidence, resamples, seed)
+    }
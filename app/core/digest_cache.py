@@ -0,0 +1,60 @@
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, TypeVar
+import hashlib
+import threading
+
+DEFAULT_CACHE_SIZE = 4096
+
+T = TypeVar("T")
+
+
+# Bounded, thread-safe LRU of values derived from text (parsed prompts, tokenized
+# references), keyed by a digest of the text so cached entries never keep large
+# inputs alive
+class DigestCache(Generic[T]):
+
+    def __init__(self, build: Callable[[str], T], maxsize: int = DEFAULT_CACHE_SIZE):
+        self.build = build
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[bytes, T]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, text: str) -> T:
+        key = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+
+        # build outside the lock; a concurrent miss on the same text just computes it twice
+        value = self.build(text)
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
@@ -0,0 +1,297 @@
+from app.config import settings
+from app.core.evaluator import Evaluator
+from app.core.json_schema import schema_registry
+from app.core.metrics import EvaluationMetrics
+from app.core.records import EvaluationRecord
+from app.schemas.evaluation import EvaluationRequest
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import asyncio
+import multiprocessing
+
+# One request as sent to a worker: (request, profile, budget_ms)
+WorkItem = Tuple[EvaluationRequest, bool, Optional[float]]
+
+_worker_evaluator: Optional[Evaluator] = None
+
+
+def _init_worker():
+    global _worker_evaluator
+    if settings.json_schema_dir:
+        schema_registry.load_directory(settings.json_schema_dir)
+    _worker_evaluator = Evaluator(time_budget_ms=settings.rule_budget_ms or None)
+
+
+def _ready() -> bool:
+    return _worker_evaluator is not None
+
+
+# Runs in a worker process: evaluates one micro-batch and returns the records, without
+# their echoed input (the server still has it), and the metrics recorded for them.
+def _evaluate_in_worker(items: List[WorkItem]) -> Tuple[List[EvaluationRecord], EvaluationMetrics]:
+    evaluator = _worker_evaluator or Evaluator()
+    evaluator.metrics.reset()
+    records: List[Optional[EvaluationRecord]] = [None] * len(items)
+
+    # profiled requests are timed on their own; the rest share one batch per budget
+    by_budget: Dict[Optional[float], List[int]] = {}
+    for index, (request, profile, budget_ms) in enumerate(items):
+        if profile:
+            records[index] = evaluator.evaluate(request, profile=True, budget_ms=budget_ms)
+        else:
+            by_budget.setdefault(budget_ms, []).append(index)
+
+    for budget_ms, indexes in by_budget.items():
+        batch = evaluator.evaluate_batch([items[index][0] for index in indexes], budget_ms=budget_ms)
+        for index, record in zip(indexes, batch):
+            records[index] = record
+
+    for record in records:
+        record.input_data = None
+    return records, evaluator.metrics
+
+
+# Raised when the admission queue is full
+class Overloaded(Exception):
+    pass
+
+
+class _Queued(NamedTuple):
+    request: EvaluationRequest
+    profile: bool
+    budget_ms: Optional[float]
+    cache_key: Optional[str]
+    future: "asyncio.Future[EvaluationRecord]"
+
+
+# Serves evaluations for the async endpoints.
+# - Admission: at most max_queue requests are admitted at a time, counting both waiting
+#   and running ones. Beyond that, Overloaded is raised, so latency cannot grow without
+#   bound.
+# - Timeout: a caller waits at most timeout_s for its result.
+# - Workers: with workers > 0, rules run in a pool of worker processes, so throughput
+#   scales with cores instead of being bound by the GIL. Requests arriving within
+#   batch_window_ms of each other are sent to a worker together as one micro-batch, up
+#   to max_batch_size. A batch only forms once a worker is free, so under load batches
+#   grow instead of queueing up in the pool.
+# - In-process fallback: with workers = 0, rules run in this process
+#   (Evaluator.evaluate_async). Rule sets with non-deterministic rules always run in
+#   this process, because those rules keep state (e.g. near_duplicate's index) that
+#   worker processes would not share.
+# Result cache and store stay in this process, so workers need neither.
+class EvaluationDispatcher:
+
+    def __init__(
+        self,
+        evaluator: Evaluator,
+        workers: int = 0,
+        max_batch_size: int = 32,
+        batch_window_ms: float = 2.0,
+        max_queue: int = 1024,
+        timeout_s: Optional[float] = 30.0
+    ):
+        if max_batch_size < 1 or max_queue < 1:
+            raise ValueError("max_batch_size and max_queue must be at least 1")
+        self.evaluator = evaluator
+        self.workers = max(0, workers)
+        self.max_batch_size = max_batch_size
+        self.batch_window_ms = batch_window_ms
+        self.max_queue = max_queue
+        self.timeout_s = timeout_s if timeout_s and timeout_s > 0 else None
+
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.batches = 0
+        self.batched_requests = 0
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._queue: Optional["asyncio.Queue[_Queued]"] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._dispatch_task: Optional[asyncio.Task] = None
+        self._tasks: set = set()
+
+    # Starts the worker processes and the dispatch loop on the running event loop
+    async def start(self):
+        if not self.workers or self._pool is not None:
+            return
+        # spawned rather than forked: the server process already runs threads (store
+        # writer, I/O loop) whose locks a fork could copy in a held state
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker
+        )
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.workers)
+        self._dispatch_task = asyncio.get_running_loop().create_task(self._dispatch())
+        # bring every worker up before the first request arrives
+        await asyncio.gather(*(
+            asyncio.wrap_future(self._pool.submit(_ready)) for _ in range(self.workers)
+        ))
+
+    async def close(self):
+        if self._dispatch_task is not None:
+            self._dispatch_task.cancel()
+            self._dispatch_task = None
+        if self._queue is not None:
+            while not self._queue.empty():
+                self._resolve(self._queue.get_nowait(), error=RuntimeError("the evaluation service is shutting down"))
+        if self._pool is not None:
+            pool, self._pool = self._pool, None
+            await asyncio.to_thread(pool.shutdown, True, cancel_futures=True)
+
+    async def evaluate(
+        self,
+        request: EvaluationRequest,
+        profile: bool = False,
+        budget_ms: Optional[float] = None
+    ) -> EvaluationRecord:
+        self._admit(1)
+        try:
+            offloaded = self._offloaded(request)
+        except Exception:
+            self._release(1)
+            raise
+        if not offloaded:
+            work = asyncio.ensure_future(self.evaluator.evaluate_async(request, profile=profile, budget_ms=budget_ms))
+            work.add_done_callback(lambda _: self._release(1))
+            return await self._wait(work)
+
+        return await self._wait(self._enqueue(request, profile, budget_ms))
+
+    async def evaluate_batch(
+        self,
+        requests: List[EvaluationRequest],
+        budget_ms: Optional[float] = None
+    ) -> List[EvaluationRecord]:
+        if not requests:
+            return []
+        self._admit(len(requests))
+
+        local, offloaded = [], []
+        try:
+            for index, request in enumerate(requests):
+                (offloaded if self._offloaded(request) else local).append(index)
+        except Exception:
+            self._release(len(requests))
+            raise
+
+        waiting: List["asyncio.Future[Any]"] = []
+        if local:
+            work = asyncio.ensure_future(
+                self.evaluator.evaluate_batch_async([requests[index] for index in local], budget_ms=budget_ms)
+            )
+            work.add_done_callback(lambda _: self._release(len(local)))
+            waiting.append(work)
+        waiting.extend(self._enqueue(requests[index], False, budget_ms) for index in offloaded)
+
+        done = await self._wait(asyncio.gather(*waiting))
+
+        records: List[Optional[EvaluationRecord]] = [None] * len(requests)
+        if local:
+            for index, record in zip(local, done[0]):
+                records[index] = record
+            done = done[1:]
+        for index, record in zip(offloaded, done):
+            records[index] = record
+        return records
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "admitted": self.admitted,
+            "max_queue": self.max_queue,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "batches": self.batches,
+            "mean_batch_size": self.batched_requests / self.batches if self.batches else 0.0
+        }
+
+    def _offloaded(self, request: EvaluationRequest) -> bool:
+        return self._pool is not None and self.evaluator.rule_set_for(request).cacheable
+
+    def _admit(self, count: int):
+        # a batch larger than the whole queue is only admitted into an empty one
+        if self.admitted and self.admitted + count > self.max_queue:
+            self.rejected += count
+            raise Overloaded(f"evaluation queue is full ({self.admitted} of {self.max_queue} requests admitted)")
+        self.admitted += count
+
+    def _release(self, count: int):
+        self.admitted -= count
+
+    async def _wait(self, work: "asyncio.Future[Any]") -> Any:
+        try:
+            # the work itself is not cancelled: whatever a worker is running finishes,
+            # and admission is released only then
+            return await asyncio.wait_for(asyncio.shield(work), self.timeout_s)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise TimeoutError(f"evaluation did not finish within {self.timeout_s:g}s") from None
+
+    def _enqueue(self, request: EvaluationRequest, profile: bool, budget_ms: Optional[float]) -> "asyncio.Future[EvaluationRecord]":
+        future = asyncio.get_running_loop().create_future()
+        try:
+            cache_key, cached = self.evaluator.lookup(request)
+        except Exception as e:
+            # the request was admitted by the caller, but never reaches _run to be released
+            self._release(1)
+            future.set_exception(e)
+            return future
+        if cached is not None:
+            self._release(1)
+            future.set_result(cached)
+        else:
+            self._queue.put_nowait(_Queued(request, profile, budget_ms, cache_key, future))
+        return future
+
+    async def _dispatch(self):
+        window = self.batch_window_ms / 1000.0
+        while True:
+            await self._slots.acquire()
+            batch = [await self._queue.get()]
+            if window > 0 and self._queue.qsize() < self.max_batch_size - 1:
+                await asyncio.sleep(window)
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[_Queued]):
+        self.batches += 1
+        self.batched_requests += len(batch)
+        try:
+            records, metrics = await asyncio.wrap_future(self._pool.submit(
+                _evaluate_in_worker,
+                [(queued.request, queued.profile, queued.budget_ms) for queued in batch]
+            ))
+        except Exception as e:
+            for queued in batch:
+                self._resolve(queued, error=e)
+        else:
+            self.evaluator.metrics.merge(metrics)
+            for queued, record in zip(batch, records):
+                record.input_data = queued.request
+                try:
+                    self.evaluator.complete(record, queued.cache_key)
+                except Exception as e:
+                    self._resolve(queued, error=e)
+                else:
+                    self._resolve(queued, record)
+        finally:
+            self._release(len(batch))
+            self._slots.release()
+
+    @staticmethod
+    def _resolve(queued: _Queued, record: Optional[EvaluationRecord] = None, error: Optional[Exception] = None):
+        if queued.future.done():
+            return
+        if error is None:
+            queued.future.set_result(record)
+        else:
+            queued.future.set_exception(error)
+            # the caller may have timed out and stopped waiting; mark it retrieved anyway
+            queued.future.exception()
@@ -1,107 +1,678 @@
-from app.schemas.evaluation import EvaluationRequest, EvaluationResponse, RuleResult
-from app.rules.format_rules import EmptyOutputRule, JSONFormatRule, LengthConstraintRule
-from app.rules.content_rules import RequiredKeywordsRule, ForbiddenPhrasesRule
+from app.schemas.evaluation import EvaluationRequest
+from app.rules.base_rule import BaseRule
+from app.rules.registry import DEFAULT_RULE_SET, RuleRegistry, RuleSet, load_registry
+from app.config import settings
+from app.core.analysis import OutputAnalysis, analyze_output
+from app.core.records import EvaluationRecord, RuleRecord, request_input_hash
+from app.core.plan import BUDGET_EXCEEDED, NOT_APPLICABLE, RulePlan
+from app.core.result_cache import ResultCache, request_cache_key
+from app.core.metrics import EvaluationMetrics
+from app.core.io_loop import io_loop
+from app.storage.sqlite_store import EvaluationStore
+from concurrent.futures import CancelledError, Future
 from datetime import datetime
+import asyncio
+import os
+import time
 import uuid
-from typing import Dict, List
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+
+RULE_FAILED = "Rule execution failed"
+
+
+# An async rule started on the shared I/O loop. Its future resolves to
+# (result, outcome, seconds).
+class PendingRule(NamedTuple):
+    rule: BaseRule
+    future: "Future[Tuple[RuleRecord, str, float]]"
+
+
+# An evaluation whose synchronous rules have run. Async rules may still be pending.
+# Their results go into results[index][position] when they are collected.
+class StartedEvaluation:
+    __slots__ = (
+        "requests", "started", "timestamp", "eval_ids", "cache_keys",
+        "responses", "results", "pending", "timings"
+    )
+
+    def __init__(
+        self,
+        requests: List[EvaluationRequest],
+        started: float,
+        eval_ids: List[str],
+        cache_keys: List[Optional[str]],
+        timings: Optional[Dict[str, float]] = None
+    ):
+        self.requests = requests
+        self.started = started
+        self.timestamp = datetime.utcnow()
+        self.eval_ids = eval_ids
+        self.cache_keys = cache_keys
+        # filled from the result cache, or once the rules are done
+        self.responses: List[Optional[EvaluationRecord]] = [None] * len(requests)
+        self.results: Dict[int, List[Optional[RuleRecord]]] = {}
+        self.pending: Dict[Tuple[int, int], PendingRule] = {}
+        self.timings = timings
+
+    # Waits for the pending rules without blocking the caller's event loop
+    async def wait(self):
+        if self.pending:
+            await asyncio.wait([asyncio.wrap_future(pending.future) for pending in self.pending.values()])
+
 
 class Evaluator:
 
-    def __init__(self):
-        self.rules = [
-            EmptyOutputRule(),
-            JSONFormatRule(),
-            LengthConstraintRule(),
-            RequiredKeywordsRule(),
-            ForbiddenPhrasesRule()
-        ]
+    def __init__(
+        self,
+        result_cache: Optional[ResultCache] = None,
+        store: Optional[EvaluationStore] = None,
+        metrics: Optional[EvaluationMetrics] = None,
+        time_budget_ms: Optional[float] = None,
+        registry: Optional[RuleRegistry] = None,
+        large_output_chars: Optional[int] = None
+    ):
+        self.registry = registry or load_registry(settings.rules_config)
+        # every rule set is compiled up front, so requests only look up their plan
+        self.rule_sets = self.registry.compile_all()
+        # checked between rules: a rule that is already running is never interrupted
+        self.time_budget_ms = time_budget_ms
+        self.result_cache = result_cache
+        self.store = store
+        self.metrics = metrics or EvaluationMetrics()
+        # outputs longer than this are analyzed in chunks (see ChunkedAnalysis); 0 never
+        self.large_output_chars = large_output_chars if large_output_chars is not None else settings.large_output_chars
+
+    @property
+    def default_rule_set(self) -> RuleSet:
+        return self.rule_sets[DEFAULT_RULE_SET]
+
+    @property
+    def rules(self) -> List[BaseRule]:
+        return self.default_rule_set.rules
+
+    @property
+    def plan(self) -> RulePlan:
+        return self.default_rule_set.plan
+
+    @property
+    def rules_fingerprint(self) -> str:
+        return self.default_rule_set.fingerprint
+
+    def rule_set_for(self, request: EvaluationRequest) -> RuleSet:
+        return self.rule_sets[self.registry.rule_set_name(request.task_type)]
+
+    def _analysis(self, output: str) -> OutputAnalysis:
+        return analyze_output(output, self.large_output_chars, settings.large_output_chunk_chars)
+
+    def evaluate(
+        self,
+        request: EvaluationRequest,
+        profile: bool = False,
+        budget_ms: Optional[float] = None
+    ) -> EvaluationRecord:
+        return self._finish(self._start(request, profile, budget_ms))
+
+    def evaluate_batch(
+        self,
+        requests: List[EvaluationRequest],
+        budget_ms: Optional[float] = None
+    ) -> List[EvaluationRecord]:
+        if not requests:
+            return []
+        return self._finish_batch(self._start_batch(requests, budget_ms))
+
+    # Same results as evaluate(). The rules run in a worker thread. The event loop only
+    # awaits the async rules (e.g. the LLM judge), so it is never blocked by them.
+    async def evaluate_async(
+        self,
+        request: EvaluationRequest,
+        profile: bool = False,
+        budget_ms: Optional[float] = None
+    ) -> EvaluationRecord:
+        evaluation = await asyncio.to_thread(self._start, request, profile, budget_ms)
+        await evaluation.wait()
+        return await asyncio.to_thread(self._finish, evaluation)
+
+    async def evaluate_batch_async(
+        self,
+        requests: List[EvaluationRequest],
+        budget_ms: Optional[float] = None
+    ) -> List[EvaluationRecord]:
+        if not requests:
+            return []
+        evaluation = await asyncio.to_thread(self._start_batch, requests, budget_ms)
+        await evaluation.wait()
+        return await asyncio.to_thread(self._finish_batch, evaluation)
+
+    # For evaluations run elsewhere, e.g. in worker processes (see app.core.dispatcher):
+    # the result cache lookup evaluate() starts with. Returns the cache key, and the
+    # response if it was a hit.
+    def lookup(self, request: EvaluationRequest) -> Tuple[Optional[str], Optional[EvaluationRecord]]:
+        cache_key = self._cache_key(request)
+        cached = self.result_cache.get(cache_key) if cache_key is not None else None
+        if cached is None:
+            return cache_key, None
+
+        response = self._cached_response(f"eval_{uuid.uuid4().hex[:12]}", datetime.utcnow(), request, cached)
+        if self.store is not None:
+            self.store.submit(response)
+        return cache_key, response
+
+    # ... and what evaluate() ends with: caching and storing the response
+    def complete(self, response: EvaluationRecord, cache_key: Optional[str] = None):
+        if cache_key is not None and not self._uncacheable(response.rule_results):
+            self.result_cache.put(cache_key, self._cache_payload(response))
+        if self.store is not None:
+            self.store.submit(response)
+
+    # Brings a stored evaluation up to date with the current rule set. A stored rule
+    # result is reused when the rule's fingerprint matches the one it was computed with
+    # and the input is unchanged (input_hash, see request_input_hash), unless it was cut
+    # short by the budget or is a rule error (see _transient). Other rules run
+    # again, and so do rules whose prerequisites changed outcome, since that decides
+    # whether they are skipped. Scores are then aggregated again from the reused and new
+    # results, keeping evaluation id and timestamp. Returns the updated record and the
+    # ids of the rules that ran.
+    def reevaluate(
+        self,
+        record: EvaluationRecord,
+        input_hash: Optional[str] = None
+    ) -> Tuple[EvaluationRecord, List[str]]:
+        request = record.input_data
+        rule_set = self.rule_set_for(request)
+        stored_fingerprints = record.rule_fingerprints or {}
+
+        reusable: Dict[str, RuleRecord] = {}
+        if input_hash is not None and input_hash == request_input_hash(request):
+            reusable = {
+                result.rule_id: result for result in record.rule_results
+                if stored_fingerprints.get(result.rule_id) == rule_set.fingerprints.get(result.rule_id)
+                and not self._transient(result)
+            }
+
+        context = self._analysis(request.output)
+        results: List[Optional[RuleRecord]] = [None] * len(rule_set.rules)
+        changed_outcome = set()
+        rerun = []
+
+        for position in rule_set.plan.order:
+            rule = rule_set.rules[position]
+            previous = reusable.get(rule.rule_id)
+            if previous is not None and not changed_outcome.intersection(rule_set.plan.prerequisites[position]):
+                results[position] = previous
+                continue
+
+            reason = self._skip_reason(rule_set, position, request, context, results, None)
+            if reason is not None:
+                results[position] = self._skipped_result(rule, reason)
+            else:
+                results[position] = self._run_rule(rule, request, context)
+            rerun.append(rule.rule_id)
+
+            if previous is None or (previous.passed, previous.skipped) != (results[position].passed, results[position].skipped):
+                changed_outcome.add(position)
+
+        if not rerun and len(record.rule_results) == len(results):
+            return record, rerun
+
+        updated = self._build_response(record.evaluation_id, record.timestamp, request, results, rule_set)
+        return updated, rerun
+
+    # Looks up the result cache and runs the synchronous rules. Async rules are left
+    # pending, for _finish to collect.
+    def _start(self, request: EvaluationRequest, profile: bool, budget_ms: Optional[float]) -> StartedEvaluation:
+        started = time.perf_counter()
+        deadline = self._deadline(started, self._budget(budget_ms))
+        cache_key = self._cache_key(request)
+        evaluation = StartedEvaluation(
+            [request], started, [f"eval_{uuid.uuid4().hex[:12]}"], [cache_key], {} if profile else None
+        )
+
+        cached = self.result_cache.get(cache_key) if cache_key is not None else None
+        if cached is not None:
+            evaluation.responses[0] = self._cached_response(evaluation.eval_ids[0], evaluation.timestamp, request, cached)
+        else:
+            evaluation.results[0] = self._run_rules(
+                request, evaluation.timings, deadline, self.rule_set_for(request), evaluation.pending
+            )
+
+        return evaluation
+
+    def _finish(self, evaluation: StartedEvaluation) -> EvaluationRecord:
+        self._collect_pending(evaluation)
+        request = evaluation.requests[0]
+        response = evaluation.responses[0]
+
+        if response is None:
+            rule_results = evaluation.results[0]
+            rule_set = self.rule_set_for(request)
+            response = self._build_response(evaluation.eval_ids[0], evaluation.timestamp, request, rule_results, rule_set)
+
+            cache_key = evaluation.cache_keys[0]
+            if cache_key is not None and not self._uncacheable(rule_results):
+                self.result_cache.put(cache_key, self._cache_payload(response))
+
+        elapsed = time.perf_counter() - evaluation.started
+        self.metrics.evaluation_latency.observe(elapsed)
+
+        if evaluation.timings is not None:
+            response.profile = {"total_seconds": elapsed, "rules": evaluation.timings}
+
+        if self.store is not None:
+            self.store.submit(response)
+
+        return response
+
+    def _start_batch(self, requests: List[EvaluationRequest], budget_ms: Optional[float]) -> StartedEvaluation:
+        started = time.perf_counter()
+        evaluation = StartedEvaluation(
+            requests, started, self._generate_eval_ids(len(requests)), [self._cache_key(request) for request in requests]
+        )
+
+        pending = []
+        for index, request in enumerate(requests):
+            cache_key = evaluation.cache_keys[index]
+            cached = self.result_cache.get(cache_key) if cache_key is not None else None
+            if cached is not None:
+                evaluation.responses[index] = self._cached_response(
+                    evaluation.eval_ids[index], evaluation.timestamp, request, cached
+                )
+            else:
+                pending.append(index)
+
+        if pending:
+            pending_requests = [requests[index] for index in pending]
+
+            # the budget is per request, so a batch gets the sum for all of its pending requests
+            batch_budget_ms = self._budget(budget_ms)
+            deadline = self._deadline(started, batch_budget_ms * len(pending) if batch_budget_ms else None)
+            pending_rules: Dict[Tuple[int, int], PendingRule] = {}
+            results_by_request = self._run_rules_batch(pending_requests, deadline, pending_rules)
 
-    def evaluate(self, request: EvaluationRequest) -> EvaluationResponse:
-        eval_id = f"eval_{uuid.uuid4().hex[:12]}"
+            for position, index in enumerate(pending):
+                evaluation.results[index] = results_by_request[position]
+            for (position, rule_position), pending_rule in pending_rules.items():
+                evaluation.pending[pending[position], rule_position] = pending_rule
 
-        rule_results = self._run_rules(request)
+        return evaluation
 
-        scores = self._aggregate_scores(rule_results)
+    def _finish_batch(self, evaluation: StartedEvaluation) -> List[EvaluationRecord]:
+        self._collect_pending(evaluation)
+        requests = evaluation.requests
+        responses = evaluation.responses
 
-        overall_score = self._calculate_overall_score(scores)
+        for index, rule_results in evaluation.results.items():
+            rule_set = self.rule_set_for(requests[index])
+            response = self._build_response(evaluation.eval_ids[index], evaluation.timestamp, requests[index], rule_results, rule_set)
+            responses[index] = response
+
+            cache_key = evaluation.cache_keys[index]
+            if cache_key is not None and not self._uncacheable(rule_results):
+                self.result_cache.put(cache_key, self._cache_payload(response))
+
+        elapsed = time.perf_counter() - evaluation.started
+        self.metrics.evaluation_latency.observe(elapsed / len(requests), len(requests))
+
+        if self.store is not None:
+            self.store.submit_many(responses)
+
+        return responses
+
+    def _collect_pending(self, evaluation: StartedEvaluation):
+        for (index, position), pending in evaluation.pending.items():
+            evaluation.results[index][position] = self._collect(pending, evaluation.timings)
+        evaluation.pending.clear()
+
+    def _cache_key(self, request: EvaluationRequest) -> Optional[str]:
+        if self.result_cache is None:
+            return None
+        rule_set = self.rule_set_for(request)
+        if not rule_set.cacheable:
+            return None
+        return request_cache_key(request, rule_set.fingerprint)
+
+    def _cache_payload(self, record: EvaluationRecord) -> Dict[str, Any]:
+        # copies, so later changes to the record never reach the cached entry
+        return {
+            "scores": dict(record.scores),
+            "overall_score": record.overall_score,
+            "failure_labels": list(record.failure_labels),
+            "explanations": dict(record.explanations),
+            "rule_results": [result.to_dict() for result in record.rule_results]
+        }
+
+    def _cached_response(
+        self,
+        eval_id: str,
+        timestamp: datetime,
+        request: EvaluationRequest,
+        payload: Dict[str, Any]
+    ) -> EvaluationRecord:
+        return EvaluationRecord(
+            evaluation_id=eval_id,
+            timestamp=timestamp,
+            scores=dict(payload["scores"]),
+            overall_score=payload["overall_score"],
+            failure_labels=list(payload["failure_labels"]),
+            explanations=dict(payload["explanations"]),
+            rule_results=[RuleRecord.from_dict(result) for result in payload["rule_results"]],
+            input_data=request,
+            cached=True,
+            rule_fingerprints=self.rule_set_for(request).fingerprints
+        )
+
+    def _build_response(
+        self,
+        eval_id: str,
+        timestamp: datetime,
+        request: EvaluationRequest,
+        rule_results: List[RuleRecord],
+        rule_set: RuleSet
+    ) -> EvaluationRecord:
+        scores = self._aggregate_scores(rule_results, rule_set)
+
+        overall_score = self._calculate_overall_score(scores, rule_set)
 
         failure_labels = self._identify_failures(rule_results)
 
         explanations = self._generate_explanations(rule_results, failure_labels)
 
-        response = EvaluationResponse(
+        return EvaluationRecord(
             evaluation_id=eval_id,
-            timestamp=datetime.utcnow(),
+            timestamp=timestamp,
             scores=scores,
             overall_score=overall_score,
             failure_labels=failure_labels,
             explanations=explanations,
             rule_results=rule_results,
-            input_data=request
+            input_data=request,
+            rule_fingerprints=rule_set.fingerprints
         )
 
-        return response
+    def _generate_eval_ids(self, count: int) -> List[str]:
+        # same shape as uuid4().hex[:12], but drawn from the OS in a single call
+        random_hex = os.urandom(6 * count).hex()
+        return [f"eval_{random_hex[i:i + 12]}" for i in range(0, len(random_hex), 12)]
+
+    def _budget(self, budget_ms: Optional[float]) -> Optional[float]:
+        budget_ms = budget_ms if budget_ms is not None else self.time_budget_ms
+        return budget_ms if budget_ms and budget_ms > 0 else None
+
+    def _deadline(self, started: float, budget_ms: Optional[float]) -> Optional[float]:
+        return started + budget_ms / 1000.0 if budget_ms is not None else None
+
+    def _uncacheable(self, rule_results: List[RuleRecord]) -> bool:
+        return any(self._transient(result) for result in rule_results)
+
+    def _transient(self, result: RuleRecord) -> bool:
+        # results cut short by the budget depend on timing and must not be cached or
+        # reused, and neither must rule errors, which may be transient (e.g. an
+        # unreachable judge)
+        return (result.skipped and result.explanation == BUDGET_EXCEEDED) or result.explanation.startswith(RULE_FAILED)
+
+    def _skip_reason(
+        self,
+        rule_set: RuleSet,
+        position: int,
+        request: EvaluationRequest,
+        context: OutputAnalysis,
+        results: List[Optional[RuleRecord]],
+        deadline: Optional[float]
+    ) -> Optional[str]:
+        reason = rule_set.plan.skip_reason(position, results)
+        if reason is not None:
+            return reason
+
+        if deadline is not None and time.perf_counter() > deadline:
+            return BUDGET_EXCEEDED
+
+        try:
+            applies = rule_set.rules[position].applies_to(request, context)
+        except Exception:
+            # let the rule itself run and report the error
+            applies = True
+
+        return None if applies else NOT_APPLICABLE
+
+    # Runs the request's rule set plan; results come back in declaration order. Async
+    # rules are started and overlap the rules after them. Given a pending dict, they are
+    # left in it (keyed by (0, position), with None results). Otherwise they are
+    # collected before returning.
+    def _run_rules(
+        self,
+        request: EvaluationRequest,
+        timings: Optional[Dict[str, float]] = None,
+        deadline: Optional[float] = None,
+        rule_set: Optional[RuleSet] = None,
+        pending: Optional[Dict[Tuple[int, int], PendingRule]] = None
+    ) -> List[Optional[RuleRecord]]:
+        rule_set = rule_set or self.rule_set_for(request)
+        context = self._analysis(request.output)
+        results: List[Optional[RuleRecord]] = [None] * len(rule_set.rules)
+        started: Dict[Tuple[int, int], PendingRule] = {} if pending is None else pending
+
+        for position in rule_set.plan.order:
+            rule = rule_set.rules[position]
+            self._await_prerequisites(rule_set, position, [results], started, timings)
+            reason = self._skip_reason(rule_set, position, request, context, results, deadline)
+            if reason is not None:
+                results[position] = self._skipped_result(rule, reason)
+            elif rule.is_async:
+                started[0, position] = self._start_rule(rule, request, context)
+            else:
+                results[position] = self._run_rule(rule, request, context, timings)
+
+        if pending is None:
+            for (_, position), pending_rule in started.items():
+                results[position] = self._collect(pending_rule, timings)
 
-    def _run_rules(self, request: EvaluationRequest) -> List[RuleResult]:
-        results = []
-
-        for rule in self.rules:
-            try:
-                result = rule.evaluate(request)
-                results.append(result)
-            except Exception as e:
-                results.append(
-                    RuleResult(
-                        rule_id=rule.rule_id,
-                        rule_name=rule.rule_name,
-                        passed=False,
-                        score=0.0,
-                        explanation=f"Rule execution failed: {str(e)}"
-                    )
+        return results
+
+    # Runs a batch grouped by rule set; results come back in request order
+    def _run_rules_batch(
+        self,
+        requests: List[EvaluationRequest],
+        deadline: Optional[float] = None,
+        pending: Optional[Dict[Tuple[int, int], PendingRule]] = None
+    ) -> List[List[Optional[RuleRecord]]]:
+        groups: Dict[str, List[int]] = {}
+        for index, request in enumerate(requests):
+            groups.setdefault(self.registry.rule_set_name(request.task_type), []).append(index)
+
+        results: List[List[Optional[RuleRecord]]] = [[] for _ in requests]
+        for name, indexes in groups.items():
+            group_pending: Optional[Dict[Tuple[int, int], PendingRule]] = None if pending is None else {}
+            group_results = self._run_rule_set_batch(
+                self.rule_sets[name], [requests[index] for index in indexes], deadline, group_pending
+            )
+            for index, rule_results in zip(indexes, group_results):
+                results[index] = rule_results
+            if group_pending:
+                for (item, position), pending_rule in group_pending.items():
+                    pending[indexes[item], position] = pending_rule
+
+        return results
+
+    # Runs one rule set plan over a batch: one pass per rule over the requests it still
+    # applies to. Async rules are started for every request at once, so their clients can
+    # batch the calls. Pending ones are handled as in _run_rules, keyed by (item, position).
+    def _run_rule_set_batch(
+        self,
+        rule_set: RuleSet,
+        requests: List[EvaluationRequest],
+        deadline: Optional[float] = None,
+        pending: Optional[Dict[Tuple[int, int], PendingRule]] = None
+    ) -> List[List[Optional[RuleRecord]]]:
+        contexts = [self._analysis(request.output) for request in requests]
+        results: List[List[Optional[RuleRecord]]] = [[None] * len(rule_set.rules) for _ in requests]
+        started: Dict[Tuple[int, int], PendingRule] = {} if pending is None else pending
+
+        for position in rule_set.plan.order:
+            rule = rule_set.rules[position]
+            self._await_prerequisites(rule_set, position, results, started)
+            active = []
+            for item, (request, context) in enumerate(zip(requests, contexts)):
+                reason = self._skip_reason(rule_set, position, request, context, results[item], deadline)
+                if reason is not None:
+                    results[item][position] = self._skipped_result(rule, reason)
+                else:
+                    active.append(item)
+
+            if active and rule.is_async:
+                for item in active:
+                    started[item, position] = self._start_rule(rule, requests[item], contexts[item])
+            elif active:
+                batch_results = self._run_rule_batch(
+                    rule,
+                    [requests[item] for item in active],
+                    [contexts[item] for item in active]
                 )
+                for item, result in zip(active, batch_results):
+                    results[item][position] = result
+
+        if pending is None:
+            for (item, position), pending_rule in started.items():
+                results[item][position] = self._collect(pending_rule)
 
         return results
 
-    def _aggregate_scores(self, rule_results: List[RuleResult]) -> Dict[str, float]:
-        format_rules = ["empty_output", "json_format", "length_constraint"]
-        content_rules = ["required_keywords", "forbidden_phrases"]
+    def _run_rule(
+        self,
+        rule: BaseRule,
+        request: EvaluationRequest,
+        context: OutputAnalysis,
+        timings: Optional[Dict[str, float]] = None
+    ) -> RuleRecord:
+        started = time.perf_counter()
+        try:
+            result = rule.evaluate_in_context(request, context)
+            outcome = "pass" if result.passed else "fail"
+        except Exception as e:
+            result = self._failed_result(rule, e)
+            outcome = "error"
+
+        elapsed = time.perf_counter() - started
+        self.metrics.record_rule(rule.rule_id, elapsed, outcome)
+        if timings is not None:
+            timings[rule.rule_id] = elapsed
 
-        format_scores = [r.score for r in rule_results if r.rule_id in format_rules]
-        content_scores = [r.score for r in rule_results if r.rule_id in content_rules]
+        return result
 
-        scores = {}
+    def _run_rule_batch(
+        self,
+        rule: BaseRule,
+        requests: List[EvaluationRequest],
+        contexts: List[OutputAnalysis]
+    ) -> List[RuleRecord]:
+        started = time.perf_counter()
+        try:
+            results = rule.evaluate_batch(requests, contexts)
+        except Exception:
+            # isolate the failing item(s) by falling back to per-request execution
+            return [self._run_rule(rule, request, context) for request, context in zip(requests, contexts)]
 
-        if format_scores:
-            scores["format_score"] = sum(format_scores) / len(format_scores)
+        per_request = (time.perf_counter() - started) / len(requests)
+        passed = sum(1 for result in results if result.passed)
+        self.metrics.record_rule(rule.rule_id, per_request, "pass", passed)
+        self.metrics.record_rule(rule.rule_id, per_request, "fail", len(results) - passed)
 
-        if content_scores:
-            scores["content_score"] = sum(content_scores) / len(content_scores)
+        return results
+
+    def _start_rule(self, rule: BaseRule, request: EvaluationRequest, context: OutputAnalysis) -> PendingRule:
+        return PendingRule(rule, io_loop.submit(self._run_rule_async(rule, request, context)))
+
+    async def _run_rule_async(
+        self,
+        rule: BaseRule,
+        request: EvaluationRequest,
+        context: OutputAnalysis
+    ) -> Tuple[RuleRecord, str, float]:
+        started = time.perf_counter()
+        try:
+            result = await rule.evaluate_async(request, context)
+            outcome = "pass" if result.passed else "fail"
+        except Exception as e:
+            result = self._failed_result(rule, e)
+            outcome = "error"
+        return result, outcome, time.perf_counter() - started
+
+    # Blocks until the async rule is done
+    def _collect(self, pending: PendingRule, timings: Optional[Dict[str, float]] = None) -> RuleRecord:
+        try:
+            result, outcome, elapsed = pending.future.result()
+        except CancelledError as e:
+            # e.g. the I/O loop stopped; rule errors themselves come back as results
+            return self._failed_result(pending.rule, e)
+
+        self.metrics.record_rule(pending.rule.rule_id, elapsed, outcome)
+        if timings is not None:
+            timings[pending.rule.rule_id] = elapsed
+        return result
+
+    # A rule only runs once the async rules it depends on have finished: their results
+    # decide whether it is skipped, and it may read them
+    def _await_prerequisites(
+        self,
+        rule_set: RuleSet,
+        position: int,
+        results: List[List[Optional[RuleRecord]]],
+        pending: Dict[Tuple[int, int], PendingRule],
+        timings: Optional[Dict[str, float]] = None
+    ):
+        if not pending:
+            return
+        for required in rule_set.plan.prerequisites[position]:
+            for item, item_results in enumerate(results):
+                pending_rule = pending.pop((item, required), None)
+                if pending_rule is not None:
+                    item_results[required] = self._collect(pending_rule, timings)
+
+    def _failed_result(self, rule: BaseRule, error: Exception) -> RuleRecord:
+        return RuleRecord(rule.rule_id, rule.rule_name, False, 0.0, f"{RULE_FAILED}: {str(error)}")
+
+    def _skipped_result(self, rule: BaseRule, reason: str) -> RuleRecord:
+        self.metrics.record_skip(rule.rule_id)
+        return RuleRecord(rule.rule_id, rule.rule_name, False, 0.0, reason, skipped=True)
+
+    # Mean score per dimension ("format" -> format_score), in order of first appearance
+    def _aggregate_scores(self, rule_results: List[RuleRecord], rule_set: RuleSet) -> Dict[str, float]:
+        dimensions = rule_set.dimensions
+        dimension_scores: Dict[str, List[float]] = {}
+
+        for result in rule_results:
+            dimension = dimensions.get(result.rule_id)
+            if dimension is not None and not result.skipped:
+                dimension_scores.setdefault(dimension, []).append(result.score)
 
-        return scores
+        return {f"{dimension}_score": sum(values) / len(values) for dimension, values in dimension_scores.items()}
 
-    def _calculate_overall_score(self, scores: Dict[str, float]) -> float:
-        if not scores:
+    # Weighted mean of the dimension scores, using the rule set's weights (default 1)
+    def _calculate_overall_score(self, scores: Dict[str, float], rule_set: RuleSet) -> float:
+        weights = {key: rule_set.weight(key[:-len("_score")]) for key in scores}
+        total_weight = sum(weights.values())
+        if not total_weight:
             return 0.0
-        return sum(scores.values()) / len(scores)
+        return sum(score * weights[key] for key, score in scores.items()) / total_weight
 
-    def _identify_failures(self, rule_results: List[RuleResult]) -> List[str]:
+    def _identify_failures(self, rule_results: List[RuleRecord]) -> List[str]:
         failures = []
 
         for result in rule_results:
-            if not result.passed:
+            if not result.passed and not result.skipped:
                 failures.append(result.rule_id)
 
         return failures
 
     def _generate_explanations(
         self,
-        rule_results: List[RuleResult],
+        rule_results: List[RuleRecord],
         failure_labels: List[str]
     ) -> Dict[str, str]:
         explanations = {}
 
         for result in rule_results:
-            if not result.passed:
+            if not result.passed and not result.skipped:
                 explanations[result.rule_id] = result.explanation
 
         return explanations
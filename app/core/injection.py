@@ -0,0 +1,121 @@
+from app.core.digest_cache import DigestCache
+from app.core.matcher import PhrasePattern, get_phrase_pattern
+from functools import lru_cache
+from itertools import product
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+import json
+import os
+import re
+import string
+import unicodedata
+
+DEFAULT_SIGNATURES = os.path.join(os.path.dirname(os.path.dirname(__file__)), "rules", "injection_signatures.json")
+SCAN_TARGETS = ("prompt", "output")
+
+# Characters that render as nothing and are used to split trigger phrases
+INVISIBLE_PATTERN = re.compile("[\u00ad\u180e\u200b-\u200d\u2060\ufeff]")
+ALTERNATIVES_PATTERN = re.compile(r"\{([^{}]*)\}")
+# Split off as tokens of their own; includes typographic quotes and dashes NFKC keeps
+PUNCTUATION = string.punctuation + "\u2018\u2019\u201c\u201d\u00ab\u00bb\u2013\u2014\u2026"
+
+
+# Text as the signatures are matched: NFKC-folded (full-width and other compatibility
+# forms become plain letters), invisible characters removed, lowercased, punctuation
+# split off, and tokens joined by single spaces after a leading one. Every phrase then
+# starts with the same literal space, which the regex engine locates with a fast
+# substring search instead of attempting a match at every character.
+def normalize_text(text: str) -> str:
+    if not text.isascii():
+        if not unicodedata.is_normalized("NFKC", text):
+            text = unicodedata.normalize("NFKC", text)
+        text = INVISIBLE_PATTERN.sub("", text)
+    text = text.lower()
+    for mark in PUNCTUATION:
+        if mark in text:
+            text = text.replace(mark, f" {mark} ")
+    return " " + " ".join(text.split())
+
+
+# Expands "{ignore|disregard} {all |}previous instructions" into every literal phrase
+# it stands for
+def expand_template(template: str) -> List[str]:
+    parts = ALTERNATIVES_PATTERN.split(template)
+    choices = [[part] if index % 2 == 0 else part.split("|") for index, part in enumerate(parts)]
+    return list(dict.fromkeys(" ".join("".join(combination).lower().split()) for combination in product(*choices)))
+
+
+class Signature(NamedTuple):
+    id: str
+    category: str
+    targets: Tuple[str, ...]
+
+
+class SignatureHit(NamedTuple):
+    signature: Signature
+    phrase: str
+    position: int
+
+
+# A versioned set of injection signatures, each a list of phrase templates, compiled
+# into one PhrasePattern. Scanning a text is a single pass whatever the number of
+# signatures. Prompts repeat across requests, so their hits are cached per prompt.
+class SignatureSet:
+
+    def __init__(self, version: str, signatures: Sequence[Dict]):
+        self.version = str(version)
+        self.signatures: List[Signature] = []
+        # normalized phrase -> signatures using it, and the phrase as written
+        self._owners: Dict[str, List[Signature]] = {}
+        self._phrases: Dict[str, str] = {}
+
+        for spec in signatures:
+            targets = tuple(spec.get("scan", SCAN_TARGETS))
+            unknown = [target for target in targets if target not in SCAN_TARGETS]
+            if unknown:
+                raise ValueError(f"signature '{spec.get('id')}' scans unknown target(s): {', '.join(unknown)}")
+            if not spec.get("id") or not spec.get("patterns"):
+                raise ValueError("every signature needs an 'id' and at least one pattern")
+
+            signature = Signature(spec["id"], spec.get("category", spec["id"]), targets)
+            self.signatures.append(signature)
+            for template in spec["patterns"]:
+                for phrase in expand_template(template):
+                    key = normalize_text(phrase)
+                    self._owners.setdefault(key, []).append(signature)
+                    self._phrases.setdefault(key, phrase)
+
+        self.pattern: PhrasePattern = get_phrase_pattern(sorted(self._owners))
+        self.prompt_hits: DigestCache[List[SignatureHit]] = DigestCache(lambda prompt: self.scan(prompt, "prompt"))
+
+    def __len__(self) -> int:
+        return len(self._owners)
+
+    # Signatures found in text, in order of first occurrence, each with its first
+    # phrase and that phrase's offset in the normalized text
+    def scan(self, text: str, target: str) -> List[SignatureHit]:
+        return self._hits(self.pattern.first_matches(normalize_text(text)), target)
+
+    # scan of the text the pieces join up to. Each piece must end in whitespace (except
+    # the last) so that pieces normalize independently; blank ones normalize to " "
+    # and are left out, as text.split() drops their whitespace.
+    def scan_pieces(self, pieces: Iterable[str], target: str) -> List[SignatureHit]:
+        normalized = (piece for piece in map(normalize_text, pieces) if piece != " ")
+        return self._hits(self.pattern.first_matches_pieces(normalized), target)
+
+    def _hits(self, matches: Dict[str, int], target: str) -> List[SignatureHit]:
+        hits: Dict[str, SignatureHit] = {}
+        for key, position in matches.items():
+            for signature in self._owners[key]:
+                if target in signature.targets and signature.id not in hits:
+                    hits[signature.id] = SignatureHit(signature, self._phrases[key], position)
+        return list(hits.values())
+
+    def scan_prompt(self, prompt: str) -> List[SignatureHit]:
+        return self.prompt_hits.get(prompt)
+
+
+@lru_cache(maxsize=16)
+def load_signature_set(path: Optional[str] = None) -> SignatureSet:
+    with open(path or DEFAULT_SIGNATURES, encoding="utf-8") as f:
+        config = json.load(f)
+    return SignatureSet(config.get("version", "1"), config.get("signatures", []))
@@ -0,0 +1,53 @@
+from concurrent.futures import Future
+from typing import Awaitable, Optional, TypeVar
+import asyncio
+import threading
+
+T = TypeVar("T")
+
+
+# An event loop on a daemon thread, shared by rules that wait on I/O (see
+# BaseRule.is_async). Their clients live on this loop, so pooled connections, timers
+# and batching keep running whichever thread or loop is evaluating, and however busy it
+# is with CPU-bound rules. Coroutines are submitted from any thread and come back as
+# concurrent futures.
+class IOLoop:
+
+    def __init__(self, name: str = "rule-io"):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                started = threading.Event()
+                self._thread = threading.Thread(target=self._run, args=(loop, started), name=self.name, daemon=True)
+                self._thread.start()
+                started.wait()
+                self._loop = loop
+            return self._loop
+
+    @staticmethod
+    def _run(loop: asyncio.AbstractEventLoop, started: threading.Event):
+        asyncio.set_event_loop(loop)
+        loop.call_soon(started.set)
+        loop.run_forever()
+
+    def submit(self, coroutine: Awaitable[T]) -> "Future[T]":
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def stop(self):
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+
+io_loop = IOLoop()
@@ -0,0 +1,522 @@
+from functools import lru_cache
+from itertools import accumulate
+from decimal import Decimal, localcontext
+from typing import Any, Callable, Dict, List, Optional
+import json
+import json.decoder
+import json.scanner
+import math
+import os
+import re
+import threading
+
+# Keywords that carry no validation meaning and are accepted as-is
+ANNOTATION_KEYWORDS = {
+    "$schema", "$id", "$comment", "title", "description", "default", "examples",
+    "definitions", "$defs", "format", "readOnly", "writeOnly", "deprecated"
+}
+
+JSON_TYPES = {
+    "object": lambda value: isinstance(value, dict),
+    "array": lambda value: isinstance(value, list),
+    "string": lambda value: isinstance(value, str),
+    "integer": lambda value: (
+        isinstance(value, int) and not isinstance(value, bool)
+        or isinstance(value, float) and value.is_integer()
+    ),
+    "number": lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    "boolean": lambda value: isinstance(value, bool),
+    "null": lambda value: value is None
+}
+
+STRING_PATTERN = re.compile(rb'"[^"]*"')
+# Bytes that matter for nesting: quotes (to tell string contents apart) and brackets
+STRUCTURE_BYTES = b'"[]{}'
+NON_STRUCTURE_BYTES = bytes(byte for byte in range(256) if byte not in STRUCTURE_BYTES)
+BRACKET_TABLE = bytes.maketrans(b"[{]}", b"(())")
+DEPTH_STEPS = [0] * 256
+DEPTH_STEPS[ord("(")] = 1
+DEPTH_STEPS[ord(")")] = -1
+# Innermost-pair removal passes to try before falling back to a running sum
+SHALLOW_PASSES = 8
+JSON_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# Containers this many levels down are parsed whole (see json_valid)
+WALKED_LEVELS = 2
+# The parser json.loads uses, applied to one value at a given offset
+_scan_value = json.scanner.make_scanner(json.JSONDecoder())
+
+Check = Callable[[Any], None]
+
+
+class SchemaViolation(Exception):
+
+    def __init__(self, message: str):
+        super().__init__(message)
+        self.message = message
+        self.path: List[str] = []
+
+    def inside(self, segment: str) -> "SchemaViolation":
+        self.path.append(segment)
+        return self
+
+    # JSONPath-like location of the offending value, e.g. $.items[3].id
+    @property
+    def location(self) -> str:
+        return "$" + "".join(reversed(self.path))
+
+
+# Bracket nesting depth of a JSON text, computed without parsing it and without a
+# Python-level loop over characters. Everything but quotes and brackets is dropped in
+# one translate; adjacent quote pairs (strings without brackets) are then removed, which
+# keeps quote parity, so the few strings left can be cut out with a regex. Typical
+# documents are a few levels deep and are measured by removing one innermost level per
+# pass; deeper ones fall back to a running sum. Unbalanced brackets (truncated output)
+# can make the result low; such text fails to parse anyway.
+def json_depth(text: str) -> int:
+    if "[" not in text and "{" not in text:
+        return 0
+
+    data = text.encode("utf-8", "surrogatepass")
+    if b"\\" in data:
+        # Left to right, a backslash always opens a two-byte escape; only \\ and \" matter
+        data = data.replace(b"\\\\", b"").replace(b'\\"', b"")
+
+    structure = data.translate(None, NON_STRUCTURE_BYTES)
+    if b'"' in structure:
+        structure = STRING_PATTERN.sub(b"", structure.replace(b'""', b""))
+    brackets = structure.translate(BRACKET_TABLE)
+
+    for depth in range(SHALLOW_PASSES):
+        if not brackets:
+            return depth
+        reduced = brackets.replace(b"()", b"")
+        if len(reduced) == len(brackets):
+            return depth
+        brackets = reduced
+
+    return SHALLOW_PASSES + max(0, max(accumulate(map(DEPTH_STEPS.__getitem__, brackets)), default=0))
+
+
+# Whether text[start:end] is a JSON document json.loads would accept, at most max_depth
+# levels deep, checked without building it. The outer WALKED_LEVELS levels of
+# containers are walked here; each value inside them is parsed on its own by the C
+# scanner and dropped, so memory stays at the size of the largest such value (a
+# record of a top-level array, say) rather than of the document.
+def json_valid(text: str, start: int = 0, end: Optional[int] = None, max_depth: int = 256) -> bool:
+    end = len(text) if end is None else end
+
+    def skip(at: int) -> int:
+        return JSON_WHITESPACE.match(text, at, end).end()
+
+    # closing characters of the containers being walked
+    open_containers: List[str] = []
+    position = skip(start)
+
+    try:
+        while True:
+            # a value starts at position
+            opening = text[position:position + 1]
+            if opening in ("[", "{") and len(open_containers) < WALKED_LEVELS:
+                if len(open_containers) >= max_depth:
+                    return False
+                closing = "]" if opening == "[" else "}"
+                position = skip(position + 1)
+                if text.startswith(closing, position):
+                    position += 1
+                else:
+                    open_containers.append(closing)
+                    if closing == "}":
+                        position = _member_value(text, position, skip)
+                    continue
+            else:
+                _, value_end = _scan_value(text, position)
+                if opening in ("[", "{") and len(open_containers) + json_depth(text[position:value_end]) > max_depth:
+                    return False
+                position = value_end
+
+            # a value ended at position
+            while True:
+                position = skip(position)
+                if not open_containers:
+                    return position == end
+                following = text[position:position + 1]
+                if following == ",":
+                    position = skip(position + 1)
+                    if open_containers[-1] == "}":
+                        position = _member_value(text, position, skip)
+                    break
+                if following != open_containers[-1]:
+                    return False
+                open_containers.pop()
+                position += 1
+    except (StopIteration, ValueError, RecursionError):
+        return False
+
+
+# Offset of the value of the object member whose name starts at position
+def _member_value(text: str, position: int, skip: Callable[[int], int]) -> int:
+    if not text.startswith('"', position):
+        raise ValueError("expected a member name")
+    _, position = json.decoder.scanstring(text, position + 1)
+    position = skip(position)
+    if not text.startswith(":", position):
+        raise ValueError("expected ':'")
+    return skip(position + 1)
+
+
+# A JSON Schema compiled into a tree of check functions. Validation raises
+# SchemaViolation on the first mismatch instead of collecting every error.
+# Supports the commonly used subset of draft 7 / 2020-12: type, enum, const,
+# properties, required, additionalProperties, items, min/maxItems, uniqueItems,
+# min/maxLength, pattern, minimum, maximum, exclusiveMinimum/Maximum, multipleOf,
+# min/maxProperties, allOf, anyOf, oneOf, not and local $ref.
+class CompiledSchema:
+
+    def __init__(self, schema: Any):
+        self.schema = schema
+        self._refs: Dict[str, Check] = {}
+        self._check = self._compile(schema)
+
+    def validate(self, value: Any):
+        self._check(value)
+
+    def _compile(self, schema: Any) -> Check:
+        if schema is True or schema == {}:
+            return _accept
+        if schema is False:
+            return _reject
+        if not isinstance(schema, dict):
+            raise ValueError(f"schema must be an object or boolean, got {type(schema).__name__}")
+
+        checks: List[Check] = []
+        for keyword, argument in schema.items():
+            if keyword in ANNOTATION_KEYWORDS:
+                continue
+            compile_keyword = KEYWORDS.get(keyword)
+            if compile_keyword is None:
+                if keyword in ("properties", "additionalProperties"):
+                    continue
+                raise ValueError(f"unsupported schema keyword '{keyword}'")
+            checks.append(compile_keyword(self, argument, schema))
+
+        if "properties" in schema or "additionalProperties" in schema:
+            checks.append(self._compile_properties(schema))
+
+        if not checks:
+            return _accept
+        if len(checks) == 1:
+            return checks[0]
+
+        def check_all(value):
+            for check in checks:
+                check(value)
+        return check_all
+
+    def _compile_properties(self, schema: Dict[str, Any]) -> Check:
+        properties = {key: self._compile(sub) for key, sub in schema.get("properties", {}).items()}
+        additional = schema.get("additionalProperties", True)
+        check_additional = None if additional is True else self._compile(additional)
+
+        def check_properties(value):
+            if not isinstance(value, dict):
+                return
+            for key, item in value.items():
+                check = properties.get(key, check_additional)
+                if check is None:
+                    continue
+                try:
+                    check(item)
+                except SchemaViolation as e:
+                    if key not in properties and additional is False:
+                        raise SchemaViolation(f"unexpected property '{key}'") from None
+                    raise e.inside(f".{key}")
+        return check_properties
+
+    def _compile_ref(self, ref: Any, schema: Dict[str, Any]) -> Check:
+        if not isinstance(ref, str) or not ref.startswith("#"):
+            raise ValueError(f"only local $ref ('#/...') is supported, got {ref!r}")
+
+        # resolved on first use so recursive schemas compile
+        def check_ref(value):
+            check = self._refs.get(ref)
+            if check is None:
+                check = self._refs[ref] = self._compile(self._resolve(ref))
+            check(value)
+        self._resolve(ref)
+        return check_ref
+
+    def _resolve(self, ref: str) -> Any:
+        target = self.schema
+        for part in ref[1:].split("/")[1:]:
+            part = part.replace("~1", "/").replace("~0", "~")
+            try:
+                target = target[int(part)] if isinstance(target, list) else target[part]
+            except (KeyError, IndexError, ValueError, TypeError):
+                raise ValueError(f"unresolvable $ref {ref!r}") from None
+        return target
+
+
+def _accept(value: Any):
+    pass
+
+
+def _reject(value: Any):
+    raise SchemaViolation("no value is allowed here")
+
+
+def _type_name(value: Any) -> str:
+    for name in ("null", "boolean", "integer", "number", "string", "array", "object"):
+        if JSON_TYPES[name](value):
+            return name
+    return type(value).__name__
+
+
+def _canonical(value: Any) -> str:
+    return json.dumps(value, sort_keys=True)
+
+
+def _compile_type(compiled: CompiledSchema, argument: Any, schema: Dict[str, Any]) -> Check:
+    names = [argument] if isinstance(argument, str) else list(argument)
+    unknown = [name for name in names if name not in JSON_TYPES]
+    if unknown:
+        raise ValueError(f"unknown type {unknown[0]!r}")
+    predicates = [JSON_TYPES[name] for name in names]
+    expected = " or ".join(names)
+
+    def check_type(value):
+        for predicate in predicates:
+            if predicate(value):
+                return
+        raise SchemaViolation(f"expected {expected}, got {_type_name(value)}")
+    return check_type
+
+
+def _compile_enum(compiled: CompiledSchema, argument: Any, schema: Dict[str, Any]) -> Check:
+    allowed = {_canonical(item) for item in argument}
+
+    def check_enum(value):
+        if _canonical(value) not in allowed:
+            raise SchemaViolation(f"value is not one of the {len(allowed)} allowed values")
+    return check_enum
+
+
+def _compile_const(compiled: CompiledSchema, argument: Any, schema: Dict[str, Any]) -> Check:
+    expected = _canonical(argument)
+
+    def check_const(value):
+        if _canonical(value) != expected:
+            raise SchemaViolation(f"expected constant {expected}")
+    return check_const
+
+
+def _compile_required(compiled: CompiledSchema, argument: Any, schema: Dict[str, Any]) -> Check:
+    required = list(argument)
+
+    def check_required(value):
+        if isinstance(value, dict):
+            for key in required:
+                if key not in value:
+                    raise SchemaViolation(f"missing required property '{key}'")
+    return check_required
+
+
+def _compile_items(compiled: CompiledSchema, argument: Any, schema: Dict[str, Any]) -> Check:
+    if isinstance(argument, list):
+        raise ValueError("tuple-style 'items' arrays are not supported")
+    check_item = compiled._compile(argument)
+
+    def check_items(value):
+        if isinstance(value, list):
+            for index, item in enumerate(value):
+                try:
+                    check_item(item)
+                except SchemaViolation as e:
+                    raise e.inside(f"[{index}]")
+    return check_items
+
+
+def _compile_unique_items(compiled: CompiledSchema, argument: Any, schema: Dict[str, Any]) -> Check:
+    if not argument:
+        return _accept
+
+    def check_unique_items(value):
+        if isinstance(value, list) and len({_canonical(item) for item in value}) < len(value):
+            raise SchemaViolation("array items are not unique")
+    return check_unique_items
+
+
+def _itself(value: Any) -> Any:
+    return value
+
+
+def _bound(kind: type, measure: Callable[[Any], float], fails: Callable[[float, float], bool], message: str):
+    def compile_bound(compiled: CompiledSchema, argument: Any, schema: Dict[str, Any]) -> Check:
+        def check_bound(value):
+            if isinstance(value, kind) and not isinstance(value, bool) and fails(measure(value), argument):
+                raise SchemaViolation(message.format(limit=argument, actual=measure(value)))
+        return check_bound
+    return compile_bound
+
+
+def _compile_multiple_of(compiled: CompiledSchema, argument: Any, schema: Dict[str, Any]) -> Check:
+    if isinstance(argument, bool) or not isinstance(argument, (int, float)) or not argument > 0 or math.isinf(argument):
+        raise ValueError(f"multipleOf must be a finite number greater than 0, got {argument!r}")
+
+    def check_multiple_of(value):
+        if isinstance(value, (int, float)) and not isinstance(value, bool) and not _is_multiple(value, argument):
+            raise SchemaViolation(f"{value} is not a multiple of {argument}")
+    return check_multiple_of
+
+
+def _is_multiple(value: Any, argument: Any) -> bool:
+    if isinstance(value, float) and not math.isfinite(value):
+        return False
+    try:
+        quotient = value / argument
+    except OverflowError:
+        quotient = math.inf
+    if abs(quotient) < 2 ** 53:
+        # tolerate float representation error, e.g. 0.3 / 0.1
+        return abs(quotient - round(quotient)) <= 1e-9
+
+    # the quotient overflowed or is too large for a float to hold a fraction: decide on
+    # the numbers as written, with enough digits for the whole quotient
+    value, argument = Decimal(repr(value)), Decimal(repr(argument))
+    with localcontext() as context:
+        context.prec = max(28, value.adjusted() - argument.adjusted() + len(argument.as_tuple().digits) + 2)
+        return value % argument == 0
+
+
+def _compile_pattern(compiled: CompiledSchema, argument: Any, schema: Dict[str, Any]) -> Check:
+    pattern = re.compile(argument)
+
+    def check_pattern(value):
+        if isinstance(value, str) and not pattern.search(value):
+            raise SchemaViolation(f"string does not match pattern {argument!r}")
+    return check_pattern
+
+
+def _compile_all_of(compiled: CompiledSchema, argument: Any, schema: Dict[str, Any]) -> Check:
+    checks = [compiled._compile(sub) for sub in argument]
+
+    def check_all_of(value):
+        for check in checks:
+            check(value)
+    return check_all_of
+
+
+def _matching(checks: List[Check], value: Any, stop_after: int) -> int:
+    matched = 0
+    for check in checks:
+        try:
+            check(value)
+        except SchemaViolation:
+            continue
+        matched += 1
+        if matched >= stop_after:
+            break
+    return matched
+
+
+def _compile_any_of(compiled: CompiledSchema, argument: Any, schema: Dict[str, Any]) -> Check:
+    checks = [compiled._compile(sub) for sub in argument]
+
+    def check_any_of(value):
+        if not _matching(checks, value, 1):
+            raise SchemaViolation(f"value matches none of the {len(checks)} anyOf schemas")
+    return check_any_of
+
+
+def _compile_one_of(compiled: CompiledSchema, argument: Any, schema: Dict[str, Any]) -> Check:
+    checks = [compiled._compile(sub) for sub in argument]
+
+    def check_one_of(value):
+        matched = _matching(checks, value, 2)
+        if matched != 1:
+            raise SchemaViolation(f"value matches {'none' if not matched else 'more than one'} of the oneOf schemas")
+    return check_one_of
+
+
+def _compile_not(compiled: CompiledSchema, argument: Any, schema: Dict[str, Any]) -> Check:
+    check = compiled._compile(argument)
+
+    def check_not(value):
+        if _matching([check], value, 1):
+            raise SchemaViolation("value matches a schema it must not match")
+    return check_not
+
+
+KEYWORDS: Dict[str, Callable[[CompiledSchema, Any, Dict[str, Any]], Check]] = {
+    "type": _compile_type,
+    "enum": _compile_enum,
+    "const": _compile_const,
+    "required": _compile_required,
+    "items": _compile_items,
+    "uniqueItems": _compile_unique_items,
+    "minItems": _bound(list, len, lambda actual, limit: actual < limit, "array has {actual} items, fewer than {limit}"),
+    "maxItems": _bound(list, len, lambda actual, limit: actual > limit, "array has {actual} items, more than {limit}"),
+    "minLength": _bound(str, len, lambda actual, limit: actual < limit, "string has {actual} characters, fewer than {limit}"),
+    "maxLength": _bound(str, len, lambda actual, limit: actual > limit, "string has {actual} characters, more than {limit}"),
+    "minProperties": _bound(dict, len, lambda actual, limit: actual < limit, "object has {actual} properties, fewer than {limit}"),
+    "maxProperties": _bound(dict, len, lambda actual, limit: actual > limit, "object has {actual} properties, more than {limit}"),
+    "minimum": _bound((int, float), _itself, lambda actual, limit: actual < limit, "{actual} is less than the minimum of {limit}"),
+    "maximum": _bound((int, float), _itself, lambda actual, limit: actual > limit, "{actual} is greater than the maximum of {limit}"),
+    "exclusiveMinimum": _bound((int, float), _itself, lambda actual, limit: actual <= limit, "{actual} is not greater than {limit}"),
+    "exclusiveMaximum": _bound((int, float), _itself, lambda actual, limit: actual >= limit, "{actual} is not less than {limit}"),
+    "multipleOf": _compile_multiple_of,
+    "pattern": _compile_pattern,
+    "allOf": _compile_all_of,
+    "anyOf": _compile_any_of,
+    "oneOf": _compile_one_of,
+    "not": _compile_not,
+    "$ref": CompiledSchema._compile_ref
+}
+
+
+@lru_cache(maxsize=256)
+def _compile_canonical(canonical: str) -> CompiledSchema:
+    return CompiledSchema(json.loads(canonical))
+
+
+# Compiled schemas are cached per canonical schema document, so each schema is compiled once
+# no matter how many requests carry it inline. Raises ValueError for invalid or unsupported schemas.
+def compile_schema(schema: Any) -> CompiledSchema:
+    try:
+        return _compile_canonical(_canonical(schema))
+    except re.error as e:
+        raise ValueError(f"invalid pattern: {e}") from None
+    except (TypeError, AttributeError) as e:
+        raise ValueError(f"malformed schema: {e}") from None
+
+
+# Named schemas requests can refer to with meta["json_schema_id"]
+class SchemaRegistry:
+
+    def __init__(self):
+        self._schemas: Dict[str, CompiledSchema] = {}
+        self._lock = threading.Lock()
+
+    def register(self, schema_id: str, schema: Any) -> CompiledSchema:
+        compiled = compile_schema(schema)
+        with self._lock:
+            self._schemas[schema_id] = compiled
+        return compiled
+
+    def get(self, schema_id: str) -> Optional[CompiledSchema]:
+        return self._schemas.get(schema_id)
+
+    # Registers every <schema_id>.json file in a directory
+    def load_directory(self, path: str) -> List[str]:
+        loaded = []
+        for name in sorted(os.listdir(path)):
+            if name.endswith(".json"):
+                with open(os.path.join(path, name)) as handle:
+                    self.register(name[:-len(".json")], json.load(handle))
+                loaded.append(name[:-len(".json")])
+        return loaded
+
+    def ids(self) -> List[str]:
+        return sorted(self._schemas)
+
+
+schema_registry = SchemaRegistry()
@@ -0,0 +1,245 @@
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional
+import asyncio
+import hashlib
+import json
+
+import httpx
+
+JUDGE_SYSTEM_PROMPT = (
+    "You are an impartial evaluator. The user message is a JSON object with an \"items\" list; "
+    "each item has an id, a rubric, a prompt and the output a model gave for it. Grade every "
+    "output against its rubric. Reply with a JSON object only: "
+    "{\"verdicts\": [{\"id\": <item id>, \"score\": <number from 0 to 1>, \"reason\": <one sentence>}]} "
+    "with exactly one verdict per item."
+)
+
+
+class JudgeVerdict(NamedTuple):
+    score: float
+    reason: str
+
+
+class _JudgeItem(NamedTuple):
+    key: bytes
+    prompt: str
+    output: str
+    rubric: str
+    future: "asyncio.Future[JudgeVerdict]"
+
+
+def verdict_key(prompt: str, output: str, rubric: str) -> bytes:
+    data = json.dumps([prompt, output, rubric], ensure_ascii=False).encode("utf-8", "surrogatepass")
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+# Builds the chat request for one call. Items are numbered by position in the batch.
+def judge_messages(items: List[_JudgeItem]) -> List[Dict[str, str]]:
+    payload = {
+        "items": [
+            {"id": index, "rubric": item.rubric, "prompt": item.prompt, "output": item.output}
+            for index, item in enumerate(items)
+        ]
+    }
+    return [
+        {"role": "system", "content": JUDGE_SYSTEM_PROMPT},
+        {"role": "user", "content": json.dumps(payload, ensure_ascii=False)}
+    ]
+
+
+# Verdicts by item id from the judge's reply. Items the reply leaves out are missing
+# from the result.
+def parse_verdicts(content: str) -> Dict[int, JudgeVerdict]:
+    try:
+        reply = json.loads(content)
+    except ValueError:
+        raise ValueError("judge reply is not valid JSON") from None
+    verdicts = reply.get("verdicts") if isinstance(reply, dict) else None
+    if not isinstance(verdicts, list):
+        raise ValueError("judge reply has no 'verdicts' list")
+
+    parsed = {}
+    for verdict in verdicts:
+        if not isinstance(verdict, dict) or not isinstance(verdict.get("id"), int):
+            continue
+        try:
+            score = min(1.0, max(0.0, float(verdict.get("score"))))
+        except (TypeError, ValueError):
+            continue
+        parsed[verdict["id"]] = JudgeVerdict(score, str(verdict.get("reason") or "").strip())
+    return parsed
+
+
+# Client for an OpenAI-compatible chat completions endpoint used as a judge.
+# - Calls share one connection pool, and at most max_in_flight run at once.
+# - Concurrent requests for the same (prompt, output, rubric) share one pending verdict.
+# - Items queued within batch_window_ms go out together, up to batch_size per call.
+# - Verdicts are kept in an LRU keyed by a digest of (prompt, output, rubric).
+# All methods must run on one event loop, normally the shared I/O loop (see
+# app.core.io_loop). The client needs no locks because of that.
+class JudgeClient:
+
+    def __init__(
+        self,
+        base_url: str,
+        model: str,
+        api_key: Optional[str] = None,
+        max_in_flight: int = 8,
+        batch_size: int = 8,
+        batch_window_ms: float = 10.0,
+        timeout_s: float = 30.0,
+        cache_size: int = 10000,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        if max_in_flight < 1 or batch_size < 1:
+            raise ValueError("max_in_flight and batch_size must be at least 1")
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.api_key = api_key
+        self.max_in_flight = max_in_flight
+        self.batch_size = batch_size
+        self.batch_window_ms = batch_window_ms
+        self.timeout_s = timeout_s
+        self.cache_size = cache_size
+        self._transport = transport
+
+        # created on first use, on the loop that uses them
+        self._client: Optional[httpx.AsyncClient] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._cache: "OrderedDict[bytes, JudgeVerdict]" = OrderedDict()
+        self._inflight: Dict[bytes, "asyncio.Future[JudgeVerdict]"] = {}
+        self._queue: List[_JudgeItem] = []
+        self._flush_timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+
+        self.calls = 0
+        self.items_sent = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+        self.failures = 0
+        self.in_flight = 0
+
+    async def judge(self, prompt: str, output: str, rubric: str) -> JudgeVerdict:
+        key = verdict_key(prompt, output, rubric)
+
+        verdict = self._cache.get(key)
+        if verdict is not None:
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+            return verdict
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[key] = future
+            self._enqueue(_JudgeItem(key, prompt, output, rubric, future))
+
+        # one waiter giving up (e.g. on a timeout) must not cancel the verdict for the others
+        return await asyncio.shield(future)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "items_sent": self.items_sent,
+            "in_flight": self.in_flight,
+            "queued": len(self._queue),
+            "coalesced": self.coalesced,
+            "cache_size": len(self._cache),
+            "cache_hits": self.cache_hits,
+            "failures": self.failures
+        }
+
+    def _enqueue(self, item: _JudgeItem):
+        self._queue.append(item)
+        if len(self._queue) >= self.batch_size:
+            self._flush()
+        elif self._flush_timer is None:
+            self._flush_timer = asyncio.get_running_loop().call_later(self.batch_window_ms / 1000.0, self._flush)
+
+    def _flush(self):
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+
+        while self._queue:
+            batch, self._queue = self._queue[:self.batch_size], self._queue[self.batch_size:]
+            task = asyncio.get_running_loop().create_task(self._send(batch))
+            # the loop only keeps weak references to tasks
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: List[_JudgeItem]):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+
+        try:
+            async with self._slots:
+                self.in_flight += 1
+                try:
+                    verdicts = await self._call(batch)
+                finally:
+                    self.in_flight -= 1
+        except Exception as e:
+            self.failures += 1
+            verdicts = {}
+            error = e
+        else:
+            error = None
+
+        for index, item in enumerate(batch):
+            del self._inflight[item.key]
+            if item.future.done():
+                continue
+            verdict = verdicts.get(index)
+            if verdict is not None:
+                self._remember(item.key, verdict)
+                item.future.set_result(verdict)
+            else:
+                item.future.set_exception(error or ValueError("judge reply has no verdict for this item"))
+            # nobody may be waiting any more; mark the exception as retrieved either way
+            item.future.exception()
+
+    async def _call(self, batch: List[_JudgeItem]) -> Dict[int, JudgeVerdict]:
+        response = await self._http().post(
+            "/chat/completions",
+            json={
+                "model": self.model,
+                "temperature": 0,
+                "response_format": {"type": "json_object"},
+                "messages": judge_messages(batch)
+            }
+        )
+        response.raise_for_status()
+        self.calls += 1
+        self.items_sent += len(batch)
+
+        try:
+            content = response.json()["choices"][0]["message"]["content"]
+        except (ValueError, KeyError, IndexError, TypeError):
+            raise ValueError("judge response is not a chat completion") from None
+        return parse_verdicts(content)
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else None
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=headers,
+                timeout=self.timeout_s,
+                limits=httpx.Limits(max_connections=self.max_in_flight, max_keepalive_connections=self.max_in_flight),
+                transport=self._transport
+            )
+        return self._client
+
+    def _remember(self, key: bytes, verdict: JudgeVerdict):
+        self._cache[key] = verdict
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
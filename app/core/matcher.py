@@ -0,0 +1,265 @@
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+import re
+
+# Below this many patterns a few C-level str.find scans beat a Python-level automaton walk
+SMALL_SET_THRESHOLD = 16
+
+
+# Aho-Corasick automaton over a fixed set of literal patterns.
+# Matching is case-sensitive; callers lowercase both sides when they need case-insensitive matching.
+class PhraseMatcher:
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: Tuple[str, ...] = tuple(patterns)
+        self._lengths = [len(pattern) for pattern in self.patterns]
+        self._empty = [index for index, pattern in enumerate(self.patterns) if not pattern]
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[Tuple[int, ...]] = [()]
+
+        if len(self.patterns) > SMALL_SET_THRESHOLD:
+            self._build()
+
+    def _build(self):
+        outputs: List[List[int]] = [[]]
+
+        for index, pattern in enumerate(self.patterns):
+            if not pattern:
+                continue
+            node = 0
+            for ch in pattern:
+                next_node = self._goto[node].get(ch)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][ch] = next_node
+                    self._goto.append({})
+                    outputs.append([])
+                node = next_node
+            outputs[node].append(index)
+
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                outputs[child].extend(outputs[self._fail[child]])
+
+        self._outputs = [tuple(output) for output in outputs]
+
+    # Maps each matched pattern index to the offset of its first occurrence in text
+    def first_matches(self, text: str) -> Dict[int, int]:
+        if len(self.patterns) <= SMALL_SET_THRESHOLD:
+            return self._find_each(text)
+
+        found = {index: 0 for index in self._empty}
+        if len(found) < len(self.patterns):
+            self._scan(text, 0, 0, found)
+        return found
+
+    # Walks the automaton over text from `state`, recording first offsets (shifted by base)
+    # of patterns not yet in found. Returns the state to resume from.
+    def _scan(self, text: str, state: int, base: int, found: Dict[int, int]) -> int:
+        goto, fail, outputs, lengths = self._goto, self._fail, self._outputs, self._lengths
+        root = goto[0]
+        remaining = len(self.patterns) - len(found)
+
+        for position, ch in enumerate(text, base):
+            while True:
+                next_state = goto[state].get(ch)
+                if next_state is not None:
+                    state = next_state
+                    break
+                if state == 0:
+                    break
+                state = fail[state]
+
+            if state == 0 and ch not in root:
+                continue
+
+            for index in outputs[state]:
+                if index not in found:
+                    found[index] = position - lengths[index] + 1
+                    remaining -= 1
+            if not remaining:
+                break
+
+        return state
+
+    def _find_each(self, text: str) -> Dict[int, int]:
+        found = {}
+        for index, pattern in enumerate(self.patterns):
+            position = text.find(pattern)
+            if position != -1:
+                found[index] = position
+        return found
+
+    # (pattern, first offset) for every pattern found, in pattern order
+    def find(self, text: str) -> List[Tuple[str, int]]:
+        matches = self.first_matches(text)
+        return [(self.patterns[index], matches[index]) for index in sorted(matches)]
+
+    # first_matches of the text the pieces join up to, reading them one at a time
+    def first_matches_pieces(self, pieces: Iterable[str]) -> Dict[int, int]:
+        stream = StreamMatcher(self)
+        for piece in pieces:
+            stream.feed(piece)
+            if len(stream.found) == len(self.patterns):
+                break
+        return stream.found
+
+    def find_pieces(self, pieces: Iterable[str]) -> List[Tuple[str, int]]:
+        matches = self.first_matches_pieces(pieces)
+        return [(self.patterns[index], matches[index]) for index in sorted(matches)]
+
+
+# Matches text that arrives in pieces, e.g. a model output while it is being generated.
+# The automaton state (or, for small sets, the last few characters) carries across
+# pieces, so a pattern split over a boundary is found at the same offset as in one pass.
+class StreamMatcher:
+
+    def __init__(self, matcher: PhraseMatcher):
+        self.matcher = matcher
+        self.found: Dict[int, int] = {index: 0 for index in matcher._empty}
+        self.offset = 0
+        self._reported = 0
+        self._state = 0
+        self._tail = ""
+        self._overlap = max(matcher._lengths, default=1) - 1
+
+    # Returns the indexes of patterns first seen in this piece
+    def feed(self, text: str) -> List[int]:
+        if len(self.found) < len(self.matcher.patterns):
+            if len(self.matcher.patterns) <= SMALL_SET_THRESHOLD:
+                self._find_each(text)
+            else:
+                self._state = self.matcher._scan(text, self._state, self.offset, self.found)
+        self.offset += len(text)
+
+        new = list(self.found)[self._reported:]
+        self._reported = len(self.found)
+        return new
+
+    def _find_each(self, text: str):
+        window = self._tail + text
+        start = self.offset - len(self._tail)
+        for index, pattern in enumerate(self.matcher.patterns):
+            if index not in self.found:
+                position = window.find(pattern)
+                if position != -1:
+                    self.found[index] = start + position
+        self._tail = window[-self._overlap:] if self._overlap else ""
+
+    # (pattern, first offset) for every pattern found so far, in pattern order
+    def matches(self) -> List[Tuple[str, int]]:
+        return [(self.matcher.patterns[index], self.found[index]) for index in sorted(self.found)]
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+# A set of literal phrases compiled into one regular expression, factored as a trie:
+# the alternatives at each node start with distinct characters, so at most one of them
+# can continue and no position is ever retried. A scan costs at most the longest phrase
+# per text position, however many phrases there are and whatever the input, and runs
+# in the C regex engine rather than a Python loop like PhraseMatcher.
+# With whole_words, a phrase only matches where it is not part of a longer word: the end
+# is checked inside the expression, the start (which would defeat the regex engine's
+# first-character scan) on each match.
+class PhrasePattern:
+
+    def __init__(self, phrases: Iterable[str], whole_words: bool = True):
+        self.phrases: Tuple[str, ...] = tuple(dict.fromkeys(phrase for phrase in phrases if phrase))
+        self.whole_words = whole_words
+        self.pattern = re.compile(self._expression()) if self.phrases else None
+        # characters from a match start that decide the match: the longest phrase and
+        # the one after it, which the whole-word check looks at
+        self._reach = max((len(phrase) for phrase in self.phrases), default=0) + 1
+
+    def _expression(self) -> str:
+        trie: Dict[str, dict] = {}
+        for phrase in self.phrases:
+            node = trie
+            for ch in phrase:
+                node = node.setdefault(ch, {})
+            node[""] = {}
+
+        def build(node: Dict[str, dict], last: str) -> str:
+            branches = [re.escape(ch) + build(child, ch) for ch, child in sorted(node.items()) if ch]
+            # ending here is tried last, so the longest phrase wins
+            if "" in node:
+                branches.append(r"(?!\w)" if self.whole_words and _is_word_char(last) else "")
+            return branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+
+        return build(trie, "")
+
+    # Maps each phrase found to the offset of its first occurrence. Matches do not
+    # overlap: scanning resumes after the longest phrase matched at a position.
+    def first_matches(self, text: str) -> Dict[str, int]:
+        found: Dict[str, int] = {}
+        if self.pattern is not None:
+            self._scan(text, 0, 0, None, found)
+        return found
+
+    # first_matches of the text the pieces join up to, reading them one at a time. Only
+    # the characters after the last settled position (at most the reach) are carried
+    # from one piece to the next, so the offsets and matches are those of one pass.
+    def first_matches_pieces(self, pieces: Iterable[str]) -> Dict[str, int]:
+        found: Dict[str, int] = {}
+        if self.pattern is None:
+            return found
+
+        window, base, position = "", 0, 0
+        for piece in pieces:
+            window += piece
+            position = self._scan(window, base, position, len(window) - self._reach, found)
+            # keep one character before the resume position for the whole-word check
+            keep = max(position - 1, 0)
+            window, base, position = window[keep:], base + keep, position - keep
+        self._scan(window, base, position, None, found)
+        return found
+
+    # Records matches starting at or after position in window, which begins at offset
+    # base of the text, up to start `limit` (None: to the end). Returns the position to
+    # resume from: no match can start between it and the limit.
+    def _scan(self, window: str, base: int, position: int, limit: Optional[int], found: Dict[str, int]) -> int:
+        search = self.pattern.search
+        while True:
+            match = search(window, position)
+            if match is None or (limit is not None and match.start() > limit):
+                return position if limit is None else max(position, limit + 1)
+            start, end = match.span()
+            if self.whole_words and start and _is_word_char(window[start]) and _is_word_char(window[start - 1]):
+                position = start + 1
+                continue
+            found.setdefault(match.group(), base + start)
+            position = end
+
+
+@lru_cache(maxsize=256)
+def _compile(patterns: Tuple[str, ...]) -> PhraseMatcher:
+    return PhraseMatcher(patterns)
+
+
+# Compiled matchers are cached per exact pattern set, so each set is built once
+def get_matcher(patterns: Iterable[str]) -> PhraseMatcher:
+    return _compile(tuple(patterns))
+
+
+@lru_cache(maxsize=64)
+def _compile_phrases(phrases: Tuple[str, ...], whole_words: bool) -> PhrasePattern:
+    return PhrasePattern(phrases, whole_words)
+
+
+# Like get_matcher: each phrase set is compiled once
+def get_phrase_pattern(phrases: Iterable[str], whole_words: bool = True) -> PhrasePattern:
+    return _compile_phrases(tuple(phrases), whole_words)
@@ -0,0 +1,216 @@
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple
+import time
+
+LATENCY_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+SIZE_BUCKETS = tuple(256 * 4 ** power for power in range(10))
+
+RULE_OUTCOMES = ("pass", "fail", "error", "skipped")
+
+
+# Fixed-bucket histogram. Observing is a bisect plus three in-place updates, with no allocation.
+# Updates are not locked: under heavy thread contention a rare increment may be lost,
+# which is an acceptable trade for keeping the hot path cheap.
+class Histogram:
+
+    def __init__(self, buckets: Sequence[float]):
+        self.bounds = tuple(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float, times: int = 1):
+        self.counts[bisect_left(self.bounds, value)] += times
+        self.total += value * times
+        self.count += times
+
+    def reset(self):
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def merge(self, other: "Histogram"):
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.total += other.total
+        self.count += other.count
+
+
+class RuleMetrics:
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.outcomes = dict.fromkeys(RULE_OUTCOMES, 0)
+
+
+class HTTPMetrics:
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.request_size = Histogram(SIZE_BUCKETS)
+        self.response_size = Histogram(SIZE_BUCKETS)
+        self.statuses: Dict[int, int] = {}
+
+
+# Process-wide counters and histograms for rules, evaluations and HTTP traffic
+class EvaluationMetrics:
+
+    def __init__(self):
+        self.rules: Dict[str, RuleMetrics] = {}
+        self.evaluation_latency = Histogram(LATENCY_BUCKETS)
+        self.http: Dict[Tuple[str, str], HTTPMetrics] = {}
+
+    def rule(self, rule_id: str) -> RuleMetrics:
+        metrics = self.rules.get(rule_id)
+        if metrics is None:
+            metrics = self.rules.setdefault(rule_id, RuleMetrics())
+        return metrics
+
+    def record_rule(self, rule_id: str, seconds: float, outcome: str, times: int = 1):
+        metrics = self.rule(rule_id)
+        metrics.latency.observe(seconds, times)
+        metrics.outcomes[outcome] += times
+
+    def record_http(self, method: str, path: str, status: int, seconds: float, request_bytes: int, response_bytes: int):
+        key = (method, path)
+        metrics = self.http.get(key)
+        if metrics is None:
+            metrics = self.http.setdefault(key, HTTPMetrics())
+        metrics.latency.observe(seconds)
+        metrics.request_size.observe(request_bytes)
+        metrics.response_size.observe(response_bytes)
+        metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+
+    # skipped rules take no time, so only the outcome counter moves
+    def record_skip(self, rule_id: str, times: int = 1):
+        self.rule(rule_id).outcomes["skipped"] += times
+
+    # Adds rule and evaluation metrics recorded elsewhere, e.g. by a worker process
+    def merge(self, other: "EvaluationMetrics"):
+        for rule_id, metrics in other.rules.items():
+            merged = self.rule(rule_id)
+            merged.latency.merge(metrics.latency)
+            for outcome, count in metrics.outcomes.items():
+                merged.outcomes[outcome] += count
+        self.evaluation_latency.merge(other.evaluation_latency)
+
+    def rule_seconds(self) -> Dict[str, float]:
+        return {rule_id: metrics.latency.total for rule_id, metrics in self.rules.items()}
+
+    def reset(self):
+        self.rules.clear()
+        self.evaluation_latency.reset()
+        self.http.clear()
+
+    # Prometheus text exposition format (version 0.0.4)
+    def render(self) -> str:
+        lines: List[str] = []
+
+        _header(lines, "llm_eval_rule_duration_seconds", "histogram", "Wall time of each rule evaluation")
+        for rule_id, metrics in sorted(self.rules.items()):
+            _histogram(lines, "llm_eval_rule_duration_seconds", {"rule": rule_id}, metrics.latency)
+
+        _header(lines, "llm_eval_rule_results_total", "counter", "Rule evaluations by outcome")
+        for rule_id, metrics in sorted(self.rules.items()):
+            for outcome, count in metrics.outcomes.items():
+                lines.append(f"llm_eval_rule_results_total{_labels({'rule': rule_id, 'outcome': outcome})} {count}")
+
+        _header(lines, "llm_eval_evaluation_duration_seconds", "histogram", "Wall time of a whole evaluation")
+        _histogram(lines, "llm_eval_evaluation_duration_seconds", {}, self.evaluation_latency)
+
+        _header(lines, "llm_eval_http_request_duration_seconds", "histogram", "HTTP request latency")
+        for (method, path), metrics in sorted(self.http.items()):
+            _histogram(lines, "llm_eval_http_request_duration_seconds", {"method": method, "path": path}, metrics.latency)
+
+        _header(lines, "llm_eval_http_request_size_bytes", "histogram", "HTTP request body size")
+        for (method, path), metrics in sorted(self.http.items()):
+            _histogram(lines, "llm_eval_http_request_size_bytes", {"method": method, "path": path}, metrics.request_size)
+
+        _header(lines, "llm_eval_http_response_size_bytes", "histogram", "HTTP response body size")
+        for (method, path), metrics in sorted(self.http.items()):
+            _histogram(lines, "llm_eval_http_response_size_bytes", {"method": method, "path": path}, metrics.response_size)
+
+        _header(lines, "llm_eval_http_requests_total", "counter", "HTTP requests by status code")
+        for (method, path), metrics in sorted(self.http.items()):
+            for status, count in sorted(metrics.statuses.items()):
+                labels = _labels({"method": method, "path": path, "status": str(status)})
+                lines.append(f"llm_eval_http_requests_total{labels} {count}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _header(lines: List[str], name: str, kind: str, description: str):
+    lines.append(f"# HELP {name} {description}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _histogram(lines: List[str], name: str, labels: Dict[str, str], histogram: Histogram):
+    cumulative = 0
+    counts = list(histogram.counts)
+    for bound, count in zip(histogram.bounds, counts):
+        cumulative += count
+        lines.append(f"{name}_bucket{_labels({**labels, 'le': repr(float(bound))})} {cumulative}")
+    cumulative += counts[-1]
+    lines.append(f"{name}_bucket{_labels({**labels, 'le': '+Inf'})} {cumulative}")
+    lines.append(f"{name}_sum{_labels(labels)} {histogram.total}")
+    lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+
+
+# Pure ASGI middleware recording latency, body sizes and status per route.
+# Paths that are not routes of the app are folded into "other" to bound label cardinality.
+class MetricsMiddleware:
+
+    def __init__(self, app, metrics: EvaluationMetrics, known_paths: Optional[Sequence[str]] = None):
+        self.app = app
+        self.metrics = metrics
+        self.known_paths = set(known_paths or ())
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        sizes = [0, 0]
+        status = [500]
+
+        async def counting_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                sizes[0] += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            elif message["type"] == "http.response.body":
+                sizes[1] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            path = scope["path"] if scope["path"] in self.known_paths else "other"
+            self.metrics.record_http(
+                scope["method"],
+                path,
+                status[0],
+                time.perf_counter() - started,
+                sizes[0],
+                sizes[1]
+            )
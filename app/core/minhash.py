@@ -0,0 +1,184 @@
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import threading
+import zlib
+
+MAX_HASH = np.uint64((1 << 32) - 1)
+FNV_PRIME = np.uint64(0x01000193)
+HASH_SHIFT = np.uint64(32)
+# Shingles hashed per step when building a signature; bounds the temporary matrix
+SIGNATURE_CHUNK = 4096
+
+
+# Sorted distinct values. np.unique does the same but is far slower on large uint64
+# arrays; sorting and dropping equal neighbours is all that is needed here.
+def distinct(values: np.ndarray) -> np.ndarray:
+    if len(values) < 2:
+        return values
+    ordered = np.sort(values)
+    return ordered[np.concatenate(([True], ordered[1:] != ordered[:-1]))]
+
+
+# MinHash signatures over word shingles. Each of num_perm hash functions maps a 32-bit
+# shingle hash x to the top 32 bits of (a * x + b) mod 2^64 (multiply-add-shift, a
+# universal family that needs no modulo). Token hashes are CRC32, so signatures are the
+# same in every process and can be compared with signatures computed earlier.
+class MinHasher:
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 3, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        # random odd multipliers and random offsets, one per row
+        multipliers = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64) << np.uint64(1)
+        self._a = (multipliers | np.uint64(1))[:, None]
+        self._b = (rng.integers(0, 1 << 63, num_perm, dtype=np.uint64) << np.uint64(1))[:, None]
+
+    def shingles(self, tokens: Sequence[str]) -> np.ndarray:
+        count = len(tokens) - self.shingle_size + 1
+        if count <= 0:
+            return np.empty(0, dtype=np.uint64)
+
+        # each distinct token is hashed once
+        token_hashes = {token: zlib.crc32(token.encode()) for token in set(tokens)}
+        hashes = np.fromiter(map(token_hashes.__getitem__, tokens), dtype=np.uint64, count=len(tokens))
+        shingles = hashes[:count].copy()
+        for offset in range(1, self.shingle_size):
+            shingles = ((shingles * FNV_PRIME) ^ hashes[offset:offset + count]) & MAX_HASH
+        return shingles
+
+    # Signature of a set of shingles given as distinct values (see distinct()), or None
+    # when there are none
+    def signature(self, distinct_shingles: np.ndarray) -> Optional[np.ndarray]:
+        if not len(distinct_shingles):
+            return None
+
+        # the shift is monotonic, so it can wait until after the minimum
+        signature = np.full(self.num_perm, np.iinfo(np.uint64).max, dtype=np.uint64)
+        for start in range(0, len(distinct_shingles), SIGNATURE_CHUNK):
+            hashed = self._a * distinct_shingles[None, start:start + SIGNATURE_CHUNK]
+            hashed += self._b
+            np.minimum(signature, hashed.min(axis=1), out=signature)
+        return (signature >> HASH_SHIFT).astype(np.uint32)
+
+
+# Locality-sensitive index of MinHash signatures. Signatures are cut into bands of
+# rows; two signatures become candidates when any band matches exactly, so a lookup
+# only touches the buckets of its own bands. Candidates are then scored by the share of
+# equal signature positions, an estimate of the Jaccard similarity of their shingles.
+# Holds at most max_entries signatures and evicts the oldest first.
+class MinHashIndex:
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, max_entries: int = 20000):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._buckets: List[Dict[bytes, set]] = [{} for _ in range(bands)]
+        # entry id -> (signature, group, label), oldest first
+        self._entries: "OrderedDict[int, Tuple[np.ndarray, Any, Any]]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def query(
+        self,
+        signature: np.ndarray,
+        threshold: float,
+        exclude_group: Any = None
+    ) -> List[Tuple[float, Any]]:
+        with self._lock:
+            return self._query(signature, self._band_keys(signature), threshold, exclude_group)
+
+    # Looks up near-duplicates and then inserts the signature, as one step, so that
+    # concurrent requests with the same output cannot both miss each other
+    def query_and_insert(
+        self,
+        signature: np.ndarray,
+        threshold: float,
+        group: Any = None,
+        label: Any = None
+    ) -> List[Tuple[float, Any]]:
+        keys = self._band_keys(signature)
+        with self._lock:
+            matches = self._query(signature, keys, threshold, group)
+            self._insert(signature, keys, group, label)
+            return matches
+
+    def insert(self, signature: np.ndarray, group: Any = None, label: Any = None):
+        keys = self._band_keys(signature)
+        with self._lock:
+            self._insert(signature, keys, group, label)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            for buckets in self._buckets:
+                buckets.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "evictions": self.evictions
+            }
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        data = signature.tobytes()
+        width = len(data) // self.bands
+        return [data[start:start + width] for start in range(0, len(data), width)]
+
+    # Matches as (similarity, label), most similar first. Entries of exclude_group (e.g.
+    # outputs for the same prompt) are not reported; None matches no group.
+    def _query(
+        self,
+        signature: np.ndarray,
+        keys: List[bytes],
+        threshold: float,
+        exclude_group: Any
+    ) -> List[Tuple[float, Any]]:
+        candidates = set()
+        for buckets, key in zip(self._buckets, keys):
+            candidates.update(buckets.get(key, ()))
+        if not candidates:
+            return []
+
+        entries = [
+            self._entries[entry_id] for entry_id in candidates
+            if exclude_group is None or self._entries[entry_id][1] != exclude_group
+        ]
+        if not entries:
+            return []
+
+        similarities = (np.stack([entry[0] for entry in entries]) == signature).mean(axis=1)
+        matches = [
+            (float(similarity), entry[2])
+            for similarity, entry in zip(similarities.tolist(), entries)
+            if similarity >= threshold
+        ]
+        matches.sort(key=lambda match: -match[0])
+        return matches
+
+    def _insert(self, signature: np.ndarray, keys: List[bytes], group: Any, label: Any):
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = (signature, group, label)
+        for buckets, key in zip(self._buckets, keys):
+            buckets.setdefault(key, set()).add(entry_id)
+
+        while len(self._entries) > self.max_entries:
+            old_id, (old_signature, _, _) = self._entries.popitem(last=False)
+            for buckets, key in zip(self._buckets, self._band_keys(old_signature)):
+                bucket = buckets.get(key)
+                if bucket is not None:
+                    bucket.discard(old_id)
+                    if not bucket:
+                        del buckets[key]
+            self.evictions += 1
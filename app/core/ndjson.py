@@ -0,0 +1,77 @@
+from app.schemas.evaluation import EvaluationRequest
+from pydantic import ValidationError
+from typing import List, Optional
+import json
+
+MAX_LINE_BYTES = 16 * 1024 * 1024
+
+
+# Splits an NDJSON byte stream into lines while holding at most one line in memory.
+# Lines longer than max_line_bytes are dropped and reported as None.
+class NDJSONLineBuffer:
+
+    def __init__(self, max_line_bytes: int = MAX_LINE_BYTES):
+        self.max_line_bytes = max_line_bytes
+        self._buffer = bytearray()
+        self._overflowed = False
+
+    def feed(self, chunk: bytes) -> List[Optional[bytes]]:
+        lines = []
+        start = 0
+
+        while True:
+            end = chunk.find(b"\n", start)
+            if end == -1:
+                break
+            self._append(chunk[start:end])
+            lines.append(self._take())
+            start = end + 1
+
+        self._append(chunk[start:])
+        return lines
+
+    def flush(self) -> List[Optional[bytes]]:
+        if not self._buffer and not self._overflowed:
+            return []
+        return [self._take()]
+
+    def _append(self, piece: bytes):
+        if self._overflowed:
+            return
+
+        if len(self._buffer) + len(piece) > self.max_line_bytes:
+            self._overflowed = True
+            self._buffer.clear()
+            return
+
+        self._buffer.extend(piece)
+
+    def _take(self) -> Optional[bytes]:
+        if self._overflowed:
+            self._overflowed = False
+            return None
+
+        line = bytes(self._buffer).rstrip(b"\r")
+        self._buffer.clear()
+        return line
+
+
+def parse_request_line(line: Optional[bytes], max_line_bytes: int = MAX_LINE_BYTES) -> EvaluationRequest:
+    if line is None:
+        raise ValueError(f"line exceeds {max_line_bytes} bytes")
+
+    try:
+        return EvaluationRequest.model_validate_json(line)
+    except ValidationError as e:
+        raise ValueError(validation_message(e)) from None
+
+
+def validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc']) or 'body'}: {detail['msg']}"
+        for detail in error.errors()
+    )
+
+
+def error_record(line_number: int, message: str) -> bytes:
+    return json.dumps({"line": line_number, "error": message}).encode() + b"\n"
@@ -0,0 +1,79 @@
+from app.core.analysis import TokenView
+from app.core.digest_cache import DigestCache
+from collections import Counter
+from typing import Dict, Hashable, Iterable, Sequence, Tuple
+import numpy as np
+
+# References and prompts repeat across requests: each distinct one is tokenized once
+# and shared by every reference rule
+token_cache: DigestCache[TokenView] = DigestCache(TokenView)
+
+
+def get_cached_tokens(reference: str) -> TokenView:
+    return token_cache.get(reference)
+
+
+# Harmonic mean of precision (overlap / predicted) and recall (overlap / reference).
+# Two empty sides agree perfectly; one empty side does not agree at all.
+def f_measure(overlap: float, predicted: int, reference: int) -> Tuple[float, float, float]:
+    if not predicted and not reference:
+        return 1.0, 1.0, 1.0
+    if not predicted or not reference or not overlap:
+        return 0.0, 0.0, 0.0
+    precision = overlap / predicted
+    recall = overlap / reference
+    return 2 * precision * recall / (precision + recall), precision, recall
+
+
+def clipped_overlap(predicted: Counter, reference: Counter) -> int:
+    return sum((predicted & reference).values())
+
+
+# clipped_overlap for many pairs at once. Items of all pairs share one vocabulary; each
+# side becomes a sparse vector of (pair, item) counts, and the overlap of a pair is the
+# sum of element-wise minimums over the keys both sides have.
+def batch_clipped_overlap(
+    predicted: Sequence[Sequence[Hashable]],
+    references: Sequence[Sequence[Hashable]]
+) -> np.ndarray:
+    pairs = len(predicted)
+    vocabulary: Dict[Hashable, int] = {}
+    reference_ids = np.fromiter(
+        (vocabulary.setdefault(item, len(vocabulary)) for items in references for item in items),
+        dtype=np.int64
+    )
+    # items only the prediction has cannot overlap and are left out of the vocabulary
+    predicted_ids = np.fromiter(
+        (vocabulary.get(item, -1) for items in predicted for item in items),
+        dtype=np.int64
+    )
+    if not vocabulary:
+        return np.zeros(pairs, dtype=np.int64)
+
+    size = len(vocabulary)
+    reference_keys = np.repeat(np.arange(pairs), [len(items) for items in references]) * size + reference_ids
+    predicted_pairs = np.repeat(np.arange(pairs), [len(items) for items in predicted])
+    known = predicted_ids >= 0
+    predicted_keys = predicted_pairs[known] * size + predicted_ids[known]
+
+    reference_unique, reference_counts = np.unique(reference_keys, return_counts=True)
+    predicted_unique, predicted_counts = np.unique(predicted_keys, return_counts=True)
+    shared, in_reference, in_predicted = np.intersect1d(
+        reference_unique, predicted_unique, assume_unique=True, return_indices=True
+    )
+
+    minimums = np.minimum(reference_counts[in_reference], predicted_counts[in_predicted])
+    return np.bincount(shared // size, weights=minimums, minlength=pairs).astype(np.int64)
+
+
+# Length of the longest common subsequence of tokens and the sequence the masks were
+# built from (TokenView.lcs_masks), with the bit-parallel algorithm of Allison and Dix:
+# one big-integer add/subtract per token instead of a row of the dynamic-programming table
+def lcs_length(tokens: Iterable[str], masks: Dict[str, int], length: int) -> int:
+    full = (1 << length) - 1
+    row = full
+    for token in tokens:
+        matches = row & masks.get(token, 0)
+        if matches:
+            row = ((row + matches) | (row - matches)) & full
+    return length - bin(row).count("1")
@@ -0,0 +1,76 @@
+from app.core.records import RuleRecord
+from app.rules.base_rule import BaseRule
+from typing import Dict, List, Optional, Sequence
+import heapq
+
+BUDGET_EXCEEDED = "skipped: budget exceeded"
+NOT_APPLICABLE = "skipped: not applicable"
+
+
+# Execution order for a rule set, computed once: a topological order over the rules'
+# declared dependencies that always picks the cheapest ready rule next (ties keep
+# declaration order). Results are still reported in declaration order.
+class RulePlan:
+
+    def __init__(self, rules: Sequence[BaseRule]):
+        self.rules = list(rules)
+
+        positions: Dict[str, int] = {}
+        for position, rule in enumerate(self.rules):
+            if rule.rule_id in positions:
+                raise ValueError(f"duplicate rule id '{rule.rule_id}'")
+            positions[rule.rule_id] = position
+
+        prerequisites: List[set] = []
+        for rule in self.rules:
+            required = set()
+            for rule_id in (*rule.depends_on, *rule.skip_if_failed):
+                if rule_id not in positions:
+                    raise ValueError(f"rule '{rule.rule_id}' depends on unknown rule '{rule_id}'")
+                required.add(positions[rule_id])
+            prerequisites.append(required)
+
+        self.prerequisites = [tuple(sorted(required)) for required in prerequisites]
+        self.skip_if_failed = [tuple(positions[rule_id] for rule_id in rule.skip_if_failed) for rule in self.rules]
+        self.order = tuple(self._order(prerequisites))
+
+    def _order(self, prerequisites: List[set]) -> List[int]:
+        dependents: List[List[int]] = [[] for _ in self.rules]
+        waiting = [len(required) for required in prerequisites]
+        for position, required in enumerate(prerequisites):
+            for prerequisite in required:
+                dependents[prerequisite].append(position)
+
+        ready = [(rule.cost, position) for position, rule in enumerate(self.rules) if not waiting[position]]
+        heapq.heapify(ready)
+
+        order = []
+        while ready:
+            _, position = heapq.heappop(ready)
+            order.append(position)
+            for dependent in dependents[position]:
+                waiting[dependent] -= 1
+                if not waiting[dependent]:
+                    heapq.heappush(ready, (self.rules[dependent].cost, dependent))
+
+        if len(order) < len(self.rules):
+            cyclic = sorted(self.rules[position].rule_id for position, count in enumerate(waiting) if count)
+            raise ValueError(f"rule dependencies contain a cycle among: {', '.join(cyclic)}")
+
+        return order
+
+    # Why the rule at `position` should not run, given the results produced so far
+    # (indexed by declaration position), or None if it should
+    def skip_reason(self, position: int, results: Sequence[Optional[RuleRecord]]) -> Optional[str]:
+        for dependency in self.skip_if_failed[position]:
+            result = results[dependency]
+            if result is not None and not result.passed and not result.skipped:
+                return f"skipped: {result.rule_id} failed"
+        return None
+
+    @property
+    def signature(self) -> str:
+        # part of the cache fingerprint: changing what gets skipped changes results
+        return ";".join(
+            f"{rule.rule_id}<{','.join(rule.skip_if_failed)}" for rule in self.rules if rule.skip_if_failed
+        )
@@ -0,0 +1,84 @@
+from app.core.digest_cache import DEFAULT_CACHE_SIZE, DigestCache
+from dataclasses import dataclass
+from typing import Optional, Tuple
+import re
+
+JSON_PROMPT_KEYWORDS = ("json", "return {", "output {", "format {")
+
+
+# Everything the rules derive from a prompt, parsed once per distinct prompt
+@dataclass(frozen=True)
+class PromptSpec:
+    required_keywords: Tuple[str, ...]
+    length_constraint: Optional[Tuple[str, int]]
+    mentions_json: bool
+
+
+def analyze_prompt(prompt: str) -> PromptSpec:
+    prompt_lower = prompt.lower()
+    return PromptSpec(
+        required_keywords=_extract_required_keywords(prompt),
+        length_constraint=_extract_length_constraint(prompt_lower),
+        mentions_json=any(keyword in prompt_lower for keyword in JSON_PROMPT_KEYWORDS)
+    )
+
+
+def _extract_required_keywords(prompt: str) -> Tuple[str, ...]:
+    keywords = []
+
+    pattern1 = re.findall(
+        r"must (?:include|mention|contain|use)(?: the (?:word|term|phrase))? ['\"]([^'\"]+)['\"]",
+        prompt,
+        re.IGNORECASE,
+    )
+    keywords.extend(pattern1)
+
+    pattern2 = re.findall(
+        r"make sure to (?:mention|include|use) ['\"]([^'\"]+)['\"]",
+        prompt,
+        re.IGNORECASE,
+    )
+    keywords.extend(pattern2)
+
+    pattern3_match = re.search(
+        r"include (?:the )?following (?:terms?|words?|phrases?)?:?\s*([^\n]+)",
+        prompt,
+        re.IGNORECASE,
+    )
+    if pattern3_match:
+        terms_str = pattern3_match.group(1)
+        terms = [t.strip().strip("\"',") for t in terms_str.split(",")]
+        keywords.extend(terms)
+
+    # de-duplicate but keep first-seen order so results are stable across processes
+    return tuple(dict.fromkeys(keywords))
+
+
+def _extract_length_constraint(prompt_lower: str) -> Optional[Tuple[str, int]]:
+    word_match = re.search(r'(\d+)\s*words?', prompt_lower)
+    if word_match:
+        return "words", int(word_match.group(1))
+
+    char_match = re.search(r'(\d+)\s*characters?', prompt_lower)
+    if char_match:
+        return "characters", int(char_match.group(1))
+
+    sent_match = re.search(r'(\d+)\s*sentences?', prompt_lower)
+    if sent_match:
+        return "sentences", int(sent_match.group(1))
+
+    return None
+
+
+# Bounded LRU of PromptSpecs keyed by a digest of the prompt
+class PromptSpecCache(DigestCache):
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE):
+        super().__init__(analyze_prompt, maxsize)
+
+
+prompt_spec_cache = PromptSpecCache()
+
+
+def get_prompt_spec(prompt: str) -> PromptSpec:
+    return prompt_spec_cache.get(prompt)
@@ -0,0 +1,191 @@
+from app.schemas.evaluation import EvaluationRequest, EvaluationResponse, RuleResult
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import hashlib
+import json
+
+
+# Identifies the prompt of a request for pairing results across models: meta["prompt_id"]
+# when given, else a digest of the prompt text; None for requests without a prompt
+def request_prompt_key(request: EvaluationRequest) -> Optional[str]:
+    prompt_id = (request.meta or {}).get("prompt_id")
+    if prompt_id is not None:
+        return str(prompt_id)
+    if request.prompt is None:
+        return None
+    return hashlib.sha256(request.prompt.encode("utf-8", "surrogatepass")).hexdigest()[:32]
+
+
+# The request as canonical JSON: what every rule's result is a function of
+def canonical_request(request: EvaluationRequest) -> bytes:
+    return json.dumps(
+        request.model_dump(mode="json"),
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False
+    ).encode("utf-8", "surrogatepass")
+
+
+def request_input_hash(request: EvaluationRequest) -> str:
+    return hashlib.sha256(canonical_request(request)).hexdigest()
+
+
+# Internal result of one rule. Plain slotted object: the evaluator produces these
+# itself, so they are not re-validated; RuleResult is only built at the API boundary.
+class RuleRecord:
+    __slots__ = ("rule_id", "rule_name", "passed", "score", "explanation", "skipped")
+
+    def __init__(
+        self,
+        rule_id: str,
+        rule_name: str,
+        passed: bool,
+        score: float,
+        explanation: str,
+        skipped: bool = False
+    ):
+        self.rule_id = rule_id
+        self.rule_name = rule_name
+        self.passed = passed
+        self.score = score
+        self.explanation = explanation
+        self.skipped = skipped
+
+    def __repr__(self) -> str:
+        return f"RuleRecord({self.rule_id!r}, passed={self.passed}, score={self.score})"
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RuleRecord":
+        return cls(
+            data["rule_id"],
+            data["rule_name"],
+            data["passed"],
+            data["score"],
+            data["explanation"],
+            data.get("skipped", False)
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "rule_id": self.rule_id,
+            "rule_name": self.rule_name,
+            "passed": self.passed,
+            "score": self.score,
+            "explanation": self.explanation,
+            "skipped": self.skipped
+        }
+
+    def to_schema(self) -> RuleResult:
+        return RuleResult.model_construct(
+            rule_id=self.rule_id,
+            rule_name=self.rule_name,
+            passed=self.passed,
+            score=self.score,
+            explanation=self.explanation,
+            skipped=self.skipped
+        )
+
+
+# Internal result of one evaluation, mirroring EvaluationResponse field for field.
+# to_dict()/to_json() give the same document as the schema; to_response() converts
+# without validation for the HTTP layer.
+class EvaluationRecord:
+    __slots__ = (
+        "evaluation_id",
+        "timestamp",
+        "scores",
+        "overall_score",
+        "failure_labels",
+        "explanations",
+        "rule_results",
+        "input_data",
+        "cached",
+        "profile",
+        "rule_fingerprints"
+    )
+
+    def __init__(
+        self,
+        evaluation_id: str,
+        timestamp: datetime,
+        scores: Dict[str, float],
+        overall_score: float,
+        failure_labels: List[str],
+        explanations: Dict[str, str],
+        rule_results: List[RuleRecord],
+        input_data: EvaluationRequest,
+        cached: bool = False,
+        profile: Optional[Dict[str, Any]] = None,
+        rule_fingerprints: Optional[Dict[str, str]] = None
+    ):
+        self.evaluation_id = evaluation_id
+        self.timestamp = timestamp
+        self.scores = scores
+        self.overall_score = overall_score
+        self.failure_labels = failure_labels
+        self.explanations = explanations
+        self.rule_results = rule_results
+        self.input_data = input_data
+        self.cached = cached
+        self.profile = profile
+        # fingerprint of each rule that produced rule_results (see BaseRule.fingerprint);
+        # stored with the record, not part of the response
+        self.rule_fingerprints = rule_fingerprints
+
+    def __repr__(self) -> str:
+        return f"EvaluationRecord({self.evaluation_id!r}, overall_score={self.overall_score})"
+
+    # Inverse of to_dict(), e.g. for stored payloads
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], rule_fingerprints: Optional[Dict[str, str]] = None) -> "EvaluationRecord":
+        return cls(
+            evaluation_id=data["evaluation_id"],
+            timestamp=datetime.fromisoformat(data["timestamp"]),
+            scores=data["scores"],
+            overall_score=data["overall_score"],
+            failure_labels=data["failure_labels"],
+            explanations=data["explanations"],
+            rule_results=[RuleRecord.from_dict(result) for result in data["rule_results"]],
+            input_data=EvaluationRequest.model_validate(data["input_data"]),
+            cached=data.get("cached", False),
+            profile=data.get("profile"),
+            rule_fingerprints=rule_fingerprints
+        )
+
+    def model(self) -> Optional[str]:
+        model = (self.input_data.meta or {}).get("model")
+        return str(model) if model is not None else None
+
+    def prompt_key(self) -> Optional[str]:
+        return request_prompt_key(self.input_data)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "evaluation_id": self.evaluation_id,
+            "timestamp": self.timestamp.isoformat(),
+            "scores": self.scores,
+            "overall_score": self.overall_score,
+            "failure_labels": self.failure_labels,
+            "explanations": self.explanations,
+            "rule_results": [result.to_dict() for result in self.rule_results],
+            "input_data": self.input_data.model_dump(mode="json"),
+            "cached": self.cached,
+            "profile": self.profile
+        }
+
+    def to_json(self) -> bytes:
+        return json.dumps(self.to_dict(), ensure_ascii=False, separators=(",", ":")).encode()
+
+    def to_response(self) -> EvaluationResponse:
+        return EvaluationResponse.model_construct(
+            evaluation_id=self.evaluation_id,
+            timestamp=self.timestamp,
+            scores=self.scores,
+            overall_score=self.overall_score,
+            failure_labels=self.failure_labels,
+            explanations=self.explanations,
+            rule_results=[result.to_schema() for result in self.rule_results],
+            input_data=self.input_data,
+            cached=self.cached,
+            profile=self.profile
+        )
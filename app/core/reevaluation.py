@@ -0,0 +1,98 @@
+from app.core.evaluator import Evaluator
+from app.core.records import EvaluationRecord, RuleRecord
+from app.storage.sqlite_store import EvaluationStore
+from typing import Any, Dict, List, Optional
+import time
+
+# Records rewritten per store transaction
+REWRITE_BATCH_SIZE = 500
+
+
+def _outcome(result: Optional[RuleRecord]) -> Optional[Dict[str, Any]]:
+    if result is None:
+        return None
+    return {"passed": result.passed, "skipped": result.skipped, "score": result.score}
+
+
+# Verdict diff of one evaluation: the overall outcome before and after, and every rule
+# whose verdict changed (passed or skipped flipped) or that was added or removed
+def verdict_diff(before: EvaluationRecord, after: EvaluationRecord) -> Optional[Dict[str, Any]]:
+    old_results = {result.rule_id: result for result in before.rule_results}
+    new_results = {result.rule_id: result for result in after.rule_results}
+
+    rules = {}
+    for rule_id in list(old_results) + [rule_id for rule_id in new_results if rule_id not in old_results]:
+        old, new = old_results.get(rule_id), new_results.get(rule_id)
+        if old is None or new is None or (old.passed, old.skipped) != (new.passed, new.skipped):
+            rules[rule_id] = {"before": _outcome(old), "after": _outcome(new)}
+
+    old_passed, new_passed = not before.failure_labels, not after.failure_labels
+    if not rules and old_passed == new_passed:
+        return None
+    return {
+        "evaluation_id": before.evaluation_id,
+        "before": {"overall_score": before.overall_score, "passed": old_passed},
+        "after": {"overall_score": after.overall_score, "passed": new_passed},
+        "rules": rules
+    }
+
+
+# Brings stored evaluations up to date with the evaluator's current rules. Only
+# (evaluation, rule) pairs whose rule fingerprint or input changed are recomputed (see
+# Evaluator.reevaluate), so after changing one rule the cost is that rule's work.
+# Updated records replace the stored ones unless dry_run is set. The report counts what
+# was recomputed and changed, per rule, and lists up to max_changes verdict diffs.
+def reevaluate_store(
+    store: EvaluationStore,
+    evaluator: Evaluator,
+    dry_run: bool = False,
+    max_changes: int = 100,
+    **filters: Any
+) -> Dict[str, Any]:
+    started = time.perf_counter()
+    # evaluations still queued for writing are re-evaluated too
+    store.flush()
+
+    scanned = 0
+    recomputed = 0
+    changed = 0
+    rules_recomputed: Dict[str, int] = {}
+    verdicts_changed: Dict[str, int] = {}
+    changes: List[Dict[str, Any]] = []
+    pending: List[EvaluationRecord] = []
+
+    for record, input_hash in store.iter_records(**filters):
+        scanned += 1
+        updated, rerun = evaluator.reevaluate(record, input_hash)
+        if updated is record:
+            continue
+
+        recomputed += 1
+        for rule_id in rerun:
+            rules_recomputed[rule_id] = rules_recomputed.get(rule_id, 0) + 1
+        if not dry_run:
+            pending.append(updated)
+            if len(pending) >= REWRITE_BATCH_SIZE:
+                store.rewrite(pending)
+                pending = []
+
+        diff = verdict_diff(record, updated)
+        if diff is not None:
+            changed += 1
+            for rule_id in diff["rules"]:
+                verdicts_changed[rule_id] = verdicts_changed.get(rule_id, 0) + 1
+            if len(changes) < max_changes:
+                changes.append(diff)
+
+    store.rewrite(pending)
+
+    return {
+        "scanned": scanned,
+        "recomputed": recomputed,
+        "changed": changed,
+        "rules_recomputed": rules_recomputed,
+        "verdicts_changed": verdicts_changed,
+        "changes": changes,
+        "dry_run": dry_run,
+        "seconds": time.perf_counter() - started
+    }
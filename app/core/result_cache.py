@@ -0,0 +1,140 @@
+from app.schemas.evaluation import EvaluationRequest
+from app.core.records import canonical_request
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+# How many inserts go by between size checks on the SQLite tier
+DB_PRUNE_INTERVAL = 1000
+
+
+def request_cache_key(request: EvaluationRequest, rules_fingerprint: str) -> str:
+    digest = hashlib.sha256()
+    digest.update(rules_fingerprint.encode())
+    digest.update(b"\0")
+    digest.update(canonical_request(request))
+    return digest.hexdigest()
+
+
+# Content-addressed cache of evaluation payloads (scores, labels, rule results).
+# An in-process LRU sits in front of an optional persistent SQLite table.
+class ResultCache:
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        ttl_seconds: float = 0.0,
+        db_path: Optional[str] = None,
+        max_db_entries: int = 1000000
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_db_entries = max_db_entries
+        self._memory: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._inserts_since_prune = 0
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS result_cache ("
+                "key TEXT PRIMARY KEY, payload TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_result_cache_created ON result_cache (created_at)")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, payload = entry
+                if not self._expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return payload
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT payload, created_at FROM result_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    if not self._expired(row[1], now):
+                        payload = json.loads(row[0])
+                        self._remember(key, row[1], payload)
+                        self.db_hits += 1
+                        return payload
+                    self._db.execute("DELETE FROM result_cache WHERE key = ?", (key,))
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, payload: Dict[str, Any]):
+        now = time.time()
+
+        with self._lock:
+            self._remember(key, now, payload)
+
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO result_cache (key, payload, created_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(payload), now)
+                )
+                self._inserts_since_prune += 1
+                if self._inserts_since_prune >= DB_PRUNE_INTERVAL:
+                    self._prune_db(now)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM result_cache")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "memory_entries": len(self._memory),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "persistent": self._db is not None,
+                "memory_hits": self.memory_hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - created_at > self.ttl_seconds
+
+    def _remember(self, key: str, created_at: float, payload: Dict[str, Any]):
+        self._memory[key] = (created_at, payload)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _prune_db(self, now: float):
+        self._inserts_since_prune = 0
+
+        if self.ttl_seconds > 0:
+            self._db.execute("DELETE FROM result_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+
+        excess = self._db.execute("SELECT COUNT(*) FROM result_cache").fetchone()[0] - self.max_db_entries
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM result_cache WHERE key IN "
+                "(SELECT key FROM result_cache ORDER BY created_at LIMIT ?)",
+                (excess,)
+            )
@@ -0,0 +1,87 @@
+from app.core.analysis import RunningCounts
+from app.core.evaluator import Evaluator
+from app.core.ndjson import validation_message
+from app.core.records import EvaluationRecord
+from app.rules.base_rule import RuleTracker
+from app.schemas.evaluation import EvaluationRequest
+from pydantic import ValidationError
+from typing import Any, Dict, List, Tuple
+
+
+# The opening message of a streaming session: every request field except the output
+def parse_session_start(message: Dict[str, Any]) -> EvaluationRequest:
+    fields = {key: value for key, value in message.items() if key not in ("type", "output")}
+    try:
+        return EvaluationRequest.model_validate({**fields, "output": ""})
+    except ValidationError as e:
+        raise ValueError(validation_message(e)) from None
+
+
+# Evaluates one output while it is being generated. Rules with a tracker report a
+# verdict as soon as their outcome is settled, so a caller can stop generation early.
+# close() runs the regular evaluation on the joined output, so the final result is the
+# same as evaluating that output in one request; rules that had not reported yet take
+# their verdict from it.
+class StreamingSession:
+
+    def __init__(self, evaluator: Evaluator, request: EvaluationRequest):
+        self.evaluator = evaluator
+        self.request = request
+        self.counts = RunningCounts()
+        self.verdicts: Dict[str, Dict[str, Any]] = {}
+        self._chunks: List[str] = []
+        self._trackers: List[RuleTracker] = []
+
+        for rule in evaluator.rule_set_for(request).rules:
+            tracker = rule.stream_tracker(request)
+            if tracker is not None:
+                self._trackers.append(tracker)
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        if not chunk:
+            return []
+
+        self._chunks.append(chunk)
+        self.counts.feed(chunk)
+
+        events = []
+        for tracker in self._trackers:
+            if tracker.rule.rule_id in self.verdicts:
+                continue
+            verdict = tracker.feed(chunk, self.counts)
+            if verdict is not None:
+                passed, explanation = verdict
+                events.append(self._verdict(tracker.rule.rule_id, passed, False, explanation))
+
+        return events
+
+    def close(self) -> Tuple[List[Dict[str, Any]], EvaluationRecord]:
+        record = self.evaluator.evaluate(self.final_request())
+        return self.finish(record), record
+
+    # The request for the joined output; callers that evaluate it elsewhere (e.g.
+    # through the dispatcher) pass the record to finish() instead of calling close()
+    def final_request(self) -> EvaluationRequest:
+        request = self.request.model_copy(update={"output": "".join(self._chunks)})
+        self._chunks = []
+        return request
+
+    # Verdicts of the rules that had not reported while streaming, taken from record
+    def finish(self, record: EvaluationRecord) -> List[Dict[str, Any]]:
+        return [
+            self._verdict(result.rule_id, result.passed, result.skipped, result.explanation)
+            for result in record.rule_results
+            if result.rule_id not in self.verdicts
+        ]
+
+    def _verdict(self, rule_id: str, passed: bool, skipped: bool, explanation: str) -> Dict[str, Any]:
+        event = {
+            "type": "verdict",
+            "rule_id": rule_id,
+            "passed": passed,
+            "skipped": skipped,
+            "explanation": explanation,
+            "at": self.counts.char_count
+        }
+        self.verdicts[rule_id] = event
+        return event
@@ -0,0 +1,37 @@
+from app.schemas.evaluation import EvaluationResponse
+from enum import Enum
+from pydantic import TypeAdapter
+from typing import List
+
+COMPACT_FIELDS = {"evaluation_id", "timestamp", "scores", "overall_score", "failure_labels", "cached", "profile"}
+
+_response_adapter = TypeAdapter(EvaluationResponse)
+
+
+# How much of an EvaluationResponse goes back over the wire
+class ResponseView(str, Enum):
+    full = "full"           # everything, including the echoed input
+    failures = "failures"   # no input echo, only failing rule results (no passes or skips)
+    compact = "compact"     # scores and failure labels only
+
+
+# Serializes straight to JSON bytes with pydantic-core, skipping FastAPI's
+# response_model re-validation and jsonable_encoder pass
+def render_response(response: EvaluationResponse, view: ResponseView = ResponseView.full) -> bytes:
+    if view is ResponseView.full:
+        return _response_adapter.dump_json(response)
+
+    if view is ResponseView.compact:
+        return _response_adapter.dump_json(response, include=COMPACT_FIELDS, exclude_none=True)
+
+    passing = {index for index, result in enumerate(response.rule_results) if result.passed or result.skipped}
+    return _response_adapter.dump_json(
+        response,
+        exclude={"input_data": True, "rule_results": passing},
+        exclude_none=True
+    )
+
+
+def render_batch(responses: List[EvaluationResponse], view: ResponseView = ResponseView.full) -> bytes:
+    body = b",".join(render_response(response, view) for response in responses)
+    return b'{"count":' + str(len(responses)).encode() + b',"results":[' + body + b"]}"
@@ -0,0 +1,65 @@
+from typing import Any, Dict
+import asyncio
+import json
+import os
+import re
+import uuid
+
+from fastapi import FastAPI, HTTPException
+
+WORD_PATTERN = re.compile(r"[a-z0-9]{4,}")
+
+
+# Stand-in for an OpenAI-compatible judge endpoint, for local runs and benchmarks:
+#
+#   uvicorn app.judge_stub:app --port 8100
+#   EVAL_JUDGE_URL=http://localhost:8100/v1 uvicorn app.main:app
+#
+# Each item is scored by the share of the prompt's words (four characters or more) that
+# the output repeats, so verdicts are deterministic. JUDGE_STUB_LATENCY_MS adds a fixed
+# delay per call, to stand in for a real model.
+
+
+def stub_verdict(item: Dict[str, Any]) -> Dict[str, Any]:
+    output = str(item.get("output") or "")
+    prompt_words = set(WORD_PATTERN.findall(str(item.get("prompt") or "").lower()))
+    if not output.strip():
+        score, reason = 0.0, "The output is empty."
+    elif not prompt_words:
+        score, reason = 1.0, "Nothing in the prompt to check the output against."
+    else:
+        covered = prompt_words & set(WORD_PATTERN.findall(output.lower()))
+        score = len(covered) / len(prompt_words)
+        reason = f"The output addresses {len(covered)} of {len(prompt_words)} prompt terms."
+    return {"id": item.get("id"), "score": round(score, 4), "reason": reason}
+
+
+def create_app(latency_ms: float = 0.0) -> FastAPI:
+    app = FastAPI(title="Stand-in LLM judge")
+    app.state.calls = 0
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(body: Dict[str, Any]):
+        try:
+            items = json.loads(body["messages"][-1]["content"])["items"]
+        except (KeyError, IndexError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="last message must be a JSON object with an 'items' list")
+
+        app.state.calls += 1
+        if latency_ms > 0:
+            await asyncio.sleep(latency_ms / 1000.0)
+
+        content = json.dumps({"verdicts": [stub_verdict(item) for item in items]})
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "model": body.get("model"),
+            "choices": [
+                {"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+            ]
+        }
+
+    return app
+
+
+app = create_app(float(os.getenv("JUDGE_STUB_LATENCY_MS") or 0))
@@ -1,14 +1,95 @@
-from fastapi import FastAPI, HTTPException
-from app.schemas.evaluation import EvaluationRequest, EvaluationResponse
+from contextlib import asynccontextmanager
+import asyncio
+import os
+import tempfile
+from datetime import datetime
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import FileResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
+from app.schemas.evaluation import (
+    EvaluationRequest,
+    EvaluationResponse,
+    BatchEvaluationRequest,
+    BatchEvaluationResponse
+)
+from app.config import settings
 from app.core.evaluator import Evaluator
+from app.core.result_cache import ResultCache
+from app.storage.sqlite_store import EvaluationStore
+from app.core.metrics import MetricsMiddleware
+from app.core.prompt_spec import prompt_spec_cache
+from app.core.overlap import token_cache
+from app.core.ndjson import NDJSONLineBuffer, parse_request_line, error_record
+from app.core.views import ResponseView, render_batch, render_response
+from app.core.streaming import StreamingSession, parse_session_start
+from app.core.json_schema import schema_registry
+from app.core.comparison import ScoreTable, compare
+from app.core.reevaluation import reevaluate_store
+from app.storage.columnar import export_store, format_for_path
+from app.core.io_loop import io_loop
+from app.core.dispatcher import EvaluationDispatcher, Overloaded
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await dispatcher.start()
+    yield
+    await dispatcher.close()
+    if judge_rule is not None:
+        await asyncio.wrap_future(io_loop.submit(judge_rule.client.aclose()))
+    if store is not None:
+        store.close()
 
 app = FastAPI(
     title="LLM Evaluation Framework",
     description="API for evaluating LLM outputs based on customizable rules.",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
+)
+
+result_cache = None
+if settings.result_cache_enabled:
+    result_cache = ResultCache(
+        max_entries=settings.result_cache_size,
+        ttl_seconds=settings.result_cache_ttl_seconds,
+        db_path=settings.result_cache_db_path,
+        max_db_entries=settings.result_cache_db_max_entries
+    )
+
+store = None
+if settings.store_path:
+    store = EvaluationStore(
+        settings.store_path,
+        batch_size=settings.store_batch_size,
+        flush_interval_ms=settings.store_flush_interval_ms
+    )
+
+if settings.json_schema_dir:
+    schema_registry.load_directory(settings.json_schema_dir)
+
+evaluator = Evaluator(
+    result_cache=result_cache,
+    store=store,
+    time_budget_ms=settings.rule_budget_ms or None
 )
 
-evaluator = Evaluator()
+# near_duplicate also compares against outputs evaluated before this process started
+dedup_rule = evaluator.registry.rule("near_duplicate") if "near_duplicate" in evaluator.registry.loaded else None
+if dedup_rule is not None and store is not None:
+    dedup_rule.warm(store.recent_outputs(dedup_rule.index.max_entries))
+
+judge_rule = evaluator.registry.rule("llm_judge") if "llm_judge" in evaluator.registry.loaded else None
+
+dispatcher = EvaluationDispatcher(
+    evaluator,
+    workers=settings.workers,
+    max_batch_size=settings.dispatch_batch_size,
+    batch_window_ms=settings.dispatch_window_ms,
+    max_queue=settings.max_queue,
+    timeout_s=settings.request_timeout_s
+)
 
 @app.get("/")
 def root():
@@ -18,18 +99,377 @@ def root():
         "version": "0.1.0"
     }
 
-@app.post("/evaluate", response_model=EvaluationResponse)
-def evaluate(request: EvaluationRequest):
+# The response body depends on ?view=, so it is documented rather than declared as
+# response_model: the schema given is that of the full view
+VIEW_DESCRIPTION = (
+    "Shaped by `view`: `full` matches the schema below; `failures` leaves out `input_data` and the "
+    "passed or skipped `rule_results`; `compact` keeps only `evaluation_id`, `timestamp`, `scores`, "
+    "`overall_score`, `failure_labels` and `cached`. Both leave out `profile` unless it was requested."
+)
+
+# Both go through the dispatcher: rules run in worker processes (EVAL_WORKERS) or in a
+# worker thread, and async rules (the LLM judge) are awaited without holding either.
+# A full admission queue answers 503 and a request over EVAL_REQUEST_TIMEOUT_S 504.
+@app.post("/evaluate", responses={200: {"model": EvaluationResponse, "description": VIEW_DESCRIPTION}})
+async def evaluate(
+    request: EvaluationRequest,
+    profile: bool = False,
+    view: ResponseView = ResponseView.full,
+    budget_ms: Optional[float] = None
+):
     try:
-        result = evaluator.evaluate(request)
-        return result
+        result = await dispatcher.evaluate(request, profile=profile, budget_ms=budget_ms)
+    except Overloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Evaluation failed: {str(e)}")
+    return Response(render_response(result.to_response(), view), media_type="application/json")
+
+@app.post(
+    "/evaluate/batch",
+    responses={200: {"model": BatchEvaluationResponse, "description": "Each of `results` is shaped by `view` as for `/evaluate`"}}
+)
+async def evaluate_batch(
+    batch: BatchEvaluationRequest,
+    view: ResponseView = ResponseView.full,
+    budget_ms: Optional[float] = None
+):
+    try:
+        results = await dispatcher.evaluate_batch(batch.requests, budget_ms=budget_ms)
+    except Overloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch evaluation failed: {str(e)}")
+    return Response(render_batch([result.to_response() for result in results], view), media_type="application/json")
+
+# The body iterator reads the request body itself, so the response must not run
+# StreamingResponse's disconnect listener, which would consume body messages.
+class RequestDrivenStreamingResponse(StreamingResponse):
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+
+        if self.background is not None:
+            await self.background()
+
+@app.post("/evaluate/stream")
+async def evaluate_stream(
+    request: Request,
+    view: ResponseView = ResponseView.full,
+    budget_ms: Optional[float] = None
+):
+    return RequestDrivenStreamingResponse(
+        _stream_evaluations(request, view, budget_ms),
+        media_type="application/x-ndjson"
+    )
+
+# Reads the body chunk by chunk and yields one result line per input line, in order.
+# Nothing is read ahead of what the client has consumed, so memory stays bounded.
+# The requests of each chunk go through the dispatcher as one batch. The response has
+# already started, so when that batch is not admitted or times out, its lines become
+# error lines instead of a 503 or 504.
+async def _stream_evaluations(request: Request, view: ResponseView, budget_ms: Optional[float] = None):
+    line_buffer = NDJSONLineBuffer()
+    line_number = 0
+
+    async for chunk in request.stream():
+        if not chunk:
+            continue
+        lines = line_buffer.feed(chunk)
+        for output_line in await _evaluate_lines(lines, line_number, view, budget_ms):
+            yield output_line
+        line_number += len(lines)
+
+    remaining = line_buffer.flush()
+    for output_line in await _evaluate_lines(remaining, line_number, view, budget_ms):
+        yield output_line
+
+async def _evaluate_lines(
+    lines,
+    first_line_number: int,
+    view: ResponseView = ResponseView.full,
+    budget_ms: Optional[float] = None
+):
+    parsed = await run_in_threadpool(_parse_lines, lines, first_line_number)
+
+    valid_requests = [item for _, item in parsed if isinstance(item, EvaluationRequest)]
+    try:
+        records = await dispatcher.evaluate_batch(valid_requests, budget_ms=budget_ms)
+    except (Overloaded, TimeoutError) as e:
+        return _render_lines(parsed, None, str(e), view)
+    except Exception as e:
+        return _render_lines(parsed, None, f"Evaluation failed: {str(e)}", view)
+
+    return await run_in_threadpool(_render_lines, parsed, records, None, view)
+
+def _parse_lines(lines, first_line_number: int):
+    parsed = []
+    for offset, line in enumerate(lines):
+        if line is not None and not line.strip():
+            continue
+        try:
+            parsed.append((first_line_number + offset + 1, parse_request_line(line)))
+        except ValueError as e:
+            parsed.append((first_line_number + offset + 1, e))
+    return parsed
+
+# One output line per parsed line: its result, or batch_error when the batch failed
+def _render_lines(parsed, records, batch_error: Optional[str], view: ResponseView = ResponseView.full):
+    responses = iter(records) if records is not None else None
+
+    output_lines = []
+    for line_number, item in parsed:
+        if isinstance(item, Exception):
+            output_lines.append(error_record(line_number, str(item)))
+        elif responses is None:
+            output_lines.append(error_record(line_number, batch_error))
+        else:
+            output_lines.append(render_response(next(responses).to_response(), view) + b"\n")
+
+    return output_lines
+
+# Incremental evaluation of an output while the model generates it. Protocol (JSON text frames):
+#   client: {"type": "start", "prompt": ..., "task_type": ..., "meta": ...}
+#           {"type": "chunk", "text": "..."}   (any number)
+#           {"type": "end"}
+#   server: {"type": "verdict", "rule_id": ..., "passed": ..., "skipped": ..., "explanation": ..., "at": chars}
+#           as soon as a rule's outcome is settled, then {"type": "result", "result": {...}} on end
+@app.websocket("/evaluate/ws")
+async def evaluate_ws(websocket: WebSocket, view: ResponseView = ResponseView.full):
+    await websocket.accept()
+    try:
+        message = await _receive_message(websocket)
+        if message is None or message.get("type") != "start":
+            await _close_with_error(websocket, "first message must be {\"type\": \"start\", ...}")
+            return
+
+        try:
+            session = StreamingSession(evaluator, parse_session_start(message))
+        except ValueError as e:
+            await _close_with_error(websocket, str(e))
+            return
+
+        while True:
+            message = await _receive_message(websocket)
+            kind = message.get("type") if message is not None else None
+
+            if kind == "chunk" and isinstance(message.get("text"), str):
+                for event in session.feed(message["text"]):
+                    await websocket.send_json(event)
+            elif kind == "end":
+                break
+            else:
+                await _close_with_error(websocket, "expected {\"type\": \"chunk\", \"text\": ...} or {\"type\": \"end\"}")
+                return
+
+        # only the final evaluation is admitted and timed by the dispatcher; the
+        # verdicts above come from incremental trackers that do little work per chunk
+        try:
+            record = await dispatcher.evaluate(session.final_request())
+        except Overloaded as e:
+            await _close_with_error(websocket, str(e), code=1013)
+            return
+        except TimeoutError as e:
+            await _close_with_error(websocket, str(e), code=1011)
+            return
+        except Exception as e:
+            await _close_with_error(websocket, f"Evaluation failed: {str(e)}", code=1011)
+            return
+
+        for event in session.finish(record):
+            await websocket.send_json(event)
+        result = render_response(record.to_response(), view)
+        await websocket.send_text('{"type":"result","result":' + result.decode() + "}")
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
+# The next frame as a JSON object, or None if it is anything else
+async def _receive_message(websocket: WebSocket) -> Optional[dict]:
+    try:
+        message = await websocket.receive_json()
+    except (ValueError, KeyError):
+        return None
+    return message if isinstance(message, dict) else None
+
+async def _close_with_error(websocket: WebSocket, message: str, code: int = 1008):
+    await websocket.send_json({"type": "error", "error": message})
+    await websocket.close(code=code)
+
+def _require_store() -> EvaluationStore:
+    if store is None:
+        raise HTTPException(status_code=503, detail="Evaluation storage is not configured (set EVAL_STORE_PATH)")
+    return store
+
+def _split_columns(group_by: str):
+    return [column.strip() for column in group_by.split(",") if column.strip()]
+
+@app.get("/stats/evaluations")
+def evaluation_stats(
+    group_by: str = "model",
+    bucket: Optional[str] = None,
+    model: Optional[str] = None,
+    task_type: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+):
+    try:
+        return _require_store().evaluation_stats(
+            group_by=_split_columns(group_by),
+            bucket=bucket,
+            model=model,
+            task_type=task_type,
+            start=start,
+            end=end
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/stats/rules")
+def rule_stats(
+    group_by: str = "model,rule_id",
+    bucket: Optional[str] = None,
+    model: Optional[str] = None,
+    task_type: Optional[str] = None,
+    rule_id: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+):
+    try:
+        return _require_store().rule_stats(
+            group_by=_split_columns(group_by),
+            bucket=bucket,
+            model=model,
+            task_type=task_type,
+            rule_id=rule_id,
+            start=start,
+            end=end
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/stats/compare")
+def compare_models(
+    models: Optional[str] = None,
+    baseline: Optional[str] = None,
+    task_type: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    confidence: float = 0.95,
+    resamples: int = 1000,
+    seed: int = 0
+):
+    try:
+        rule_ids, rows = _require_store().score_rows(
+            models=_split_columns(models) if models else None,
+            task_type=task_type,
+            start=start,
+            end=end
+        )
+        return compare(
+            ScoreTable.from_rows(rule_ids, rows),
+            baseline=baseline,
+            confidence=confidence,
+            resamples=resamples,
+            seed=seed
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/reevaluate")
+def reevaluate(
+    model: Optional[str] = None,
+    task_type: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    dry_run: bool = False,
+    max_changes: int = 100
+):
+    try:
+        return reevaluate_store(
+            _require_store(),
+            evaluator,
+            dry_run=dry_run,
+            max_changes=max_changes,
+            model=model,
+            task_type=task_type,
+            start=start,
+            end=end
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/export")
+def export(
+    format: str = "parquet",
+    include_text: bool = False,
+    model: Optional[str] = None,
+    task_type: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+):
+    store = _require_store()
+    try:
+        format = format_for_path("", format)
+        handle, path = tempfile.mkstemp(suffix=f".{format}")
+        os.close(handle)
+        try:
+            export_store(
+                store,
+                path,
+                include_text=include_text,
+                format=format,
+                model=model,
+                task_type=task_type,
+                start=start,
+                end=end
+            )
+        except BaseException:
+            os.remove(path)
+            raise
+    except ImportError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    media_type = "application/vnd.apache.parquet" if format == "parquet" else "application/vnd.apache.arrow.file"
+    return FileResponse(
+        path,
+        media_type=media_type,
+        filename=f"evaluations.{format}",
+        background=BackgroundTask(os.remove, path)
+    )
 
 @app.get("/health")
 def health_check():
     return {
         "status": "healthy",
         "evaluator": "initialized",
-        "rules_loaded": len(evaluator.rules)
+        "rules_loaded": len(evaluator.registry.loaded),
+        "rule_sets": {name: [rule.rule_id for rule in rule_set.rules] for name, rule_set in evaluator.rule_sets.items()},
+        "prompt_cache": prompt_spec_cache.stats(),
+        "token_cache": token_cache.stats(),
+        "json_schemas": schema_registry.ids(),
+        "dedup_index": dedup_rule.index.stats() if dedup_rule is not None else None,
+        "judge": judge_rule.client.stats() if judge_rule is not None else None,
+        "dispatcher": dispatcher.stats(),
+        "result_cache": result_cache.stats() if result_cache is not None else None,
+        "store": store.stats() if store is not None else None
     }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(evaluator.metrics.render(), media_type="text/plain; version=0.0.4")
+
+app.add_middleware(
+    MetricsMiddleware,
+    metrics=evaluator.metrics,
+    known_paths=[route.path for route in app.routes]
+)
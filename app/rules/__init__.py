@@ -1,6 +1,28 @@
 from app.rules.base_rule import BaseRule
-from app.rules.format_rules import EmptyOutputRule, JSONFormatRule, LengthConstraintRule
-from app.rules.content_rules import RequiredKeywordsRule, ForbiddenPhrasesRule
+from importlib import import_module
+
+# Rule classes are imported on first access, so importing the package stays cheap
+_RULE_MODULES = {
+    'EmptyOutputRule': 'app.rules.format_rules',
+    'JSONFormatRule': 'app.rules.format_rules',
+    'LengthConstraintRule': 'app.rules.format_rules',
+    'RequiredKeywordsRule': 'app.rules.content_rules',
+    'ForbiddenPhrasesRule': 'app.rules.content_rules',
+    'TokenF1Rule': 'app.rules.reference_rules',
+    'RougeLRule': 'app.rules.reference_rules',
+    'NgramOverlapRule': 'app.rules.reference_rules',
+    'NumericConsistencyRule': 'app.rules.reference_rules',
+    'NearDuplicateRule': 'app.rules.duplicate_rules',
+    'PromptInjectionRule': 'app.rules.injection_rules',
+    'LLMJudgeRule': 'app.rules.judge_rules'
+}
+
+
+def __getattr__(name):
+    if name not in _RULE_MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(import_module(_RULE_MODULES[name]), name)
+
 
 __all__ = [
     'BaseRule',
@@ -8,5 +30,12 @@ __all__ = [
     'JSONFormatRule',
     'LengthConstraintRule',
     'RequiredKeywordsRule',
-    'ForbiddenPhrasesRule'
+    'ForbiddenPhrasesRule',
+    'TokenF1Rule',
+    'RougeLRule',
+    'NgramOverlapRule',
+    'NumericConsistencyRule',
+    'NearDuplicateRule',
+    'PromptInjectionRule',
+    'LLMJudgeRule'
 ]
\ No newline at end of file
@@ -1,8 +1,61 @@
 from abc import ABC, abstractmethod
-from app.schemas.evaluation import EvaluationRequest, RuleResult
+from app.schemas.evaluation import EvaluationRequest
+from app.core.records import RuleRecord
+from app.core.analysis import OutputAnalysis, RunningCounts
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import json
+
+# (passed, explanation) for a rule whose outcome is settled while output is still streaming
+Verdict = Tuple[bool, str]
+
+_NOT_PLAIN = object()
+
+
+# value as JSON-ready data if it is plain data (strings, numbers, and lists, tuples, sets
+# or dicts of them), else _NOT_PLAIN
+def _plain(value: Any) -> Any:
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [_plain(item) for item in value]
+        if any(item is _NOT_PLAIN for item in items):
+            return _NOT_PLAIN
+        return sorted(items, key=repr) if isinstance(value, (set, frozenset)) else items
+    if isinstance(value, dict):
+        items = {str(key): _plain(item) for key, item in value.items()}
+        return _NOT_PLAIN if any(item is _NOT_PLAIN for item in items.values()) else items
+    return _NOT_PLAIN
 
 class BaseRule(ABC):
 
+    # Rules whose evaluate() accepts the shared OutputAnalysis as a second argument set this
+    uses_context = False
+
+    # Bump when a rule's logic changes so cached and stored results are invalidated
+    version = "1"
+
+    # Score dimension the rule counts towards ("format" -> format_score); None counts towards none
+    dimension: Optional[str] = None
+
+    # Rules whose result depends on more than the request (e.g. on outputs seen before)
+    # set this to False; rule sets containing one bypass the result cache
+    deterministic = True
+
+    # Rules that wait on I/O (e.g. a remote judge) set this and implement evaluate_async.
+    # The evaluator starts them on the shared I/O loop and runs the other rules meanwhile.
+    is_async = False
+
+    # Relative cost estimate; the evaluator runs cheaper rules first
+    cost = 1.0
+
+    # Rules that must be evaluated before this one
+    depends_on: Tuple[str, ...] = ()
+
+    # If any of these rules failed, this one cannot change the outcome and is skipped.
+    # Listed rules are implicitly dependencies.
+    skip_if_failed: Tuple[str, ...] = ()
+
     def __init__(self):
         pass
 
@@ -17,19 +70,71 @@ class BaseRule(ABC):
         pass
 
     @abstractmethod
-    def evaluate(self, request: EvaluationRequest) -> RuleResult:
+    def evaluate(self, request: EvaluationRequest) -> RuleRecord:
         pass
 
+    # Precondition checked before the rule runs; a rule that does not apply is skipped
+    def applies_to(self, request: EvaluationRequest, context: OutputAnalysis) -> bool:
+        return True
+
+    # Rules that can settle their outcome before the output is complete return a tracker
+    def stream_tracker(self, request: EvaluationRequest) -> Optional["RuleTracker"]:
+        return None
+
+    def evaluate_in_context(self, request: EvaluationRequest, context: OutputAnalysis) -> RuleRecord:
+        if self.uses_context:
+            return self.evaluate(request, context)
+        return self.evaluate(request)
+
+    async def evaluate_async(self, request: EvaluationRequest, context: OutputAnalysis) -> RuleRecord:
+        return self.evaluate_in_context(request, context)
+
+    # Rules that can share work across requests (e.g. prompt parsing) override this
+    def evaluate_batch(
+        self,
+        requests: List[EvaluationRequest],
+        contexts: Optional[List[OutputAnalysis]] = None
+    ) -> List[RuleRecord]:
+        if contexts is None:
+            contexts = [OutputAnalysis(request.output) for request in requests]
+        return [self.evaluate_in_context(request, context) for request, context in zip(requests, contexts)]
+
+    # Settings the rule's results depend on. By default these are its public instance
+    # attributes that hold plain data (e.g. ForbiddenPhrasesRule.phrases). Rules that
+    # depend on other state override this or fold that state into their version.
+    def config(self) -> Dict[str, Any]:
+        config = {}
+        for name, value in vars(self).items():
+            if not name.startswith("_") and name != "version":
+                value = _plain(value)
+                if value is not _NOT_PLAIN:
+                    config[name] = value
+        return config
+
+    # Identifies what the rule computes: its id, version and config. Stored with every
+    # result, so re-evaluation only reruns rules whose fingerprint has changed.
+    @property
+    def fingerprint(self) -> str:
+        data = json.dumps([self.rule_id, str(self.version), self.config()], sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(data.encode()).hexdigest()[:16]
+
     def _create_result(
         self,
         passed: bool,
         score: float,
         explanation: str
-    ) -> RuleResult:
-        return RuleResult(
-            rule_id=self.rule_id,
-            rule_name=self.rule_name,
-            passed=passed,
-            score=score,
-            explanation=explanation
-        )
\ No newline at end of file
+    ) -> RuleRecord:
+        return RuleRecord(self.rule_id, self.rule_name, passed, score, explanation)
+
+
+# Incremental counterpart of a rule, fed output pieces as they are generated.
+# feed() returns a verdict once the outcome can no longer change. Verdicts wait until the
+# output has content, since until then the rule may still be skipped as empty.
+class RuleTracker(ABC):
+
+    def __init__(self, rule: BaseRule):
+        self.rule = rule
+
+    @abstractmethod
+    def feed(self, chunk: str, counts: RunningCounts) -> Optional[Verdict]:
+        pass
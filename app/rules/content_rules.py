@@ -1,10 +1,18 @@
-from app.rules.base_rule import BaseRule
-from app.schemas.evaluation import EvaluationRequest, RuleResult
-import re
+from app.rules.base_rule import BaseRule, RuleTracker, Verdict
+from app.schemas.evaluation import EvaluationRequest
+from app.core.records import RuleRecord
+from app.core.analysis import OutputAnalysis, RunningCounts
+from app.core.matcher import StreamMatcher, get_matcher
+from app.core.prompt_spec import get_prompt_spec
+from typing import Iterable, List, Optional
 
 
 # Rule to check if the output contains required keywords specified in the prompt
 class RequiredKeywordsRule(BaseRule):
+    dimension = "content"
+    uses_context = True
+    skip_if_failed = ("empty_output",)
+
     @property
     def rule_id(self) -> str:
         return "required_keywords"
@@ -13,7 +21,9 @@ class RequiredKeywordsRule(BaseRule):
     def rule_name(self) -> str:
         return "required keyword detection"
 
-    def evaluate(self, request: EvaluationRequest) -> RuleResult:
+    def evaluate(self, request: EvaluationRequest, context: Optional[OutputAnalysis] = None) -> RuleRecord:
+        context = context or OutputAnalysis(request.output)
+
         if not request.prompt:
             return self._create_result(
                 passed=True,
@@ -30,13 +40,14 @@ class RequiredKeywordsRule(BaseRule):
                 explanation="No required keywords detected in prompt"
             )
 
-        output_lower = request.output.lower()
+        matcher = get_matcher(keyword.lower() for keyword in required_keywords)
+        positions = matcher.first_matches_pieces(context.lowered_pieces())
         missing_keywords = []
         found_keywords = []
 
-        for keyword in required_keywords:
-            if keyword.lower() in output_lower:
-                found_keywords.append(keyword)
+        for index, keyword in enumerate(required_keywords):
+            if index in positions:
+                found_keywords.append(f"{keyword} (at {positions[index]})")
             else:
                 missing_keywords.append(keyword)
 
@@ -55,39 +66,18 @@ class RequiredKeywordsRule(BaseRule):
             explanation=f"All {len(required_keywords)} required keywords present: {', '.join(found_keywords)}"
         )
 
-    def _extract_required_keywords(self, prompt: str) -> list[str]:
-        keywords = []
-
-        pattern1 = re.findall(
-            r"must (?:include|mention|contain|use)(?: the (?:word|term|phrase))? ['\"]([^'\"]+)['\"]",
-            prompt,
-            re.IGNORECASE,
-        )
-        keywords.extend(pattern1)
-
-        pattern2 = re.findall(
-            r"make sure to (?:mention|include|use) ['\"]([^'\"]+)['\"]",
-            prompt,
-            re.IGNORECASE,
-        )
-        keywords.extend(pattern2)
-
-        pattern3_match = re.search(
-            r"include (?:the )?following (?:terms?|words?|phrases?)?:?\s*([^\n]+)",
-            prompt,
-            re.IGNORECASE,
-        )
-        if pattern3_match:
-            terms_str = pattern3_match.group(1)
-            terms = [t.strip().strip("\"',") for t in terms_str.split(",")]
-            keywords.extend(terms)
-
-        return list(set(keywords))
+    def _extract_required_keywords(self, prompt: str) -> List[str]:
+        return list(get_prompt_spec(prompt).required_keywords)
 
 
 
 # Rule to check if the output contains forbidden phrases
 class ForbiddenPhrasesRule(BaseRule):
+    dimension = "content"
+    uses_context = True
+    cost = 1.5
+    skip_if_failed = ("empty_output",)
+
     FORBIDDEN_PHRASES = [
         "as an ai",
         "as a language model",
@@ -102,6 +92,11 @@ class ForbiddenPhrasesRule(BaseRule):
         "i cannot provide real-time",
     ]
 
+    def __init__(self, phrases: Optional[Iterable[str]] = None):
+        super().__init__()
+        source = self.FORBIDDEN_PHRASES if phrases is None else phrases
+        self.phrases = tuple(phrase.lower() for phrase in source)
+
     @property
     def rule_id(self) -> str:
         return "forbidden_phrases"
@@ -110,24 +105,25 @@ class ForbiddenPhrasesRule(BaseRule):
     def rule_name(self) -> str:
         return "forbidden phrase detection"
 
-    def evaluate(self, request: EvaluationRequest) -> RuleResult:
-        output_lower = request.output.lower()
+    def stream_tracker(self, request: EvaluationRequest) -> RuleTracker:
+        return ForbiddenPhrasesTracker(self)
 
-        found_phrases = []
-        for phrase in self.FORBIDDEN_PHRASES:
-            if phrase in output_lower:
-                found_phrases.append(phrase)
+    def evaluate(self, request: EvaluationRequest, context: Optional[OutputAnalysis] = None) -> RuleRecord:
+        context = context or OutputAnalysis(request.output)
+
+        found_phrases = get_matcher(self.phrases).find_pieces(context.lowered_pieces())
 
         if found_phrases:
             score = max(0.0, 1.0 - (len(found_phrases) * 0.3))
+            cited = [f"'{phrase}' (at {position})" for phrase, position in found_phrases]
             
             if len(found_phrases) <= 5:
-                phrases_list = "', '".join(found_phrases)
-                explanation = f"contains {len(found_phrases)} forbidden phrase(s): '{phrases_list}'"
+                phrases_list = ", ".join(cited)
+                explanation = f"contains {len(found_phrases)} forbidden phrase(s): {phrases_list}"
             else:
-                first_five = "', '".join(found_phrases[:5])
+                first_five = ", ".join(cited[:5])
                 remaining = len(found_phrases) - 5
-                explanation = f"contains {len(found_phrases)} forbidden phrase(s): '{first_five}' and {remaining} more"
+                explanation = f"contains {len(found_phrases)} forbidden phrase(s): {first_five} and {remaining} more"
             
             return self._create_result(
                 passed=False,
@@ -139,4 +135,18 @@ class ForbiddenPhrasesRule(BaseRule):
             passed=True,
             score=1.0,
             explanation="No forbidden phrases detected",
-        )
\ No newline at end of file
+        )
+
+
+# Fails on the first forbidden phrase, including one split across pieces
+class ForbiddenPhrasesTracker(RuleTracker):
+
+    def __init__(self, rule: ForbiddenPhrasesRule):
+        super().__init__(rule)
+        self.matcher = StreamMatcher(get_matcher(rule.phrases))
+
+    def feed(self, chunk: str, counts: RunningCounts) -> Optional[Verdict]:
+        if self.matcher.feed(chunk.lower()):
+            cited = [f"'{phrase}' (at {position})" for phrase, position in self.matcher.matches()]
+            return False, f"contains forbidden phrase(s): {', '.join(cited)}"
+        return None
@@ -0,0 +1,123 @@
+from app.rules.base_rule import BaseRule
+from app.schemas.evaluation import EvaluationRequest
+from app.core.records import RuleRecord, request_prompt_key
+from app.core.analysis import OutputAnalysis, TokenView
+from app.core.minhash import MinHasher, MinHashIndex, distinct
+from app.config import settings
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# Characters of an indexed output kept to point at it in explanations
+PREVIEW_CHARS = 60
+
+
+def _preview(text: str) -> str:
+    text = " ".join(text[:PREVIEW_CHARS * 2].split())
+    return text if len(text) <= PREVIEW_CHARS else text[:PREVIEW_CHARS - 3] + "..."
+
+
+# Degenerate and boilerplate output: fails when an output keeps repeating its own word
+# shingles, or when it is a near-copy of an earlier output for a different prompt.
+# Earlier outputs are the MinHash signatures this rule has indexed so far (requests
+# earlier in the batch, earlier requests, and history loaded with warm()), so unlike
+# other rules its result depends on what it has seen; rule sets using it bypass the
+# result cache. Opt-in: the rule is in the catalog but in no rule set by default.
+class NearDuplicateRule(BaseRule):
+    dimension = "content"
+    uses_context = True
+    deterministic = False
+    cost = 2.0
+    skip_if_failed = ("empty_output",)
+
+    def __init__(
+        self,
+        repetition_threshold: float = 0.5,
+        similarity_threshold: float = 0.8,
+        shingle_size: int = 3,
+        min_tokens: int = 20,
+        max_entries: Optional[int] = None,
+        index: Optional[MinHashIndex] = None
+    ):
+        super().__init__()
+        if shingle_size < 1:
+            raise ValueError("shingle_size must be at least 1")
+        self.repetition_threshold = repetition_threshold
+        self.similarity_threshold = similarity_threshold
+        self.min_tokens = max(min_tokens, shingle_size)
+        self.hasher = MinHasher(shingle_size=shingle_size)
+        self.index = index or MinHashIndex(
+            num_perm=self.hasher.num_perm,
+            max_entries=max_entries if max_entries is not None else settings.dedup_index_size
+        )
+
+    def config(self) -> Dict[str, Any]:
+        return {**super().config(), "shingle_size": self.hasher.shingle_size, "num_perm": self.hasher.num_perm}
+
+    @property
+    def rule_id(self) -> str:
+        return "near_duplicate"
+
+    @property
+    def rule_name(self) -> str:
+        return "repetition and near-duplicate output"
+
+    # Indexes earlier outputs as (prompt key, output) pairs, oldest first, without
+    # checking them
+    def warm(self, outputs: Iterable[Tuple[Optional[str], str]]) -> int:
+        indexed = 0
+        for prompt_key, output in outputs:
+            tokens = TokenView(output).tokens
+            if len(tokens) < self.min_tokens:
+                continue
+            signature = self.hasher.signature(distinct(self.hasher.shingles(tokens)))
+            self.index.insert(signature, prompt_key, _preview(output))
+            indexed += 1
+        return indexed
+
+    def evaluate(self, request: EvaluationRequest, context: Optional[OutputAnalysis] = None) -> RuleRecord:
+        context = context or OutputAnalysis(request.output)
+
+        tokens = context.word_tokens.tokens
+        if len(tokens) < self.min_tokens:
+            return self._create_result(
+                passed=True,
+                score=1.0,
+                explanation=f"Output too short to check for repetition ({len(tokens)} words)"
+            )
+
+        shingles = self.hasher.shingles(tokens)
+        unique = distinct(shingles)
+        # share of shingles repeating an earlier one: near 0 for ordinary text, near 1
+        # for output stuck in a loop
+        repetition = 1.0 - len(unique) / len(shingles)
+        matches = self.index.query_and_insert(
+            self.hasher.signature(unique),
+            self.similarity_threshold,
+            group=request_prompt_key(request),
+            label=_preview(request.output)
+        )
+
+        problems = []
+        score = 1.0
+        if repetition > self.repetition_threshold:
+            problems.append(f"{repetition:.0%} of {self.hasher.shingle_size}-word sequences are repeated")
+            score = 1.0 - repetition
+        if matches:
+            similarity, preview = matches[0]
+            problems.append(
+                f"near-duplicate (similarity {similarity:.2f}) of an earlier output for a different "
+                f"prompt: \"{preview}\""
+            )
+            score = min(score, 1.0 - similarity)
+
+        if problems:
+            return self._create_result(
+                passed=False,
+                score=score,
+                explanation="Output " + "; ".join(problems)
+            )
+
+        return self._create_result(
+            passed=True,
+            score=1.0,
+            explanation=f"No repetition or near-duplicates found ({repetition:.0%} repeated sequences)"
+        )
@@ -1,11 +1,21 @@
-from app.schemas.evaluation import EvaluationRequest, RuleResult
-from app.rules.base_rule import BaseRule
+from app.schemas.evaluation import EvaluationRequest
+from app.core.records import RuleRecord
+from app.rules.base_rule import BaseRule, RuleTracker, Verdict
+from app.core.analysis import OutputAnalysis, RunningCounts
+from app.core.prompt_spec import get_prompt_spec
+from app.core.json_schema import CompiledSchema, SchemaViolation, compile_schema, json_depth, json_valid, schema_registry
+from app.config import settings
+from typing import Optional, Tuple
 import json
-import re
+
+LENGTH_COUNTERS = {"words": "word_count", "characters": "char_count", "sentences": "sentence_count"}
 
 
 # Rule to check if the output is empty or contains only whitespaces
 class EmptyOutputRule(BaseRule):
+    dimension = "format"
+    uses_context = True
+    cost = 0.1
 
     @property
     def rule_id(self) -> str:
@@ -15,10 +25,12 @@ class EmptyOutputRule(BaseRule):
     def rule_name(self) -> str:
         return "empty output detection"
 
-    def evaluate(self, request: EvaluationRequest) -> RuleResult:
-        output = request.output.strip()
+    def evaluate(self, request: EvaluationRequest, context: Optional[OutputAnalysis] = None) -> RuleRecord:
+        context = context or OutputAnalysis(request.output)
+
+        length = context.stripped_length
 
-        if len(output) == 0:
+        if length == 0:
             return self._create_result(
                 passed=False,
                 score=0.0,
@@ -28,12 +40,34 @@ class EmptyOutputRule(BaseRule):
         return self._create_result(
             passed=True,
             score=1.0,
-            explanation=f"output contains {len(output)} characters"
+            explanation=f"output contains {length} characters"
         )
 
+    def stream_tracker(self, request: EvaluationRequest) -> RuleTracker:
+        return EmptyOutputTracker(self)
+
 
-# Rule to check if the output is valid JSON when expected
+class EmptyOutputTracker(RuleTracker):
+
+    def feed(self, chunk: str, counts: RunningCounts) -> Optional[Verdict]:
+        if counts.has_content:
+            return True, "output has content"
+        return None
+
+
+# Rule to check if the output is valid JSON when expected, and that it matches the
+# request's JSON Schema when one is given in meta["json_schema"] or meta["json_schema_id"]
 class JSONFormatRule(BaseRule):
+    dimension = "format"
+    uses_context = True
+    cost = 2.0
+    skip_if_failed = ("empty_output",)
+    version = "2"
+
+    def __init__(self, max_chars: Optional[int] = None, max_depth: Optional[int] = None):
+        super().__init__()
+        self.max_chars = max_chars if max_chars is not None else settings.json_max_chars
+        self.max_depth = max_depth if max_depth is not None else settings.json_max_depth
 
     @property
     def rule_id(self) -> str:
@@ -43,8 +77,19 @@ class JSONFormatRule(BaseRule):
     def rule_name(self) -> str:
         return "JSON format validation"
 
-    def evaluate(self, request: EvaluationRequest) -> RuleResult:
-        expects_json = self._expects_json(request)
+    def evaluate(self, request: EvaluationRequest, context: Optional[OutputAnalysis] = None) -> RuleRecord:
+        context = context or OutputAnalysis(request.output)
+
+        try:
+            schema = self._schema_for(request)
+        except ValueError as e:
+            return self._create_result(
+                passed=False,
+                score=0.0,
+                explanation=f"Invalid JSON schema: {str(e)}"
+            )
+
+        expects_json = schema is not None or self._expects_json(request)
 
         if not expects_json:
             return self._create_result(
@@ -53,39 +98,106 @@ class JSONFormatRule(BaseRule):
                 explanation="no JSON format expected for this task"
             )
 
-        output = request.output.strip()
+        length = context.stripped_length
+
+        # cheap limits first, so oversized or pathologically nested output is never parsed
+        if length > self.max_chars:
+            return self._create_result(
+                passed=False,
+                score=0.0,
+                explanation=f"JSON output has {length} characters, exceeds limit of {self.max_chars}"
+            )
+
+        # large output is checked in place without building it; anything but a valid
+        # document without a schema goes on to the full parse for its exact message
+        if context.chunked and schema is None:
+            start, end = context.stripped_bounds
+            if json_valid(context.text, start, end, self.max_depth):
+                return self._create_result(
+                    passed=True,
+                    score=1.0,
+                    explanation=f"Valid JSON with {length} characters"
+                )
+
+        output = context.stripped
+
+        depth = json_depth(output)
+        if depth > self.max_depth:
+            return self._create_result(
+                passed=False,
+                score=0.0,
+                explanation=f"JSON nesting depth {depth} exceeds limit of {self.max_depth}"
+            )
 
         try:
             parsed = json.loads(output)
+        except json.JSONDecodeError as e:
+            return self._create_result(
+                passed=False,
+                score=0.0,
+                explanation=f"Invalid JSON format: {str(e)}"
+            )
+        except RecursionError:
+            # unbalanced nesting the depth scan could not measure
+            return self._create_result(
+                passed=False,
+                score=0.0,
+                explanation=f"JSON nesting depth exceeds limit of {self.max_depth}"
+            )
+
+        if schema is None:
             return self._create_result(
                 passed=True,
                 score=1.0,
-                explanation=f"Valid JSON with {len(str(parsed))} characters"
+                explanation=f"Valid JSON with {length} characters"
             )
-        except json.JSONDecodeError as e:
+
+        try:
+            schema.validate(parsed)
+        except SchemaViolation as e:
             return self._create_result(
                 passed=False,
-                score=0.0,
-                explanation=f"Invalid JSON format: {str(e)}"
+                score=0.5,
+                explanation=f"JSON does not match schema at {e.location}: {e.message}"
             )
 
+        return self._create_result(
+            passed=True,
+            score=1.0,
+            explanation=f"Valid JSON with {len(output)} characters, matches schema"
+        )
+
+    # Inline schemas are compiled once per distinct document; ids refer to registered schemas
+    def _schema_for(self, request: EvaluationRequest) -> Optional[CompiledSchema]:
+        meta = request.meta or {}
+
+        if meta.get("json_schema") is not None:
+            return compile_schema(meta["json_schema"])
+
+        schema_id = meta.get("json_schema_id")
+        if schema_id is None:
+            return None
+
+        schema = schema_registry.get(str(schema_id))
+        if schema is None:
+            raise ValueError(f"unknown schema id '{schema_id}'")
+        return schema
+
     def _expects_json(self, request: EvaluationRequest) -> bool:
         if request.task_type and "json" in request.task_type.lower():
             return True
 
-        if request.prompt:
-            prompt_lower = request.prompt.lower()
-            json_keywords = {"json", "return {", "output {", "format {"}
-
-            for keyword in json_keywords:
-                if keyword in prompt_lower:
-                    return True
+        if request.prompt and get_prompt_spec(request.prompt).mentions_json:
+            return True
 
         return False
 
 
 # Rule to check if the output meets length constraints specified in the prompt
 class LengthConstraintRule(BaseRule):
+    dimension = "format"
+    uses_context = True
+    skip_if_failed = ("empty_output",)
 
     @property
     def rule_id(self) -> str:
@@ -95,7 +207,9 @@ class LengthConstraintRule(BaseRule):
     def rule_name(self) -> str:
         return "Length constraint validation"
 
-    def evaluate(self, request: EvaluationRequest) -> RuleResult:
+    def evaluate(self, request: EvaluationRequest, context: Optional[OutputAnalysis] = None) -> RuleRecord:
+        context = context or OutputAnalysis(request.output)
+
         if not request.prompt:
             return self._create_result(
                 passed=True,
@@ -113,7 +227,7 @@ class LengthConstraintRule(BaseRule):
             )
 
         limit_type, limit_value = constraint
-        actual_value = self._measure_output(request.output, limit_type)
+        actual_value = self._measure_output(context, limit_type)
 
         if actual_value <= limit_value:
             return self._create_result(
@@ -131,32 +245,42 @@ class LengthConstraintRule(BaseRule):
             explanation=f"output has {actual_value} {limit_type}, exceeds limit of {limit_value} by {excess_pct:.1f}%"
         )
 
-    def _extract_length_constraint(self, prompt: str):
-        prompt_lower = prompt.lower()
+    def stream_tracker(self, request: EvaluationRequest) -> RuleTracker:
+        return LengthConstraintTracker(self, request)
 
-        word_match = re.search(r'(\d+)\s*words?', prompt_lower)
-        if word_match:
-            return "words", int(word_match.group(1))
-
-        char_match = re.search(r'(\d+)\s*characters?', prompt_lower)
-        if char_match:
-            return "characters", int(char_match.group(1))
-
-        sent_match = re.search(r'(\d+)\s*sentences?', prompt_lower)
-        if sent_match:
-            return "sentences", int(sent_match.group(1))
-
-        return None
+    def _extract_length_constraint(self, prompt: str) -> Optional[Tuple[str, int]]:
+        return get_prompt_spec(prompt).length_constraint
 
-    def _measure_output(self, output: str, measure_type: str) -> int:
+    def _measure_output(self, context: OutputAnalysis, measure_type: str) -> int:
         if measure_type == "words":
-            return len(output.split())
+            return context.word_count
 
         if measure_type == "characters":
-            return len(output)
+            return context.char_count
 
         if measure_type == "sentences":
-            sentences = re.split(r"[.!?]+", output)
-            return len([s for s in sentences if s.strip()])
+            return context.sentence_count
 
-        return 0
\ No newline at end of file
+        return 0
+
+
+# Counts only grow, so an exceeded limit is final as soon as it is crossed
+class LengthConstraintTracker(RuleTracker):
+
+    def __init__(self, rule: LengthConstraintRule, request: EvaluationRequest):
+        super().__init__(rule)
+        self.constraint = rule._extract_length_constraint(request.prompt) if request.prompt else None
+
+    def feed(self, chunk: str, counts: RunningCounts) -> Optional[Verdict]:
+        if not counts.has_content:
+            return None
+
+        if not self.constraint:
+            return True, "no length constraint to check"
+
+        limit_type, limit_value = self.constraint
+        actual_value = getattr(counts, LENGTH_COUNTERS[limit_type])
+        if actual_value > limit_value:
+            return False, f"output has at least {actual_value} {limit_type}, exceeds limit of {limit_value}"
+
+        return None
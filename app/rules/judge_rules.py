@@ -0,0 +1,98 @@
+from app.rules.base_rule import BaseRule
+from app.schemas.evaluation import EvaluationRequest
+from app.core.records import RuleRecord
+from app.core.analysis import OutputAnalysis
+from app.core.io_loop import io_loop
+from app.core.judge import JudgeClient
+from app.config import settings
+from typing import Any, Dict, Optional
+import asyncio
+
+DEFAULT_RUBRIC = (
+    "Does the output answer the prompt correctly, completely and without irrelevant content? "
+    "Score 1 for a fully satisfactory answer and 0 for an unusable one."
+)
+TRUNCATION_MARK = "\n[... output truncated ...]"
+
+
+# LLM-as-judge: an OpenAI-compatible model grades the output against a rubric, taken from
+# meta["judge_rubric"] or the rule's default. The output passes when the score reaches
+# the threshold. The rule is async: the evaluator starts it on the shared I/O loop, and
+# the deterministic rules run while the judge call is in flight. Connection pooling,
+# batching, coalescing and caching of calls are handled by JudgeClient.
+class LLMJudgeRule(BaseRule):
+    dimension = "judge"
+    is_async = True
+    uses_context = True
+    # starting it costs nothing, so it goes out as early as the plan allows
+    cost = 0.0
+    skip_if_failed = ("empty_output",)
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        model: Optional[str] = None,
+        rubric: str = DEFAULT_RUBRIC,
+        threshold: float = 0.5,
+        max_output_chars: int = 32000,
+        timeout_s: Optional[float] = None,
+        client: Optional[JudgeClient] = None
+    ):
+        super().__init__()
+        base_url = base_url or settings.judge_url
+        if client is None and not base_url:
+            raise ValueError("llm_judge needs a judge endpoint: set EVAL_JUDGE_URL or the rule's base_url option")
+
+        self.client = client or JudgeClient(
+            base_url,
+            model or settings.judge_model,
+            api_key=settings.judge_api_key,
+            max_in_flight=settings.judge_max_in_flight,
+            batch_size=settings.judge_batch_size,
+            batch_window_ms=settings.judge_batch_window_ms,
+            timeout_s=settings.judge_timeout_s,
+            cache_size=settings.judge_cache_size
+        )
+        self.rubric = rubric
+        self.threshold = threshold
+        # longer outputs are cut before judging, to stay within the judge's context window
+        self.max_output_chars = max_output_chars
+        # covers waiting for a slot and for the batch window as well as the call itself
+        self.timeout_s = timeout_s or settings.judge_timeout_s * 2
+
+    def config(self) -> Dict[str, Any]:
+        return {
+            "model": self.client.model,
+            "rubric": self.rubric,
+            "threshold": self.threshold,
+            "max_output_chars": self.max_output_chars
+        }
+
+    @property
+    def rule_id(self) -> str:
+        return "llm_judge"
+
+    @property
+    def rule_name(self) -> str:
+        return "LLM-as-judge"
+
+    async def evaluate_async(self, request: EvaluationRequest, context: Optional[OutputAnalysis] = None) -> RuleRecord:
+        rubric = (request.meta or {}).get("judge_rubric") or self.rubric
+        output = request.output
+        if len(output) > self.max_output_chars:
+            output = output[:self.max_output_chars] + TRUNCATION_MARK
+
+        try:
+            verdict = await asyncio.wait_for(self.client.judge(request.prompt or "", output, str(rubric)), self.timeout_s)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"no verdict from the judge within {self.timeout_s:g}s") from None
+
+        passed = verdict.score >= self.threshold
+        explanation = f"Judge score {verdict.score:.2f} (threshold {self.threshold:.2f})"
+        if verdict.reason:
+            explanation += f": {verdict.reason}"
+        return self._create_result(passed=passed, score=verdict.score, explanation=explanation)
+
+    # For callers outside the evaluator; blocks until the verdict is in
+    def evaluate(self, request: EvaluationRequest, context: Optional[OutputAnalysis] = None) -> RuleRecord:
+        return io_loop.submit(self.evaluate_async(request, context)).result()
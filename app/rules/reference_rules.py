@@ -0,0 +1,235 @@
+from abc import abstractmethod
+from app.rules.base_rule import BaseRule
+from app.schemas.evaluation import EvaluationRequest
+from app.core.records import RuleRecord
+from app.core.analysis import OutputAnalysis, TokenView
+from app.core.overlap import (
+    batch_clipped_overlap,
+    clipped_overlap,
+    f_measure,
+    get_cached_tokens,
+    lcs_length
+)
+from typing import FrozenSet, List, Optional
+
+
+# Common ground for rules that compare the output with request.reference: they only
+# apply when a reference is given, and pass when their score reaches `threshold`.
+# A reference of at most short_reference_tokens tokens (a name, a date) is an answer the
+# output should contain rather than match, so overlap with it is scored by recall.
+class ReferenceRule(BaseRule):
+    dimension = "reference"
+    uses_context = True
+    skip_if_failed = ("empty_output",)
+    threshold = 0.5
+    short_reference_tokens = 4
+
+    def __init__(self, threshold: Optional[float] = None):
+        super().__init__()
+        if threshold is not None:
+            self.threshold = threshold
+
+    def applies_to(self, request: EvaluationRequest, context: OutputAnalysis) -> bool:
+        return bool(request.reference and request.reference.strip())
+
+    def evaluate(self, request: EvaluationRequest, context: Optional[OutputAnalysis] = None) -> RuleRecord:
+        context = context or OutputAnalysis(request.output)
+
+        if not request.reference or not request.reference.strip():
+            return self._create_result(
+                passed=True,
+                score=1.0,
+                explanation="No reference provided to compare against"
+            )
+
+        return self._compare(context.word_tokens, get_cached_tokens(request.reference))
+
+    @abstractmethod
+    def _compare(self, output: TokenView, reference: TokenView) -> RuleRecord:
+        pass
+
+    def _scored_result(
+        self,
+        name: str,
+        score: float,
+        precision: float,
+        recall: float,
+        reference_tokens: int
+    ) -> RuleRecord:
+        if reference_tokens <= self.short_reference_tokens:
+            score = recall
+            name = f"{name} of short reference, scored by recall"
+        else:
+            name = f"{name} with reference"
+        return self._create_result(
+            passed=score >= self.threshold,
+            score=score,
+            explanation=(
+                f"{name}: {score:.2f} (precision {precision:.2f}, recall {recall:.2f}; "
+                f"threshold {self.threshold:.2f})"
+            )
+        )
+
+
+# Clipped n-gram overlap F1. A reference shorter than n tokens has no n-grams and is
+# compared on unigrams. Batches compute all overlaps in one sparse-vector pass.
+class NgramOverlapRule(ReferenceRule):
+    cost = 1.5
+    threshold = 0.3
+    n = 2
+    label = "Bigram F1"
+
+    def __init__(self, threshold: Optional[float] = None, n: Optional[int] = None):
+        super().__init__(threshold)
+        if n is not None:
+            if n < 1:
+                raise ValueError("n must be at least 1")
+            self.n = n
+            self.label = f"{n}-gram F1"
+
+    @property
+    def rule_id(self) -> str:
+        return "ngram_overlap"
+
+    @property
+    def rule_name(self) -> str:
+        return "reference n-gram overlap"
+
+    def _compare(self, output: TokenView, reference: TokenView) -> RuleRecord:
+        n = self.n if len(reference) >= self.n else 1
+        reference_counts = reference.ngram_counts(n)
+        overlap = clipped_overlap(output.ngram_counts_among(n, reference_counts), reference_counts)
+        label = self.label if n == self.n else "Token F1"
+        return self._overlap_result(overlap, output.ngram_count(n), reference.ngram_count(n), len(reference), label)
+
+    def _overlap_result(
+        self,
+        overlap: int,
+        predicted: int,
+        reference: int,
+        reference_tokens: int,
+        label: str
+    ) -> RuleRecord:
+        score, precision, recall = f_measure(overlap, predicted, reference)
+        return self._scored_result(label, score, precision, recall, reference_tokens)
+
+    def evaluate_batch(
+        self,
+        requests: List[EvaluationRequest],
+        contexts: Optional[List[OutputAnalysis]] = None
+    ) -> List[RuleRecord]:
+        if contexts is None:
+            contexts = [OutputAnalysis(request.output) for request in requests]
+
+        results: List[Optional[RuleRecord]] = [None] * len(requests)
+        items = []
+        outputs = []
+        references = []
+        reference_tokens = []
+        for item, (request, context) in enumerate(zip(requests, contexts)):
+            reference = get_cached_tokens(request.reference) if request.reference and request.reference.strip() else None
+            # chunked outputs are compared one at a time, without materializing their
+            # n-grams, and so are references that fall back to unigrams
+            if reference is not None and len(reference) >= self.n and not context.chunked:
+                items.append(item)
+                outputs.append(context.word_tokens.ngrams(self.n))
+                references.append(reference.ngrams(self.n))
+                reference_tokens.append(len(reference))
+            else:
+                results[item] = self.evaluate(request, context)
+
+        if items:
+            overlaps = batch_clipped_overlap(outputs, references)
+            for item, overlap, predicted, reference, tokens in zip(
+                items, overlaps.tolist(), outputs, references, reference_tokens
+            ):
+                results[item] = self._overlap_result(overlap, len(predicted), len(reference), tokens, self.label)
+
+        return results
+
+
+# Bag-of-words F1 between output and reference tokens (SQuAD-style token F1)
+class TokenF1Rule(NgramOverlapRule):
+    cost = 1.0
+    threshold = 0.5
+    n = 1
+    label = "Token F1"
+
+    def __init__(self, threshold: Optional[float] = None):
+        super().__init__(threshold)
+
+    @property
+    def rule_id(self) -> str:
+        return "token_f1"
+
+    @property
+    def rule_name(self) -> str:
+        return "reference token F1"
+
+
+# ROUGE-L: F1 of the longest common token subsequence, computed bit-parallel
+class RougeLRule(ReferenceRule):
+    cost = 3.0
+    threshold = 0.4
+
+    @property
+    def rule_id(self) -> str:
+        return "rouge_l"
+
+    @property
+    def rule_name(self) -> str:
+        return "reference ROUGE-L"
+
+    def _compare(self, output: TokenView, reference: TokenView) -> RuleRecord:
+        lcs = lcs_length(output.iter_tokens(), reference.lcs_masks, len(reference)) if len(reference) else 0
+        score, precision, recall = f_measure(lcs, len(output), len(reference))
+        return self._scored_result("ROUGE-L", score, precision, recall, len(reference))
+
+
+# Hallucination heuristic: every number in the output should appear in the reference
+# (or in the prompt, which the output may legitimately echo)
+class NumericConsistencyRule(ReferenceRule):
+    threshold = 1.0
+
+    @property
+    def rule_id(self) -> str:
+        return "numeric_consistency"
+
+    @property
+    def rule_name(self) -> str:
+        return "numeric consistency with reference"
+
+    def evaluate(self, request: EvaluationRequest, context: Optional[OutputAnalysis] = None) -> RuleRecord:
+        context = context or OutputAnalysis(request.output)
+
+        if not request.reference or not request.reference.strip():
+            return super().evaluate(request, context)
+
+        echoed = get_cached_tokens(request.prompt).numbers if request.prompt else frozenset()
+        return self._compare(context.word_tokens, get_cached_tokens(request.reference), echoed)
+
+    def _compare(self, output: TokenView, reference: TokenView, echoed: FrozenSet[str] = frozenset()) -> RuleRecord:
+        numbers = output.numbers
+        if not numbers:
+            return self._create_result(
+                passed=True,
+                score=1.0,
+                explanation="No numbers in output to check against reference"
+            )
+
+        supported = reference.numbers | echoed
+        unsupported = sorted(numbers - supported)
+        score = 1.0 - len(unsupported) / len(numbers)
+
+        if unsupported:
+            return self._create_result(
+                passed=score >= self.threshold,
+                score=score,
+                explanation=f"Numbers not found in reference: {', '.join(unsupported)}"
+            )
+
+        return self._create_result(
+            passed=True,
+            score=1.0,
+            explanation=f"All {len(numbers)} numbers in output appear in reference"
+        )
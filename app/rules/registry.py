@@ -0,0 +1,157 @@
+from app.core.plan import RulePlan
+from app.rules.base_rule import BaseRule
+from importlib import import_module
+from importlib.metadata import entry_points
+from typing import Any, Dict, List, Optional, Sequence
+import hashlib
+import json
+import os
+
+DEFAULT_CATALOG = os.path.join(os.path.dirname(__file__), "catalog.json")
+DEFAULT_RULE_SET = "default"
+# Installed packages can contribute rules: an entry point named after the rule id,
+# pointing at the rule class ("package.module:RuleClass")
+ENTRY_POINT_GROUP = "llm_eval.rules"
+
+
+# A rule set compiled for execution: its rules in declaration order, the plan over
+# them, and the weights that roll dimension scores up into the overall score
+class RuleSet:
+
+    def __init__(self, name: str, rules: Sequence[BaseRule], weights: Optional[Dict[str, float]] = None):
+        self.name = name
+        self.rules = list(rules)
+        self.plan = RulePlan(self.rules)
+        self.weights = dict(weights or {})
+        # rule id -> BaseRule.fingerprint, taken once when the set is compiled
+        self.fingerprints = {rule.rule_id: rule.fingerprint for rule in self.rules}
+
+    def __repr__(self) -> str:
+        return f"RuleSet({self.name!r}, rules={[rule.rule_id for rule in self.rules]})"
+
+    @property
+    def dimensions(self) -> Dict[str, Optional[str]]:
+        return {rule.rule_id: rule.dimension for rule in self.rules}
+
+    def weight(self, dimension: str) -> float:
+        return self.weights.get(dimension, 1.0)
+
+    @property
+    def cacheable(self) -> bool:
+        return all(rule.deterministic for rule in self.rules)
+
+    @property
+    def fingerprint(self) -> str:
+        # changes whenever a rule is added, removed, bumps its version or changes its
+        # config, changes what it skips on or the weights change
+        signature = "|".join(f"{rule_id}:{fingerprint}" for rule_id, fingerprint in self.fingerprints.items())
+        signature += "|" + self.plan.signature
+        if self.weights:
+            signature += "|" + json.dumps(self.weights, sort_keys=True)
+        return hashlib.sha256(signature.encode()).hexdigest()
+
+
+# Catalog of rules and the rule sets built from them. Rules are declared as import
+# paths and only imported when a rule set that uses them is compiled, so the catalog
+# can grow without slowing down startup. Each task type maps to a rule set; task types
+# without an entry use the default set.
+class RuleRegistry:
+
+    def __init__(
+        self,
+        rules: Dict[str, Any],
+        rule_sets: Dict[str, Dict[str, Any]],
+        task_types: Optional[Dict[str, str]] = None
+    ):
+        self._specs: Dict[str, Dict[str, Any]] = {}
+        self._instances: Dict[str, BaseRule] = {}
+        for rule_id, spec in rules.items():
+            self.register(rule_id, spec)
+
+        if DEFAULT_RULE_SET not in rule_sets:
+            raise ValueError(f"rule catalog has no '{DEFAULT_RULE_SET}' rule set")
+
+        self.rule_sets = {}
+        for name, rule_set in rule_sets.items():
+            unknown = [rule_id for rule_id in rule_set.get("rules", []) if rule_id not in self._specs]
+            if unknown:
+                raise ValueError(f"rule set '{name}' uses unknown rule(s): {', '.join(unknown)}")
+            self.rule_sets[name] = {
+                "rules": list(rule_set.get("rules", [])),
+                "weights": {dimension: float(weight) for dimension, weight in rule_set.get("weights", {}).items()}
+            }
+
+        self.task_types = {}
+        for task_type, name in (task_types or {}).items():
+            if name not in self.rule_sets:
+                raise ValueError(f"task type '{task_type}' maps to unknown rule set '{name}'")
+            self.task_types[task_type.strip().lower()] = name
+
+    @classmethod
+    def from_file(cls, path: str, include_entry_points: bool = True) -> "RuleRegistry":
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+
+        rules = dict(config.get("rules", {}))
+        if include_entry_points:
+            # the catalog wins over installed packages for the same rule id
+            for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+                rules.setdefault(entry_point.name, entry_point.value)
+
+        return cls(rules, config.get("rule_sets", {}), config.get("task_types"))
+
+    # spec is "module:Class" or {"class": "module:Class", "options": {...}}, where
+    # options are passed to the rule's constructor
+    def register(self, rule_id: str, spec: Any):
+        if isinstance(spec, str):
+            spec = {"class": spec}
+        if not isinstance(spec, dict) or ":" not in spec.get("class", ""):
+            raise ValueError(f"rule '{rule_id}' must be declared as 'module:Class'")
+        self._specs[rule_id] = {"class": spec["class"], "options": dict(spec.get("options", {}))}
+        self._instances.pop(rule_id, None)
+
+    @property
+    def rule_ids(self) -> List[str]:
+        return sorted(self._specs)
+
+    @property
+    def loaded(self) -> List[str]:
+        return sorted(self._instances)
+
+    def rule(self, rule_id: str) -> BaseRule:
+        rule = self._instances.get(rule_id)
+        if rule is None:
+            rule = self._instances[rule_id] = self._load(rule_id)
+        return rule
+
+    def rule_set_name(self, task_type: Optional[str]) -> str:
+        if task_type is None:
+            return DEFAULT_RULE_SET
+        return self.task_types.get(task_type.strip().lower(), DEFAULT_RULE_SET)
+
+    def compile(self, name: str) -> RuleSet:
+        rule_set = self.rule_sets[name]
+        return RuleSet(name, [self.rule(rule_id) for rule_id in rule_set["rules"]], rule_set["weights"])
+
+    def compile_all(self) -> Dict[str, RuleSet]:
+        return {name: self.compile(name) for name in self.rule_sets}
+
+    def _load(self, rule_id: str) -> BaseRule:
+        spec = self._specs.get(rule_id)
+        if spec is None:
+            raise ValueError(f"unknown rule '{rule_id}'")
+
+        module_name, _, class_name = spec["class"].partition(":")
+        try:
+            rule_class = getattr(import_module(module_name), class_name)
+        except (ImportError, AttributeError) as e:
+            raise ValueError(f"cannot load rule '{rule_id}' from '{spec['class']}': {e}") from None
+
+        rule = rule_class(**spec["options"])
+        if rule.rule_id != rule_id:
+            raise ValueError(f"rule '{spec['class']}' has id '{rule.rule_id}', but is declared as '{rule_id}'")
+        return rule
+
+
+def load_registry(path: Optional[str] = None) -> RuleRegistry:
+    return RuleRegistry.from_file(path or DEFAULT_CATALOG)
@@ -52,6 +52,7 @@ class RuleResult(BaseModel):
     passed: bool = Field(description="whether the output passed this rule")
     score: float = Field(..., ge=0.0, le=1.0, description="score for this rule between 0 and 1")
     explanation: str = Field(description="why the output passed or failed this rule")
+    skipped: bool = Field(False, description="whether the rule was skipped; skipped rules count towards no score or failure label")
 
 
 class EvaluationResponse(BaseModel):
@@ -99,6 +100,16 @@ class EvaluationResponse(BaseModel):
         description="original input that was evaluated"
     )
 
+    cached: bool = Field(
+        False,
+        description="whether scores and rule results were served from the result cache"
+    )
+
+    profile: Optional[Dict[str, Any]] = Field(
+        None,
+        description="per-rule timing breakdown, present only when profiling was requested"
+    )
+
     model_config = ConfigDict(
         json_schema_extra={
             "example": {
@@ -136,3 +147,21 @@ class EvaluationResponse(BaseModel):
             }
         }
     )
+
+
+
+class BatchEvaluationRequest(BaseModel):
+    requests: List[EvaluationRequest] = Field(
+        ...,
+        min_length=1,
+        description="evaluation requests to score in a single call"
+    )
+
+
+class BatchEvaluationResponse(BaseModel):
+    count: int = Field(..., description="number of evaluations in this batch")
+
+    results: List[EvaluationResponse] = Field(
+        default_factory=list,
+        description="one evaluation per request, in request order"
+    )
@@ -0,0 +1,5 @@
+from app.storage.sqlite_store import EvaluationStore
+
+__all__ = [
+    'EvaluationStore'
+]
@@ -0,0 +1,291 @@
+from app.core.records import EvaluationRecord
+from app.rules.registry import RuleSet
+from app.storage.sqlite_store import EvaluationStore
+from datetime import timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import json
+
+# pyarrow is optional: only columnar export and import need it
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+FORMATS = ("parquet", "arrow")
+EXTENSIONS = {".parquet": "parquet", ".arrow": "arrow", ".feather": "arrow", ".ipc": "arrow"}
+# Text columns, written only with include_text
+TEXT_COLUMNS = ("prompt", "output", "reference", "meta")
+# Columns written as dictionary codes into the distinct values
+DICTIONARY_COLUMNS = ("model", "task_type", "prompt_key")
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("columnar export needs pyarrow (pip install pyarrow)")
+
+
+def format_for_path(path: str, format: Optional[str] = None) -> str:
+    if format is None:
+        extension = path[path.rfind("."):].lower() if "." in path else ""
+        format = EXTENSIONS.get(extension, "parquet")
+    if format not in FORMATS:
+        raise ValueError(f"unknown format '{format}'; allowed: {', '.join(FORMATS)}")
+    return format
+
+
+def rule_score_column(rule_id: str) -> str:
+    return f"rule.{rule_id}.score"
+
+
+def rule_passed_column(rule_id: str) -> str:
+    return f"rule.{rule_id}.passed"
+
+
+# (rule ids, score names) of every result the given rule sets can produce
+def rule_set_columns(rule_sets: Iterable[RuleSet]) -> Tuple[List[str], List[str]]:
+    rule_ids = set()
+    score_names = set()
+    for rule_set in rule_sets:
+        for rule_id, dimension in rule_set.dimensions.items():
+            rule_ids.add(rule_id)
+            if dimension is not None:
+                score_names.add(f"{dimension}_score")
+    return sorted(rule_ids), sorted(score_names)
+
+
+# Assigns each value a code on first sight. Codes never change, so every batch's
+# dictionary extends the one before it, which Arrow IPC files store as deltas. Only the
+# values first seen in a batch are converted; they are appended to the dictionary
+# array built so far instead of rebuilding it from every value.
+class _Dictionary:
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        self.array = pa.array([], type=pa.string())
+
+    def encode(self, values: Sequence[Optional[str]]) -> "pa.DictionaryArray":
+        codes = []
+        added = []
+        for value in values:
+            if value is None:
+                codes.append(None)
+                continue
+            code = self.codes.get(value)
+            if code is None:
+                code = self.codes[value] = len(self.codes)
+                added.append(value)
+            codes.append(code)
+        if added:
+            self.array = pa.concat_arrays([self.array, pa.array(added, type=pa.string())])
+        return pa.DictionaryArray.from_arrays(pa.array(codes, type=pa.int32()), self.array)
+
+
+# Parquet stores its own dictionaries per row group, and every batch is a row group of
+# its own, so each batch is encoded with a dictionary of just its values
+class _BatchDictionary:
+
+    def encode(self, values: Sequence[Optional[str]]) -> "pa.DictionaryArray":
+        return pa.array(values, type=pa.string()).dictionary_encode()
+
+
+# Writes evaluation results as one row per evaluation:
+# - evaluation_id, timestamp (UTC), overall_score, passed
+# - model, task_type and prompt_key, dictionary-encoded
+# - failure_labels, a list of dictionary-encoded rule ids
+# - one float64 column per score name ("format_score", ...)
+# - rule.<rule_id>.score (float64) and rule.<rule_id>.passed (bool) for every rule id,
+#   null where the rule was skipped or did not run
+# - with include_text: prompt, output, reference, meta (as JSON) and
+#   rule.<rule_id>.explanation
+# The columns are fixed when the writer is created; a result for a rule or score name
+# outside them is an error. "parquet" files are zstd-compressed; "arrow" files are
+# uncompressed Arrow IPC, which read_columnar memory-maps without copying.
+class ColumnarWriter:
+
+    def __init__(
+        self,
+        path: str,
+        rule_ids: Sequence[str],
+        score_names: Sequence[str],
+        include_text: bool = False,
+        format: Optional[str] = None
+    ):
+        _require_pyarrow()
+        self.path = path
+        self.format = format_for_path(path, format)
+        self.rule_ids = list(rule_ids)
+        self.score_names = list(score_names)
+        self.include_text = include_text
+        self.rows = 0
+
+        self._rule_index = {rule_id: index for index, rule_id in enumerate(self.rule_ids)}
+        self._score_index = {name: index for index, name in enumerate(self.score_names)}
+        dictionary = _BatchDictionary if self.format == "parquet" else _Dictionary
+        self._dictionaries = {column: dictionary() for column in DICTIONARY_COLUMNS + ("failure_labels",)}
+        self.schema = self._schema()
+
+        if self.format == "parquet":
+            self._writer = pq.ParquetWriter(path, self.schema, compression="zstd", store_schema=True)
+        else:
+            self._writer = pa.ipc.new_file(
+                path,
+                self.schema,
+                options=pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+            )
+
+    def __enter__(self) -> "ColumnarWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, records: Sequence[EvaluationRecord]):
+        if not records:
+            return
+        columns: Dict[str, List[Any]] = {field.name: [] for field in self.schema}
+        rule_count = len(self.rule_ids)
+
+        for record in records:
+            request = record.input_data
+            columns["evaluation_id"].append(record.evaluation_id)
+            columns["timestamp"].append(record.timestamp.replace(tzinfo=record.timestamp.tzinfo or timezone.utc))
+            columns["model"].append(record.model())
+            columns["task_type"].append(request.task_type if request is not None else None)
+            columns["prompt_key"].append(record.prompt_key())
+            columns["overall_score"].append(record.overall_score)
+            columns["passed"].append(not record.failure_labels)
+            columns["failure_labels"].append(record.failure_labels)
+
+            scores: List[Optional[float]] = [None] * len(self.score_names)
+            for name, score in record.scores.items():
+                index = self._score_index.get(name)
+                if index is None:
+                    raise ValueError(f"score '{name}' of {record.evaluation_id} is not among the exported columns")
+                scores[index] = score
+            for name, score in zip(self.score_names, scores):
+                columns[name].append(score)
+
+            rule_scores: List[Optional[float]] = [None] * rule_count
+            rule_passed: List[Optional[bool]] = [None] * rule_count
+            explanations: List[Optional[str]] = [None] * rule_count
+            for result in record.rule_results:
+                index = self._rule_index.get(result.rule_id)
+                if index is None:
+                    if result.skipped:
+                        continue
+                    raise ValueError(f"rule '{result.rule_id}' of {record.evaluation_id} is not among the exported columns")
+                explanations[index] = result.explanation
+                if not result.skipped:
+                    rule_scores[index] = result.score
+                    rule_passed[index] = result.passed
+            for index, rule_id in enumerate(self.rule_ids):
+                columns[rule_score_column(rule_id)].append(rule_scores[index])
+                columns[rule_passed_column(rule_id)].append(rule_passed[index])
+                if self.include_text:
+                    columns[f"rule.{rule_id}.explanation"].append(explanations[index])
+
+            if self.include_text:
+                columns["prompt"].append(request.prompt)
+                columns["output"].append(request.output)
+                columns["reference"].append(request.reference)
+                columns["meta"].append(json.dumps(request.meta) if request.meta is not None else None)
+
+        arrays = []
+        for field in self.schema:
+            values = columns[field.name]
+            if field.name in DICTIONARY_COLUMNS:
+                arrays.append(self._dictionaries[field.name].encode(values))
+            elif field.name == "failure_labels":
+                offsets = [0]
+                for labels in values:
+                    offsets.append(offsets[-1] + len(labels))
+                labels = self._dictionaries["failure_labels"].encode([label for row in values for label in row])
+                arrays.append(pa.ListArray.from_arrays(pa.array(offsets, type=pa.int32()), labels))
+            else:
+                arrays.append(pa.array(values, type=field.type))
+
+        self._writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+        self.rows += len(records)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def _schema(self) -> "pa.Schema":
+        labels = pa.dictionary(pa.int32(), pa.string())
+        fields = [
+            pa.field("evaluation_id", pa.string(), nullable=False),
+            pa.field("timestamp", pa.timestamp("us", tz="UTC"), nullable=False),
+            pa.field("model", labels),
+            pa.field("task_type", labels),
+            pa.field("prompt_key", labels),
+            pa.field("overall_score", pa.float64(), nullable=False),
+            pa.field("passed", pa.bool_(), nullable=False),
+            pa.field("failure_labels", pa.list_(labels), nullable=False)
+        ]
+        fields.extend(pa.field(name, pa.float64()) for name in self.score_names)
+        for rule_id in self.rule_ids:
+            fields.append(pa.field(rule_score_column(rule_id), pa.float64()))
+            fields.append(pa.field(rule_passed_column(rule_id), pa.bool_()))
+            if self.include_text:
+                fields.append(pa.field(f"rule.{rule_id}.explanation", pa.string()))
+        if self.include_text:
+            fields.extend(pa.field(name, pa.large_string()) for name in TEXT_COLUMNS)
+
+        metadata = {"rule_ids": json.dumps(self.rule_ids), "score_names": json.dumps(self.score_names)}
+        return pa.schema(fields, metadata=metadata)
+
+
+# Writes records batch_size at a time and returns the number written
+def export_records(
+    records: Iterable[EvaluationRecord],
+    path: str,
+    rule_ids: Sequence[str],
+    score_names: Sequence[str],
+    include_text: bool = False,
+    format: Optional[str] = None,
+    batch_size: int = 10000
+) -> int:
+    with ColumnarWriter(path, rule_ids, score_names, include_text, format) as writer:
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                writer.write(batch)
+                batch = []
+        writer.write(batch)
+    return writer.rows
+
+
+# Exports the stored evaluations matching the filters, oldest first
+def export_store(
+    store: EvaluationStore,
+    path: str,
+    include_text: bool = False,
+    format: Optional[str] = None,
+    batch_size: int = 10000,
+    **filters: Any
+) -> int:
+    _require_pyarrow()
+    store.flush()
+    rule_ids, score_names = store.result_columns(**filters)
+    records = (record for record, _ in store.iter_records(batch_size=batch_size, **filters))
+    return export_records(records, path, rule_ids, score_names, include_text, format, batch_size)
+
+
+# Reads an exported file as a pyarrow Table. Arrow IPC files are memory-mapped and read
+# without copying; Parquet is decoded from a memory map. Dictionaries that differ across
+# batches (grown by deltas, or one per Parquet row group) are unified, so each column has
+# one dictionary.
+def read_columnar(path: str, columns: Optional[Sequence[str]] = None, format: Optional[str] = None) -> "pa.Table":
+    _require_pyarrow()
+    if format_for_path(path, format) == "parquet":
+        table = pq.read_table(path, columns=columns, memory_map=True)
+    else:
+        table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+        if columns is not None:
+            table = table.select(list(columns))
+    return table.unify_dictionaries()
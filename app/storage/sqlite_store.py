@@ -0,0 +1,444 @@
+from app.core.records import EvaluationRecord, request_input_hash
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import json
+import queue
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS evaluations (
+    evaluation_id TEXT PRIMARY KEY,
+    ts REAL NOT NULL,
+    model TEXT,
+    task_type TEXT,
+    overall_score REAL NOT NULL,
+    passed INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    prompt_key TEXT,
+    input_hash TEXT,
+    rule_fingerprints TEXT
+);
+CREATE TABLE IF NOT EXISTS rule_results (
+    evaluation_id TEXT NOT NULL,
+    rule_id TEXT NOT NULL,
+    ts REAL NOT NULL,
+    model TEXT,
+    task_type TEXT,
+    passed INTEGER NOT NULL,
+    score REAL NOT NULL,
+    fingerprint TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_evaluations_ts ON evaluations (ts);
+CREATE INDEX IF NOT EXISTS idx_evaluations_model_ts ON evaluations (model, ts);
+CREATE INDEX IF NOT EXISTS idx_evaluations_task_ts ON evaluations (task_type, ts);
+CREATE INDEX IF NOT EXISTS idx_rule_results_eval ON rule_results (evaluation_id);
+CREATE INDEX IF NOT EXISTS idx_rule_results_rule_ts ON rule_results (rule_id, ts);
+CREATE INDEX IF NOT EXISTS idx_rule_results_model_rule_ts ON rule_results (model, rule_id, ts);
+CREATE INDEX IF NOT EXISTS idx_rule_results_task_ts ON rule_results (task_type, ts);
+"""
+
+BUCKET_SECONDS = {
+    "minute": 60,
+    "hour": 3600,
+    "day": 86400,
+    "week": 604800
+}
+
+EVALUATION_GROUP_COLUMNS = {"model", "task_type"}
+RULE_GROUP_COLUMNS = {"model", "task_type", "rule_id"}
+
+
+# Naive datetimes are UTC throughout the service (see Evaluator timestamps)
+def _epoch(value: Any) -> float:
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=value.tzinfo or timezone.utc).timestamp()
+    return float(value)
+
+
+# Columns added after the first release; older databases get them on open
+ADDED_COLUMNS = {
+    "evaluations": [("prompt_key", "TEXT"), ("input_hash", "TEXT"), ("rule_fingerprints", "TEXT")],
+    "rule_results": [("fingerprint", "TEXT")]
+}
+
+EVALUATION_COLUMNS = (
+    "evaluation_id", "ts", "model", "task_type", "overall_score", "passed", "payload", "prompt_key",
+    "input_hash", "rule_fingerprints"
+)
+RULE_RESULT_COLUMNS = ("evaluation_id", "rule_id", "ts", "model", "task_type", "passed", "score", "fingerprint")
+
+
+def _add_missing_columns(connection: sqlite3.Connection):
+    for table, columns in ADDED_COLUMNS.items():
+        existing = {row[1] for row in connection.execute(f"PRAGMA table_info({table})")}
+        for name, column_type in columns:
+            if name not in existing:
+                connection.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+# Persists evaluation responses through a background writer thread.
+# submit() only enqueues; the writer groups rows into one transaction per
+# batch_size rows or flush_interval_ms, whichever comes first.
+class EvaluationStore:
+
+    def __init__(
+        self,
+        db_path: str,
+        batch_size: int = 500,
+        flush_interval_ms: int = 200,
+        max_queue_size: int = 100000
+    ):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._queue: "queue.Queue[Optional[EvaluationRecord]]" = queue.Queue(maxsize=max_queue_size)
+        self._read_lock = threading.Lock()
+
+        self._reader = _connect(db_path)
+        self._reader.executescript(SCHEMA)
+        _add_missing_columns(self._reader)
+
+        self._writer = threading.Thread(target=self._write_loop, name="evaluation-store-writer", daemon=True)
+        self._writer.start()
+
+    def submit(self, response: EvaluationRecord):
+        try:
+            self._queue.put_nowait(response)
+        except queue.Full:
+            # never block the request path; shed writes instead
+            self.dropped += 1
+
+    def submit_many(self, responses: Sequence[EvaluationRecord]):
+        for response in responses:
+            self.submit(response)
+
+    def flush(self):
+        self._queue.join()
+
+    # Replaces stored evaluations (and their rule results) with updated records, e.g.
+    # after re-evaluation. Written synchronously, unlike submit().
+    def rewrite(self, responses: Sequence[EvaluationRecord]):
+        if responses:
+            with self._read_lock:
+                self._write_batch(self._reader, list(responses), replace=True)
+
+    # Stored evaluations matching the filters, oldest first, read batch_size rows at a
+    # time, as (record, input hash). Records written before rule fingerprints were stored
+    # come back with neither.
+    def iter_records(
+        self,
+        batch_size: int = 500,
+        **filters: Any
+    ) -> Iterator[Tuple[EvaluationRecord, Optional[str]]]:
+        where, params = self._where(filters, EVALUATION_GROUP_COLUMNS)
+        after: Optional[Tuple[float, str]] = None
+
+        while True:
+            page_where = list(where)
+            page_params = list(params)
+            if after is not None:
+                page_where.append("(ts > ? OR (ts = ? AND evaluation_id > ?))")
+                page_params.extend((after[0], after[0], after[1]))
+            sql = "SELECT ts, evaluation_id, payload, input_hash, rule_fingerprints FROM evaluations"
+            if page_where:
+                sql += " WHERE " + " AND ".join(page_where)
+            sql += " ORDER BY ts, evaluation_id LIMIT ?"
+
+            with self._read_lock:
+                rows = self._reader.execute(sql, page_params + [batch_size]).fetchall()
+            if not rows:
+                return
+
+            for ts, evaluation_id, payload, input_hash, fingerprints in rows:
+                fingerprints = json.loads(fingerprints) if fingerprints else None
+                yield EvaluationRecord.from_dict(json.loads(payload), fingerprints), input_hash
+            after = (rows[-1][0], rows[-1][1])
+
+    def close(self):
+        self._queue.put(None)
+        self._writer.join()
+        self._reader.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.db_path,
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed
+        }
+
+    def _write_loop(self):
+        connection = _connect(self.db_path)
+        running = True
+
+        while running:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            responses = [response for response in batch if response is not None]
+            running = len(responses) == len(batch)
+
+            # any failure, e.g. a record whose meta is not JSON-serializable, only loses
+            # its batch: the thread must outlive it, or flush() and close() would hang
+            try:
+                if responses:
+                    self._write_batch(connection, responses)
+                    self.written += len(responses)
+            except Exception:
+                self.failed += len(responses)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+        connection.close()
+
+    def _write_batch(self, connection: sqlite3.Connection, responses: List[EvaluationRecord], replace: bool = False):
+        evaluation_rows = []
+        rule_rows = []
+
+        for response in responses:
+            ts = _epoch(response.timestamp)
+            model = response.model()
+            task_type = response.input_data.task_type
+            fingerprints = response.rule_fingerprints or {}
+            evaluation_rows.append((
+                response.evaluation_id,
+                ts,
+                model,
+                task_type,
+                response.overall_score,
+                int(not response.failure_labels),
+                response.to_json(),
+                response.prompt_key(),
+                request_input_hash(response.input_data),
+                json.dumps(fingerprints, sort_keys=True) if fingerprints else None
+            ))
+            for result in response.rule_results:
+                if result.skipped:
+                    continue
+                rule_rows.append((
+                    response.evaluation_id,
+                    result.rule_id,
+                    ts,
+                    model,
+                    task_type,
+                    int(result.passed),
+                    result.score,
+                    fingerprints.get(result.rule_id)
+                ))
+
+        connection.execute("BEGIN")
+        try:
+            if replace:
+                connection.executemany(
+                    "DELETE FROM rule_results WHERE evaluation_id = ?",
+                    [(row[0],) for row in evaluation_rows]
+                )
+            connection.executemany(
+                f"INSERT OR REPLACE INTO evaluations ({', '.join(EVALUATION_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(EVALUATION_COLUMNS))})",
+                evaluation_rows
+            )
+            connection.executemany(
+                f"INSERT INTO rule_results ({', '.join(RULE_RESULT_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(RULE_RESULT_COLUMNS))})",
+                rule_rows
+            )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    # Pass rate and mean overall score per group, computed in SQL
+    def evaluation_stats(
+        self,
+        group_by: Sequence[str] = ("model",),
+        bucket: Optional[str] = None,
+        **filters: Any
+    ) -> List[Dict[str, Any]]:
+        return self._aggregate(
+            table="evaluations",
+            score_column="overall_score",
+            allowed_columns=EVALUATION_GROUP_COLUMNS,
+            group_by=group_by,
+            bucket=bucket,
+            filters=filters
+        )
+
+    # Pass rate and mean score per rule and group, computed in SQL
+    def rule_stats(
+        self,
+        group_by: Sequence[str] = ("model", "rule_id"),
+        bucket: Optional[str] = None,
+        **filters: Any
+    ) -> List[Dict[str, Any]]:
+        return self._aggregate(
+            table="rule_results",
+            score_column="score",
+            allowed_columns=RULE_GROUP_COLUMNS,
+            group_by=group_by,
+            bucket=bucket,
+            filters=filters
+        )
+
+    def _aggregate(
+        self,
+        table: str,
+        score_column: str,
+        allowed_columns: set,
+        group_by: Sequence[str],
+        bucket: Optional[str],
+        filters: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        unknown = [column for column in group_by if column not in allowed_columns]
+        if unknown:
+            raise ValueError(f"cannot group by {', '.join(unknown)}; allowed: {', '.join(sorted(allowed_columns))}")
+
+        if bucket is not None and bucket not in BUCKET_SECONDS:
+            raise ValueError(f"unknown bucket '{bucket}'; allowed: {', '.join(BUCKET_SECONDS)}")
+
+        select_columns = list(group_by)
+        group_expressions = list(group_by)
+
+        if bucket is not None:
+            width = BUCKET_SECONDS[bucket]
+            select_columns.append(f"CAST(ts / {width} AS INTEGER) * {width} AS bucket")
+            group_expressions.append("bucket")
+
+        where, params = self._where(filters, allowed_columns)
+
+        sql = (
+            f"SELECT {', '.join(select_columns + ['COUNT(*)', 'AVG(passed)', f'AVG({score_column})'])} "
+            f"FROM {table}"
+        )
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        if group_expressions:
+            sql += " GROUP BY " + ", ".join(group_expressions) + " ORDER BY " + ", ".join(group_expressions)
+
+        with self._read_lock:
+            rows = self._reader.execute(sql, params).fetchall()
+
+        names = list(group_by) + (["bucket"] if bucket is not None else [])
+        results = []
+        for row in rows:
+            entry = dict(zip(names, row))
+            if bucket is not None:
+                entry["bucket"] = datetime.fromtimestamp(entry["bucket"], tz=timezone.utc).isoformat()
+            entry["count"], entry["pass_rate"], entry["mean_score"] = row[len(names):]
+            results.append(entry)
+
+        return results
+
+    # One row per stored evaluation for ScoreTable.from_rows: model, prompt key, overall
+    # score, passed, then score and passed of each rule id (-1 where it did not run).
+    # models restricts the result to the given models.
+    def score_rows(
+        self,
+        models: Optional[Sequence[str]] = None,
+        **filters: Any
+    ) -> Tuple[List[str], List[Tuple[Any, ...]]]:
+        where, params = self._where(filters, EVALUATION_GROUP_COLUMNS, table="e")
+        if models:
+            where.append(f"e.model IN ({', '.join('?' * len(models))})")
+            params.extend(models)
+        where_sql = " WHERE " + " AND ".join(where) if where else ""
+
+        with self._read_lock:
+            rule_ids = [row[0] for row in self._reader.execute(
+                "SELECT DISTINCT rule_id FROM rule_results ORDER BY rule_id"
+            )]
+            pivot = [
+                f"IFNULL(MAX(CASE WHEN r.rule_id = ? THEN r.{column} END), -1)"
+                for _ in rule_ids
+                for column in ("score", "passed")
+            ]
+            sql = (
+                f"SELECT {', '.join(['e.model', 'e.prompt_key', 'e.overall_score', 'e.passed'] + pivot)} "
+                "FROM evaluations e LEFT JOIN rule_results r ON r.evaluation_id = e.evaluation_id"
+                f"{where_sql} GROUP BY e.evaluation_id"
+            )
+            pivot_params = [rule_id for rule_id in rule_ids for _ in range(2)]
+            rows = self._reader.execute(sql, pivot_params + params).fetchall()
+
+        return rule_ids, rows
+
+    # (rule ids, score names) with a value in any stored evaluation matching the filters
+    def result_columns(self, **filters: Any) -> Tuple[List[str], List[str]]:
+        rule_where, rule_params = self._where(filters, RULE_GROUP_COLUMNS)
+        where, params = self._where(filters, EVALUATION_GROUP_COLUMNS)
+
+        with self._read_lock:
+            rule_ids = [row[0] for row in self._reader.execute(
+                "SELECT DISTINCT rule_id FROM rule_results"
+                + (" WHERE " + " AND ".join(rule_where) if rule_where else "")
+                + " ORDER BY rule_id",
+                rule_params
+            )]
+            score_names = [row[0] for row in self._reader.execute(
+                "SELECT DISTINCT s.key FROM evaluations, json_each(evaluations.payload, '$.scores') AS s"
+                + (" WHERE " + " AND ".join(where) if where else "")
+                + " ORDER BY s.key",
+                params
+            )]
+
+        return rule_ids, score_names
+
+    # (prompt key, output) of the latest `limit` evaluations, oldest first
+    def recent_outputs(self, limit: int) -> List[Tuple[Optional[str], str]]:
+        with self._read_lock:
+            rows = self._reader.execute(
+                "SELECT prompt_key, json_extract(payload, '$.input_data.output') FROM evaluations "
+                "ORDER BY ts DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+        rows.reverse()
+        return rows
+
+    def _where(
+        self,
+        filters: Dict[str, Any],
+        allowed_columns: set,
+        table: Optional[str] = None
+    ) -> Tuple[List[str], List[Any]]:
+        prefix = f"{table}." if table else ""
+        where = []
+        params = []
+        for column, value in filters.items():
+            if value is None:
+                continue
+            if column == "start":
+                where.append(f"{prefix}ts >= ?")
+                params.append(_epoch(value))
+            elif column == "end":
+                where.append(f"{prefix}ts < ?")
+                params.append(_epoch(value))
+            elif column in allowed_columns:
+                where.append(f"{prefix}{column} = ?")
+                params.append(value)
+            else:
+                raise ValueError(f"unknown filter '{column}'")
+
+        return where, params
@@ -0,0 +1,95 @@
+from typing import Any, Dict, List
+import json
+import math
+import random
+
+MIN_OUTPUT_BYTES = 10
+MAX_OUTPUT_BYTES = 1024 * 1024
+
+WORDS = (
+    "the model answer paris france capital river city history data result value "
+    "system latency request output token summary reason because therefore however "
+    "analysis report metric score rule check evaluation format length keyword"
+).split()
+
+FILLER_PHRASES = (
+    "as an ai",
+    "my training data",
+    "i cannot browse",
+    "i'm not able to"
+)
+
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(4, 16))]
+    words[0] = words[0].capitalize()
+    return " ".join(words) + rng.choice([".", ".", ".", "!", "?"])
+
+
+def _text(rng: random.Random, size: int) -> str:
+    parts = []
+    length = 0
+    while length < size:
+        sentence = _sentence(rng)
+        if rng.random() < 0.02:
+            sentence = f"{rng.choice(FILLER_PHRASES).capitalize()}, {sentence.lower()}"
+        parts.append(sentence)
+        length += len(sentence) + 1
+    return " ".join(parts)[:size]
+
+
+def _json_text(rng: random.Random, size: int) -> str:
+    items = []
+    length = 2
+    while length < size:
+        item = {"id": len(items), "label": rng.choice(WORDS), "score": round(rng.random(), 3)}
+        items.append(item)
+        length += len(json.dumps(item)) + 2
+    document = json.dumps({"items": items})
+    # a small share of JSON outputs is truncated, as models sometimes do
+    if rng.random() < 0.1:
+        document = document[:max(1, len(document) // 2)]
+    return document
+
+
+def _prompt(rng: random.Random, expects_json: bool) -> str:
+    parts = [f"Write about {rng.choice(WORDS)} and {rng.choice(WORDS)}."]
+
+    if rng.random() < 0.5:
+        unit = rng.choice(["words", "characters", "sentences"])
+        parts.append(f"Use at most {rng.randint(5, 5000)} {unit}.")
+
+    if rng.random() < 0.5:
+        keywords = rng.sample(WORDS, rng.randint(1, 4))
+        if rng.random() < 0.5:
+            parts.append("You must include " + " and ".join(f"'{keyword}'" for keyword in keywords) + ".")
+        else:
+            parts.append("Include the following terms: " + ", ".join(keywords))
+
+    if expects_json:
+        parts.append("Return JSON.")
+
+    return " ".join(parts)
+
+
+# Deterministic synthetic EvaluationRequest payloads. Output sizes are
+# log-uniform between 10 B and 1 MB so small and very large outputs both appear.
+def generate_corpus(count: int, seed: int = 1234) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    low, high = math.log(MIN_OUTPUT_BYTES), math.log(MAX_OUTPUT_BYTES)
+    corpus = []
+
+    for index in range(count):
+        size = int(math.exp(rng.uniform(low, high)))
+        expects_json = rng.random() < 0.3
+        has_prompt = rng.random() < 0.85
+
+        corpus.append({
+            "task_type": "json_extraction" if expects_json and rng.random() < 0.5 else rng.choice(["qa", "summarization"]),
+            "prompt": _prompt(rng, expects_json) if has_prompt else None,
+            "output": _json_text(rng, size) if expects_json else _text(rng, size),
+            "reference": None,
+            "meta": {"model": f"model-{index % 4}", "temperature": 0.7}
+        })
+
+    return corpus
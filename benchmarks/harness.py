@@ -0,0 +1,84 @@
+from typing import Any, Callable, Dict, List, Optional
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+
+# Runs fn `repeat` times and returns the best and median wall time per operation in microseconds
+def measure(fn: Callable[[], Any], operations: int, repeat: int = 3) -> Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+
+    return {
+        "us_per_op": min(timings) / operations * 1e6,
+        "median_us_per_op": statistics.median(timings) / operations * 1e6,
+        "operations": operations
+    }
+
+
+# Bytes allocated and still alive after fn (what it returns is kept), and the peak, per operation
+def measure_allocations(fn: Callable[[], Any], operations: int) -> Dict[str, float]:
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        kept = fn()
+        after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del kept
+
+    return {
+        "retained_bytes_per_op": (after - before) / operations,
+        "peak_bytes_per_op": (peak - before) / operations
+    }
+
+
+def write_results(path: str, results: Dict[str, Dict[str, float]]):
+    document = {
+        "meta": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform()
+        },
+        "benchmarks": results
+    }
+    with open(path, "w") as handle:
+        json.dump(document, handle, indent=2, sort_keys=True)
+        handle.write("\n")
+
+
+def load_results(path: str) -> Dict[str, Dict[str, float]]:
+    with open(path) as handle:
+        return json.load(handle)["benchmarks"]
+
+
+# Returns the benchmarks that got slower than tolerance x baseline, and prints a per-benchmark diff
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    tolerance: float,
+    stream=sys.stdout
+) -> List[str]:
+    regressions = []
+    print(f"{'benchmark':<40} {'baseline us':>14} {'current us':>14} {'ratio':>8}", file=stream)
+
+    for name in sorted(results):
+        current = results[name]["us_per_op"]
+        reference: Optional[Dict[str, float]] = baseline.get(name)
+        if reference is None:
+            print(f"{name:<40} {'-':>14} {current:14.2f} {'new':>8}", file=stream)
+            continue
+
+        ratio = current / reference["us_per_op"] if reference["us_per_op"] else float("inf")
+        marker = "  REGRESSION" if ratio > tolerance else ""
+        print(f"{name:<40} {reference['us_per_op']:14.2f} {current:14.2f} {ratio:7.2f}x{marker}", file=stream)
+        if ratio > tolerance:
+            regressions.append(name)
+
+    return regressions
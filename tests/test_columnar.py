@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from app.core.comparison import ScoreTable
+from app.core.evaluator import Evaluator
+from app.schemas.evaluation import EvaluationRequest
+
+pytest.importorskip("pyarrow")
+
+from app.storage.columnar import FORMATS, export_records, read_columnar, rule_set_columns  # noqa: E402
+
+
+def _records():
+    evaluator = Evaluator()
+    requests = []
+    for index in range(7):
+        # later batches bring both repeated and new models and prompts, and rows without either
+        model = None if index == 3 else f"model-{index % 3}"
+        prompt = None if index == 5 else f"Answer question {index // 2} in at most 5 words"
+        output = "" if index == 4 else f"Answer {index} is here in a few words"
+        requests.append(EvaluationRequest(prompt=prompt, output=output, meta={"model": model} if model else None))
+    return evaluator, [evaluator.evaluate(request) for request in requests]
+
+
+@pytest.mark.parametrize("format", FORMATS)
+def test_round_trip_matches_score_table_from_records(tmp_path, format):
+    evaluator, records = _records()
+    rule_ids, score_names = rule_set_columns(evaluator.rule_sets.values())
+    path = str(tmp_path / f"results.{format}")
+
+    # two records per batch, so the dictionaries grow across batches
+    assert export_records(records, path, rule_ids, score_names, batch_size=2) == len(records)
+    loaded = ScoreTable.from_arrow(read_columnar(path))
+    expected = ScoreTable.from_records(records)
+
+    assert loaded.models == expected.models
+    np.testing.assert_array_equal(loaded.model_codes, expected.model_codes)
+    np.testing.assert_array_equal(loaded.prompt_codes, expected.prompt_codes)
+    np.testing.assert_array_equal(loaded.overall, expected.overall)
+    np.testing.assert_array_equal(loaded.passed, expected.passed)
+    for index, rule_id in enumerate(loaded.rule_ids):
+        if rule_id in expected.rule_ids:
+            column = expected.rule_ids.index(rule_id)
+            np.testing.assert_array_equal(loaded.rule_scores[:, index], expected.rule_scores[:, column])
+            np.testing.assert_array_equal(loaded.rule_passed[:, index], expected.rule_passed[:, column])
+        else:
+            # exported for every rule of the rule sets, but without results here
+            assert np.isnan(loaded.rule_scores[:, index]).all()
+    assert set(expected.rule_ids) <= set(loaded.rule_ids)
+
+
+def test_dictionary_columns_hold_each_value_once(tmp_path):
+    evaluator, records = _records()
+    rule_ids, score_names = rule_set_columns(evaluator.rule_sets.values())
+    path = str(tmp_path / "results.arrow")
+
+    export_records(records, path, rule_ids, score_names, batch_size=2)
+    table = read_columnar(path)
+
+    models = table.column("model")
+    assert models.num_chunks == 4
+    assert models.chunk(0).dictionary.to_pylist() == ["model-0", "model-1", "model-2"]
+    assert models.to_pylist() == [record.model() for record in records]
+    assert table.column("failure_labels").to_pylist() == [record.failure_labels for record in records]
@@ -0,0 +1,140 @@
+import numpy as np
+import pytest
+
+from app.core.comparison import ScoreTable, bootstrap_mean_ci, model_summary, paired_differences
+
+# (model, prompt key, overall score, passed); scores are exact in binary, so every
+# expectation below is computed by hand
+ROWS = [
+    ("a", "p1", 0.75, 1),
+    ("a", "p1", 0.25, 0),
+    ("a", "p2", 0.5, 0),
+    ("a", None, 0.0, 0),
+    ("b", "p1", 1.0, 1),
+    ("b", "p2", 0.25, 0),
+    ("b", "p3", 0.5, 1),
+    ("b", "p3", 0.0, 0),
+    ("b", None, 1.0, 1),
+    # c shares no prompt with anyone; d only p2
+    ("c", "p4", 0.0, 0),
+    ("d", "p2", 0.5, 1)
+]
+
+
+def _table() -> ScoreTable:
+    return ScoreTable.from_rows([], ROWS)
+
+
+def _by_model(entries):
+    return {entry["model"]: entry for entry in entries}
+
+
+def test_model_summary():
+    summary = _by_model(model_summary(_table()))
+
+    assert list(summary) == ["a", "b", "c", "d"]
+
+    a = summary["a"]
+    assert a["count"] == 4
+    assert a["pass_rate"] == 0.25
+    assert a["mean_score"] == 0.375
+    # population standard deviation: sqrt(0.875 / 4 - 0.375 ** 2)
+    assert a["std_score"] == pytest.approx(0.078125 ** 0.5)
+    # interpolated over the sorted scores 0, 0.25, 0.5, 0.75
+    assert a["quantiles"] == pytest.approx({"p5": 0.0375, "p25": 0.1875, "p50": 0.375, "p75": 0.5625, "p95": 0.7125})
+    assert a["histogram"] == [1, 0, 1, 0, 0, 1, 0, 1, 0, 0]
+    assert a["pass_rate_ci"][0] <= 0.25 <= a["pass_rate_ci"][1]
+    assert 0.0 <= a["mean_score_ci"][0] <= 0.375 <= a["mean_score_ci"][1] <= 0.75
+
+    b = summary["b"]
+    assert (b["count"], b["pass_rate"], b["mean_score"]) == (5, 0.6, 0.55)
+    # a score of 1.0 falls into the last bin
+    assert b["histogram"] == [1, 0, 1, 0, 0, 1, 0, 0, 0, 2]
+
+    c = summary["c"]
+    assert (c["count"], c["pass_rate"], c["mean_score"], c["std_score"]) == (1, 0.0, 0.0, 0.0)
+    assert set(c["quantiles"].values()) == {0.0}
+    assert c["pass_rate_ci"] == [0.0, 0.0]
+    assert c["mean_score_ci"] == [0.0, 0.0]
+
+
+def test_paired_differences_against_model_with_most_results():
+    paired = paired_differences(_table())
+
+    assert paired["baseline"] == "b"
+    models = _by_model(paired["models"])
+    assert list(models) == ["a", "c", "d"]
+
+    # a: p1 0.5 - 1.0, p2 0.5 - 0.25; the rows without a prompt are never paired
+    a = models["a"]
+    assert (a["pairs"], a["mean_difference"], a["wins"], a["losses"], a["ties"]) == (2, -0.125, 1, 1, 0)
+    assert -0.5 <= a["mean_difference_ci"][0] <= -0.125 <= a["mean_difference_ci"][1] <= 0.25
+
+    # c shares no prompt with b
+    assert models["c"] == {
+        "model": "c",
+        "pairs": 0,
+        "mean_difference": None,
+        "mean_difference_ci": [None, None],
+        "wins": 0,
+        "losses": 0,
+        "ties": 0
+    }
+
+    d = models["d"]
+    assert (d["pairs"], d["mean_difference"], d["wins"]) == (1, 0.25, 1)
+    assert d["mean_difference_ci"] == [0.25, 0.25]
+
+
+def test_paired_differences_against_explicit_baseline():
+    paired = paired_differences(_table(), baseline="a")
+
+    assert paired["baseline"] == "a"
+    models = _by_model(paired["models"])
+    assert list(models) == ["b", "c", "d"]
+
+    # b: p1 1.0 - 0.5, p2 0.25 - 0.5; a has no result for p3
+    b = models["b"]
+    assert (b["pairs"], b["mean_difference"], b["wins"], b["losses"], b["ties"]) == (2, 0.125, 1, 1, 0)
+    assert models["c"]["pairs"] == 0
+    d = models["d"]
+    assert (d["pairs"], d["mean_difference"], d["ties"]) == (1, 0.0, 1)
+
+
+def test_paired_differences_rejects_unknown_baseline():
+    with pytest.raises(ValueError, match="unknown baseline model 'z'"):
+        paired_differences(_table(), baseline="z")
+
+
+def test_empty_table():
+    table = ScoreTable.from_rows([], [])
+
+    assert model_summary(table) == []
+    assert paired_differences(table) == {"baseline": None, "models": []}
+
+
+def test_bootstrap_mean_ci_of_constant_and_empty_samples():
+    assert bootstrap_mean_ci(np.array([])) == (None, None)
+    assert bootstrap_mean_ci(np.full(50, 0.5)) == (0.5, 0.5)
+
+
+def test_bootstrap_mean_ci_of_two_values():
+    # resampled means of [0, 1] are 0, 0.5 and 1 with probabilities 1/4, 1/2 and 1/4
+    values = np.array([0.0, 1.0])
+
+    assert bootstrap_mean_ci(values, confidence=0.95, resamples=10000) == (0.0, 1.0)
+    assert bootstrap_mean_ci(values, confidence=0.4, resamples=10000) == (0.5, 0.5)
+
+
+def test_bootstrap_mean_ci_is_reproducible_and_close_to_normal_interval():
+    # more distinct values than BOOTSTRAP_LEVELS, so they are binned first
+    values = np.linspace(0.0, 1.0, 1001)
+
+    low, high = bootstrap_mean_ci(values, resamples=4000)
+
+    # the normal interval is 0.5 +- 1.96 * std / sqrt(n)
+    half_width = 1.96 * values.std() / len(values) ** 0.5
+    assert low < 0.5 < high
+    assert (high - low) / 2 == pytest.approx(half_width, rel=0.1)
+    assert bootstrap_mean_ci(values, resamples=4000) == (low, high)
+    assert bootstrap_mean_ci(values, resamples=4000, rng=np.random.default_rng(1)) != (low, high)
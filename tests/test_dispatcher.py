@@ -0,0 +1,84 @@
+import asyncio
+import json
+
+import pytest
+
+from app.core.dispatcher import EvaluationDispatcher
+from app.core.evaluator import Evaluator
+from app.schemas.evaluation import EvaluationRequest
+
+
+def _offloading_dispatcher(evaluator: Evaluator, max_queue: int = 4) -> EvaluationDispatcher:
+    # stands in for a started pool: requests of cacheable rule sets go through _enqueue
+    dispatcher = EvaluationDispatcher(evaluator, max_queue=max_queue)
+    dispatcher._pool = object()
+    dispatcher._queue = asyncio.Queue()
+    return dispatcher
+
+
+def _failing_lookup(request):
+    raise RuntimeError("cache unavailable")
+
+
+def test_failed_lookup_releases_admission():
+    evaluator = Evaluator()
+    evaluator.lookup = _failing_lookup
+    dispatcher = _offloading_dispatcher(evaluator)
+    request = EvaluationRequest(prompt="Say hi", output="Hello there.")
+
+    async def run():
+        for _ in range(dispatcher.max_queue + 1):
+            with pytest.raises(RuntimeError, match="cache unavailable"):
+                await dispatcher.evaluate(request)
+        with pytest.raises(RuntimeError, match="cache unavailable"):
+            await dispatcher.evaluate_batch([request, request])
+
+    asyncio.run(run())
+
+    assert dispatcher.admitted == 0
+    assert dispatcher.rejected == 0
+    assert dispatcher._queue.empty()
+
+
+def test_stream_lines_of_unadmitted_batch_become_errors(monkeypatch):
+    from fastapi.testclient import TestClient
+    import app.main as main
+
+    dispatcher = EvaluationDispatcher(main.evaluator, max_queue=1)
+    dispatcher.admitted = 1
+    monkeypatch.setattr(main, "dispatcher", dispatcher)
+
+    body = "\n".join([
+        json.dumps({"prompt": "Say hi", "output": "Hello there."}),
+        "not json"
+    ]) + "\n"
+    response = TestClient(main.app).post("/evaluate/stream", content=body)
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert response.status_code == 200
+    assert [line["line"] for line in lines] == [1, 2]
+    assert "queue is full" in lines[0]["error"]
+    assert "queue is full" not in lines[1]["error"]
+    assert dispatcher.rejected == 1
+
+
+def test_websocket_session_is_refused_when_queue_is_full(monkeypatch):
+    from fastapi.testclient import TestClient
+    import app.main as main
+
+    dispatcher = EvaluationDispatcher(main.evaluator, max_queue=1)
+    dispatcher.admitted = 1
+    monkeypatch.setattr(main, "dispatcher", dispatcher)
+
+    with TestClient(main.app).websocket_connect("/evaluate/ws") as websocket:
+        websocket.send_json({"type": "start", "prompt": "Say hi"})
+        websocket.send_json({"type": "chunk", "text": "Hello there."})
+        websocket.send_json({"type": "end"})
+        message = websocket.receive_json()
+        # verdicts settled while streaming still arrive before the refusal
+        while message["type"] == "verdict":
+            message = websocket.receive_json()
+
+    assert message["type"] == "error"
+    assert "queue is full" in message["error"]
+    assert dispatcher.rejected == 1
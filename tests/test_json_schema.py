@@ -0,0 +1,89 @@
+import pytest
+
+from app.core.json_schema import SchemaViolation, compile_schema
+from app.rules.format_rules import JSONFormatRule
+from app.schemas.evaluation import EvaluationRequest
+
+# (schema, valid value, invalid value) per keyword
+KEYWORD_CASES = {
+    "type": ({"type": ["integer", "null"]}, 3.0, "3"),
+    "enum": ({"enum": [1, "a", [1]]}, [1], 2),
+    "const": ({"const": {"a": 1}}, {"a": 1}, {"a": 2}),
+    "required": ({"required": ["id"]}, {"id": 1}, {"name": "x"}),
+    "properties": ({"properties": {"id": {"type": "integer"}}}, {"id": 1}, {"id": "1"}),
+    "additionalProperties": ({"properties": {"id": {}}, "additionalProperties": False}, {"id": 1}, {"id": 1, "x": 2}),
+    "items": ({"items": {"type": "string"}}, ["a", "b"], ["a", 1]),
+    "minItems": ({"minItems": 2}, [1, 2], [1]),
+    "maxItems": ({"maxItems": 1}, [1], [1, 2]),
+    "uniqueItems": ({"uniqueItems": True}, [1, "1", [1]], [{"a": 1}, {"a": 1}]),
+    "minLength": ({"minLength": 2}, "ab", "a"),
+    "maxLength": ({"maxLength": 2}, "ab", "abc"),
+    "pattern": ({"pattern": "^[a-z]+$"}, "abc", "ab1"),
+    "minProperties": ({"minProperties": 1}, {"a": 1}, {}),
+    "maxProperties": ({"maxProperties": 1}, {"a": 1}, {"a": 1, "b": 2}),
+    "minimum": ({"minimum": 1}, 1, 0.5),
+    "maximum": ({"maximum": 1}, 1, 2),
+    "exclusiveMinimum": ({"exclusiveMinimum": 1}, 1.5, 1),
+    "exclusiveMaximum": ({"exclusiveMaximum": 1}, 0.5, 1),
+    "multipleOf": ({"multipleOf": 0.1}, 0.3, 0.35),
+    "allOf": ({"allOf": [{"type": "integer"}, {"minimum": 0}]}, 1, -1),
+    "anyOf": ({"anyOf": [{"type": "string"}, {"minimum": 0}]}, "a", -1),
+    "oneOf": ({"oneOf": [{"type": "integer"}, {"minimum": 0}]}, -1, 1),
+    "not": ({"not": {"type": "string"}}, 1, "a"),
+    "$ref": ({"$defs": {"id": {"type": "integer"}}, "items": {"$ref": "#/$defs/id"}}, [1], ["1"]),
+}
+
+
+@pytest.mark.parametrize("keyword", sorted(KEYWORD_CASES))
+def test_keyword(keyword):
+    schema, valid, invalid = KEYWORD_CASES[keyword]
+    compiled = compile_schema(schema)
+    compiled.validate(valid)
+    with pytest.raises(SchemaViolation):
+        compiled.validate(invalid)
+
+
+def test_violation_location():
+    compiled = compile_schema({"properties": {"items": {"items": {"required": ["id"]}}}})
+    with pytest.raises(SchemaViolation) as violation:
+        compiled.validate({"items": [{"id": 1}, {}]})
+    assert violation.value.location == "$.items[1]"
+
+
+@pytest.mark.parametrize("schema", [
+    {"multipleOf": 0},
+    {"multipleOf": -1},
+    {"type": "decimal"},
+    {"if": {}},
+    {"$ref": "http://example.com/schema"},
+    {"pattern": "("},
+])
+def test_invalid_schema_is_rejected(schema):
+    with pytest.raises(ValueError):
+        compile_schema(schema)
+
+
+def test_multiple_of_with_large_values():
+    compiled = compile_schema({"multipleOf": 0.01})
+    # the float quotient overflows; 1e308 and any integer are multiples of 0.01
+    compiled.validate(1e308)
+    compiled.validate(10 ** 400 + 1)
+    with pytest.raises(SchemaViolation):
+        compile_schema({"multipleOf": 7}).validate(7 * 10 ** 30 + 1)
+
+
+def test_json_format_reports_invalid_multiple_of_as_invalid_schema():
+    request = EvaluationRequest(prompt="Return JSON", output='{"x": 1}', meta={"json_schema": {"multipleOf": 0}})
+    result = JSONFormatRule().evaluate(request)
+    assert not result.passed
+    assert result.explanation.startswith("Invalid JSON schema: multipleOf")
+
+
+def test_json_format_validates_large_number_against_multiple_of():
+    request = EvaluationRequest(
+        prompt="Return JSON",
+        output='{"x": 1e308}',
+        meta={"json_schema": {"properties": {"x": {"multipleOf": 0.01}}}}
+    )
+    result = JSONFormatRule().evaluate(request)
+    assert result.passed, result.explanation
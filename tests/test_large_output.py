@@ -0,0 +1,86 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app.config import settings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OUTPUT_CHARS = 50 * 1024 * 1024
+
+# Peak resident memory one evaluation of a 50 MB output may add, in chunks of
+# EVAL_LARGE_OUTPUT_CHUNK_CHARS. Counting rules hold about one chunk at a time; rules
+# that tokenize the output hold one chunk's tokens, several times the chunk's size.
+# Either is far below one more copy of the output, which whole-output analysis makes.
+COUNTING_PEAK_CHUNKS = 8
+TOKENIZING_PEAK_CHUNKS = 24
+
+# Runs in a fresh interpreter, so the peak RSS it reports belongs to this one evaluation:
+# rules are warmed up first, and the output is built without temporary copies, so the
+# peak before the evaluation is the output itself
+MEASURE = """
+import json, resource, sys
+from app.core.evaluator import Evaluator
+from app.schemas.evaluation import EvaluationRequest
+
+kind, task_type, target = sys.argv[1], sys.argv[2] or None, int(sys.argv[3])
+evaluator = Evaluator()
+evaluator.evaluate(EvaluationRequest(
+    prompt="Return the facts as JSON", output='[{"fact": "42 is even"}]', reference="42 is even", task_type=task_type
+))
+
+if kind == "text":
+    unit = "The quick brown fox jumps over the lazy dog 42 times. "
+    output = unit * (target // len(unit))
+    prompt = "Describe the fox"
+else:
+    unit = json.dumps({"id": 7, "name": "fox", "tags": ["quick", "brown"], "score": 0.5})
+    count = target // (len(unit) + 2)
+    output = ", ".join(["[" + unit] + [unit] * (count - 2) + [unit + "]"])
+    prompt = "Return the records as JSON"
+request = EvaluationRequest(
+    prompt=prompt, output=output, reference="The quick brown fox jumps over the lazy dog 42 times", task_type=task_type
+)
+del output
+
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+record = evaluator.evaluate(request)
+after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({
+    "grown_bytes": (after - before) * 1024,
+    "results": {result.rule_id: [result.passed, result.explanation] for result in record.rule_results}
+}))
+"""
+
+
+def _measure(kind: str, task_type: str = "") -> dict:
+    completed = subprocess.run(
+        [sys.executable, "-c", MEASURE, kind, task_type, str(OUTPUT_CHARS)],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return json.loads(completed.stdout)
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="ru_maxrss is in kilobytes only on Linux")
+@pytest.mark.parametrize("kind, task_type, peak_chunks", [
+    ("text", "", COUNTING_PEAK_CHUNKS),
+    ("json", "", COUNTING_PEAK_CHUNKS),
+    ("text", "qa", TOKENIZING_PEAK_CHUNKS)
+])
+def test_large_output_peak_memory_is_bounded_by_chunks(kind, task_type, peak_chunks):
+    assert OUTPUT_CHARS > settings.large_output_chars
+
+    measured = _measure(kind, task_type)
+
+    limit = peak_chunks * settings.large_output_chunk_chars
+    assert measured["grown_bytes"] <= limit, (
+        f"evaluating {OUTPUT_CHARS} characters of {kind} grew RSS by {measured['grown_bytes']} bytes, over {limit}"
+    )
+    if kind == "json":
+        passed, explanation = measured["results"]["json_format"]
+        assert passed and explanation.startswith("Valid JSON"), explanation
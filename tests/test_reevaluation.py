@@ -0,0 +1,23 @@
+from app.core.evaluator import Evaluator
+from app.core.plan import BUDGET_EXCEEDED
+from app.core.records import request_input_hash
+from app.schemas.evaluation import EvaluationRequest
+
+
+def test_reevaluate_reruns_budget_skipped_rules():
+    evaluator = Evaluator()
+    request = EvaluationRequest(prompt="Say hi", output="Hello there.")
+    record = evaluator.evaluate(request, budget_ms=1e-9)
+    assert all(result.explanation == BUDGET_EXCEEDED for result in record.rule_results)
+
+    updated, rerun = evaluator.reevaluate(record, request_input_hash(request))
+
+    assert sorted(rerun) == sorted(result.rule_id for result in record.rule_results)
+    assert not any(result.explanation == BUDGET_EXCEEDED for result in updated.rule_results)
+    assert updated.evaluation_id == record.evaluation_id
+    fresh = evaluator.evaluate(request)
+    assert [(r.rule_id, r.passed, r.score) for r in updated.rule_results] == [
+        (r.rule_id, r.passed, r.score) for r in fresh.rule_results
+    ]
+    # the recomputed results are final: nothing runs again
+    assert evaluator.reevaluate(updated, request_input_hash(request)) == (updated, [])
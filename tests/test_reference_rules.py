@@ -0,0 +1,45 @@
+from app.rules.reference_rules import NgramOverlapRule, NumericConsistencyRule, RougeLRule, TokenF1Rule
+from app.schemas.evaluation import EvaluationRequest
+
+CAPITAL = EvaluationRequest(
+    prompt="What is the capital of France?",
+    output="The capital of France is Paris.",
+    reference="Paris"
+)
+
+
+def test_short_reference_is_scored_by_recall():
+    for rule in (TokenF1Rule(), RougeLRule(), NgramOverlapRule()):
+        result = rule.evaluate(CAPITAL)
+        assert result.passed and result.score == 1.0, result.explanation
+        assert "scored by recall" in result.explanation
+
+
+def test_ngram_overlap_falls_back_to_unigrams_for_one_word_reference():
+    request = EvaluationRequest(prompt="Capital?", output="It is Lyon.", reference="Paris")
+    rule = NgramOverlapRule()
+    assert rule.evaluate(request).score == 0.0
+    assert [result.score for result in rule.evaluate_batch([CAPITAL, request])] == [1.0, 0.0]
+
+
+def test_long_reference_is_scored_by_f1():
+    request = EvaluationRequest(
+        prompt="Describe the scene.",
+        output="the cat sat on the mat today",
+        reference="the cat sat on the mat now and then"
+    )
+    # 6 shared tokens ("the" twice): precision 6/7, recall 6/9
+    result = TokenF1Rule().evaluate(request)
+    assert abs(result.score - 2 * (6 / 7) * (6 / 9) / (6 / 7 + 6 / 9)) < 1e-9
+    assert "with reference" in result.explanation
+
+
+def test_numeric_consistency_accepts_numbers_echoed_from_the_prompt():
+    request = EvaluationRequest(
+        prompt="When did the war that began in 1939 end?",
+        output="It ended in 1945, about 6 years after it began in 1939.",
+        reference="1945"
+    )
+    result = NumericConsistencyRule().evaluate(request)
+    assert not result.passed
+    assert result.explanation == "Numbers not found in reference: 6"
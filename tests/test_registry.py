@@ -0,0 +1,38 @@
+import pytest
+
+from app.core.evaluator import Evaluator
+from app.rules.registry import DEFAULT_RULE_SET, load_registry
+from app.schemas.evaluation import EvaluationRequest
+
+TASK_TYPE_SETS = {
+    "qa": "qa",
+    "Question_Answering": "qa",
+    "summarization": "summarization",
+    "summary": "summarization",
+    "json": "json",
+    "json_extraction": "json",
+    " structured_output ": "json",
+    "translation": DEFAULT_RULE_SET,
+    None: DEFAULT_RULE_SET,
+}
+
+
+@pytest.mark.parametrize("task_type", list(TASK_TYPE_SETS), ids=str)
+def test_task_type_resolves_to_its_rule_set(task_type):
+    assert load_registry().rule_set_name(task_type) == TASK_TYPE_SETS[task_type]
+
+
+def test_requests_run_the_rules_of_their_task_type():
+    evaluator = Evaluator()
+    expected = {
+        "qa": {"token_f1", "rouge_l", "numeric_consistency"},
+        "json": {"json_format"},
+    }
+    for task_type, rule_ids in expected.items():
+        request = EvaluationRequest(prompt="What is it?", output='{"answer": "Paris"}', reference="Paris", task_type=task_type)
+        ran = {result.rule_id for result in evaluator.evaluate(request).rule_results}
+        assert rule_ids <= ran
+        assert ran == set(evaluator.rule_sets[TASK_TYPE_SETS[task_type]].dimensions)
+
+    default = {result.rule_id for result in evaluator.evaluate(EvaluationRequest(prompt="Hi", output="Hello")).rule_results}
+    assert not default & {"token_f1", "rouge_l", "ngram_overlap", "numeric_consistency"}
@@ -0,0 +1,24 @@
+from app.core.evaluator import Evaluator
+from app.schemas.evaluation import EvaluationRequest
+from app.storage.sqlite_store import EvaluationStore
+
+
+def test_unserializable_record_fails_its_batch_without_stopping_the_writer(tmp_path):
+    evaluator = Evaluator()
+    unserializable = evaluator.evaluate(
+        EvaluationRequest(prompt="Say hi", output="Hello there.", meta={"model": "a", "client": object()})
+    )
+    valid = evaluator.evaluate(EvaluationRequest(prompt="Say hi", output="Hello there.", meta={"model": "a"}))
+
+    store = EvaluationStore(str(tmp_path / "evaluations.db"), flush_interval_ms=0)
+    try:
+        store.submit(unserializable)
+        store.flush()
+        assert store.stats()["failed"] == 1
+
+        store.submit(valid)
+        store.flush()
+        assert store.stats()["written"] == 1
+        assert [record.evaluation_id for record, _ in store.iter_records()] == [valid.evaluation_id]
+    finally:
+        store.close()
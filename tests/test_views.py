@@ -0,0 +1,53 @@
+import json
+
+from app.core.evaluator import Evaluator
+from app.core.views import ResponseView, render_response
+from app.schemas.evaluation import EvaluationRequest, RuleResult
+
+
+def test_failures_view_keeps_only_failing_results():
+    # a blank output fails empty_output, and every rule that depends on it is skipped
+    response = Evaluator().evaluate(EvaluationRequest(prompt="Say hi", output="   ")).to_response()
+    assert any(result.skipped for result in response.rule_results)
+
+    rendered = json.loads(render_response(response, ResponseView.failures))
+
+    assert [result["rule_id"] for result in rendered["rule_results"]] == ["empty_output"]
+    assert "input_data" not in rendered
+
+
+def test_failures_view_of_passing_response_has_no_results():
+    response = Evaluator().evaluate(EvaluationRequest(prompt="Say hi", output="Hello there.")).to_response()
+    response.rule_results.append(
+        RuleResult(
+            rule_id="token_f1",
+            rule_name="reference token F1",
+            passed=False,
+            score=0.0,
+            explanation="skipped: not applicable",
+            skipped=True
+        )
+    )
+    assert not response.failure_labels
+
+    assert json.loads(render_response(response, ResponseView.failures))["rule_results"] == []
+
+
+def test_evaluate_endpoints_document_views_without_response_model():
+    from fastapi.testclient import TestClient
+    import app.main as main
+
+    spec = main.app.openapi()
+    for path, schema in (("/evaluate", "EvaluationResponse"), ("/evaluate/batch", "BatchEvaluationResponse")):
+        documented = spec["paths"][path]["post"]["responses"]["200"]
+        assert documented["content"]["application/json"]["schema"] == {"$ref": f"#/components/schemas/{schema}"}
+        assert "`view`" in documented["description"]
+
+    response = TestClient(main.app).post(
+        "/evaluate",
+        params={"view": "compact"},
+        json={"prompt": "Say hi", "output": "Hello there."}
+    )
+    assert response.status_code == 200
+    assert "input_data" not in response.json()
+    assert "rule_results" not in response.json()